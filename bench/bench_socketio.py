@@ -0,0 +1,160 @@
+# ✅ Socket.IO 여러 워커 전달 처리량 측정
+# sns.py 워커(`python sns.py worker <port>`)를 N개 띄우고, 가상 사용자들을 워커에 나눠 접속시킨 뒤(join 이벤트)
+# 여러 발행 프로세스가 sns.deliver_chat으로 사용자 방에 chat_delivery를 보낸다.
+# 각 워커에 붙은 사용자들이 실제로 받은 이벤트 수로 워커별/전체 전달 처리량을 잰다.
+#
+# 서버 의존성 외에 이 스크립트만 쓰는 준비물:
+# - 패키지: requests, python-socketio[client] (가상 사용자 접속), redis (--queue redis://... 일 때)
+# - 실행 중인 Redis: --queue로 넘기는 메시지 큐
+# - sns.py를 그대로 import/실행하므로 serviceAccountKey.json(Firebase)과 접속 가능한 MySQL DB 설정이
+#   서버를 띄울 때처럼 준비되어 있어야 한다
+#
+# 사용법:
+#   python bench/bench_socketio.py --queue redis://localhost:6379/0 --max-workers 4 --users 200 --messages 20000
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+import socketio
+
+SNS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sns.py')
+
+
+def bench_user(user_no):
+    return f"bench-{user_no}"
+
+
+def start_workers(workers, base_port, queue_url):
+    env = dict(os.environ, SOCKETIO_MESSAGE_QUEUE=queue_url)
+    procs = [
+        subprocess.Popen([sys.executable, SNS_PATH, 'worker', str(base_port + i)], env=env,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for i in range(workers)
+    ]
+    deadline = time.time() + 60
+    for i in range(workers):
+        while True:
+            try:
+                requests.get(f"http://127.0.0.1:{base_port + i}/test", timeout=1)
+                break
+            except requests.RequestException:
+                if time.time() > deadline:
+                    raise RuntimeError(f"워커 {i}가 시작되지 않았습니다.")
+                time.sleep(0.2)
+    return procs
+
+
+def client_main(index, port, user_nos, expected, ready, start, results):
+    """한 워커에 user_nos 사용자들로 접속해서 받은 chat_delivery 수를 센다"""
+    state = {'count': 0, 'last': None}
+    lock = threading.Lock()
+
+    def on_delivery(data):
+        with lock:
+            state['count'] += 1
+            state['last'] = time.time()
+
+    clients = []
+    for user_no in user_nos:
+        client = socketio.Client()
+        client.on('chat_delivery', on_delivery)
+        client.connect(f"http://127.0.0.1:{port}")
+        client.emit('join', {'user_id': bench_user(user_no)})
+        clients.append(client)
+    time.sleep(1.0)  # join 처리가 끝날 시간
+    ready.put(index)
+
+    start.wait()
+    deadline = time.time() + 120
+    while state['count'] < expected and time.time() < deadline:
+        time.sleep(0.01)
+    results.put((index, state['count'], state['last']))
+    for client in clients:
+        client.disconnect()
+
+
+def publisher_main(queue_url, users, message_nos, start, done):
+    """sns.py를 import 해서 앱 서버와 같은 경로(deliver_chat)로 보낸다"""
+    os.environ['SOCKETIO_MESSAGE_QUEUE'] = queue_url
+    sys.path.insert(0, os.path.dirname(SNS_PATH))
+    import sns
+
+    start.wait()
+    for i in message_nos:
+        sns.deliver_chat(bench_user(i % users), {'messages': [{'message_id': i}], 'rooms': [], 'unread_room_count': 0})
+    done.put(time.time())
+
+
+def run_round(workers, users, messages, publishers, queue_url, base_port):
+    procs = start_workers(workers, base_port, queue_url)
+    ctx = multiprocessing.get_context('spawn')
+    ready, results, done = ctx.Queue(), ctx.Queue(), ctx.Queue()
+    start = ctx.Event()
+    try:
+        assignments = [list(range(i, users, workers)) for i in range(workers)]
+        expected = [messages // users * len(user_nos) for user_nos in assignments]
+        clients = [
+            ctx.Process(target=client_main,
+                        args=(i, base_port + i, assignments[i], expected[i], ready, start, results))
+            for i in range(workers)
+        ]
+        pubs = [
+            ctx.Process(target=publisher_main, args=(queue_url, users, range(p, messages, publishers), start, done))
+            for p in range(publishers)
+        ]
+        for p in clients + pubs:
+            p.start()
+        for _ in clients:
+            ready.get(timeout=120)
+        time.sleep(2.0)  # 발행 프로세스가 sns를 import 할 시간
+
+        started = time.time()
+        start.set()
+        published = max(done.get(timeout=180) for _ in pubs)
+        per_worker = {}
+        finished = published
+        for _ in clients:
+            index, count, last = results.get(timeout=180)
+            per_worker[index] = (count, (last or published) - started)
+            finished = max(finished, last or published)
+        for p in clients + pubs:
+            p.join()
+        return per_worker, finished - started, messages / (published - started)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sns.py Socket.IO 워커 수에 따른 전달 처리량 측정")
+    parser.add_argument('--queue', default='redis://localhost:6379/0')
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--publishers', type=int, default=4, help="발행 프로세스 수 (발행 속도가 병목이 되지 않게)")
+    parser.add_argument('--base-port', type=int, default=5100)
+    args = parser.parse_args()
+
+    # 사용자 수로 나누어 떨어지게 맞춰서 워커마다 받을 개수를 정확히 계산한다
+    messages = args.messages - args.messages % args.users
+
+    print(f"queue={args.queue} users={args.users} messages={messages} publishers={args.publishers}")
+    print(f"{'workers':>7} {'delivered':>10} {'seconds':>8} {'deliver/s':>10} {'publish/s':>10}  per-worker deliver/s")
+    for workers in range(1, args.max_workers + 1):
+        per_worker, elapsed, publish_rate = run_round(workers, args.users, messages, args.publishers,
+                                                      args.queue, args.base_port)
+        delivered = sum(count for count, _ in per_worker.values())
+        rates = ' '.join(f"{count / seconds:.0f}" if seconds > 0 else '-'
+                         for count, seconds in (per_worker[i] for i in sorted(per_worker)))
+        print(f"{workers:>7} {delivered:>10} {elapsed:>8.2f} {delivered / elapsed:>10.0f} {publish_rate:>10.0f}  {rates}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,25 @@ from urllib.parse import unquote
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime
 from flask_socketio import SocketIO, emit, join_room, leave_room
+import threading
+import time
+import sys
+import json
+import base64
+import random
+import math
+import atexit
+import queue
+import os
+import gzip
+import hashlib
+import bisect
+import heapq
+# ✅ [추가] 여러 워커 실행 시 세션 정보를 공유할 Redis (없으면 단일 프로세스 모드만 사용)
+try:
+    import redis
+except ImportError:
+    redis = None
 
 # ❗ Firebase Admin SDK
 cred = credentials.Certificate("serviceAccountKey.json")
@@ -16,45 +35,631 @@ firebase_admin.initialize_app(cred, {
 })
 
 app = Flask(__name__)
-socketio = SocketIO(app)
-sid_to_user = {}
+
+# ✅ [추가] Socket.IO 메시지 큐
+# - None: 단일 프로세스 (기존 방식)
+# - 'redis://localhost:6379/0': 여러 워커가 Redis로 emit을 주고받고, 세션 정보도 Redis에 둔다
+# - 'memory://': kombu 메모리 큐. 한 프로세스 안에서 메시지 큐 경로를 시험할 때만 사용
+# 환경 변수 SOCKETIO_MESSAGE_QUEUE가 있으면 그 값을 쓴다 (bench/bench_socketio.py가 워커를 띄울 때 사용)
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None
+SESSION_HEARTBEAT_SECONDS = 10        # 워커가 Redis에 살아 있음을 알리는 주기
+SESSION_WORKER_TIMEOUT_SECONDS = 30   # 이 시간 동안 신호가 없는 워커는 죽은 것으로 보고 그 세션들을 지운다
+socketio = SocketIO(app, message_queue=SOCKETIO_MESSAGE_QUEUE)
+
+
+# ✅ [추가] sid ↔ 사용자 매핑. 한 사용자가 여러 기기/탭으로 접속할 수 있어서 세션 수도 함께 센다.
+class LocalSessionRegistry:
+    """한 프로세스 안에서만 쓰는 세션 목록"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sid_to_user = {}
+        self._user_sids = {}
+        self._announced = {}
+
+    def add(self, sid, user_id):
+        """세션을 등록하고 그 사용자의 세션 수를 반환"""
+        with self._lock:
+            self._sid_to_user[sid] = user_id
+            sids = self._user_sids.setdefault(user_id, set())
+            sids.add(sid)
+            return len(sids)
+
+    def remove(self, sid):
+        """세션을 지우고 (사용자, 남은 세션 수)를 반환. 모르는 sid면 (None, 0)"""
+        with self._lock:
+            user_id = self._sid_to_user.pop(sid, None)
+            if user_id is None:
+                return None, 0
+            sids = self._user_sids.get(user_id, set())
+            sids.discard(sid)
+            if not sids:
+                self._user_sids.pop(user_id, None)
+            return user_id, len(sids)
+
+    def user_of(self, sid):
+        return self._sid_to_user.get(sid)
+
+    def session_count(self, user_id):
+        return len(self._user_sids.get(user_id, ()))
+
+    def local_session_count(self, user_id):
+        """이 프로세스에 붙어 있는 세션 수 (단일 프로세스에서는 전체와 같다)"""
+        return self.session_count(user_id)
+
+    def swap_announced(self, user_id, is_online):
+        """마지막으로 알린 접속 상태를 바꾸고 이전 값을 돌려준다 (처음이면 None)"""
+        with self._lock:
+            previous = self._announced.get(user_id)
+            if is_online:
+                self._announced[user_id] = True
+            else:
+                self._announced.pop(user_id, None)
+            return previous
+
+
+class RedisSessionRegistry:
+    """모든 워커가 함께 보는 세션 목록 (Redis 해시 + 사용자별 set)
+
+    워커마다 자기 세션을 {prefix}:worker:<id> 해시에도 적어 두고 {prefix}:workers (sorted set)에 주기적으로 신호를 남긴다.
+    신호가 SESSION_WORKER_TIMEOUT_SECONDS 이상 끊긴 워커(비정상 종료)는 다른 워커가 찾아서 그 세션들을 지우고,
+    세션이 하나도 남지 않은 사용자는 on_orphaned(user_id)로 알린다.
+    """
+
+    def __init__(self, client, prefix='sns:sessions'):
+        self.client = client
+        self.prefix = prefix
+        self.worker_id = f"{os.getpid()}-{random.getrandbits(48):012x}"
+        self.on_orphaned = None
+        self._local = LocalSessionRegistry()  # 이 워커에 붙은 세션
+        self.stats = {'heartbeats': 0, 'pruned_workers': 0, 'pruned_sessions': 0}
+        # 접속이 하나도 없는 워커도 신호를 남기고 죽은 워커를 정리하도록 만들 때 바로 시작한다
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def _user_key(self, user_id):
+        return f"{self.prefix}:user:{user_id}"
+
+    def _worker_key(self, worker_id):
+        return f"{self.prefix}:worker:{worker_id}"
+
+    def add(self, sid, user_id):
+        self._local.add(sid, user_id)
+        pipe = self.client.pipeline()
+        pipe.zadd(f"{self.prefix}:workers", {self.worker_id: time.time()})
+        pipe.hset(self._worker_key(self.worker_id), sid, user_id)
+        pipe.hset(f"{self.prefix}:sid", sid, user_id)
+        pipe.sadd(self._user_key(user_id), sid)
+        pipe.scard(self._user_key(user_id))
+        return pipe.execute()[-1]
+
+    def remove(self, sid):
+        self._local.remove(sid)
+        user_id = self.user_of(sid)
+        if user_id is None:
+            return None, 0
+        pipe = self.client.pipeline()
+        pipe.hdel(self._worker_key(self.worker_id), sid)
+        pipe.hdel(f"{self.prefix}:sid", sid)
+        pipe.srem(self._user_key(user_id), sid)
+        pipe.scard(self._user_key(user_id))
+        return user_id, pipe.execute()[-1]
+
+    def user_of(self, sid):
+        user_id = self.client.hget(f"{self.prefix}:sid", sid)
+        if isinstance(user_id, bytes):
+            user_id = user_id.decode()
+        return user_id
+
+    def session_count(self, user_id):
+        return self.client.scard(self._user_key(user_id))
+
+    def local_session_count(self, user_id):
+        return self._local.session_count(user_id)
+
+    def swap_announced(self, user_id, is_online):
+        # 모든 워커가 같은 값을 보므로, 다른 워커가 이미 알린 상태는 다시 보내지 않는다
+        key = f"{self.prefix}:announced:{user_id}"
+        pipe = self.client.pipeline()
+        pipe.getset(key, '1' if is_online else '0')
+        pipe.expire(key, 86400)
+        previous = pipe.execute()[0]
+        return None if previous is None else previous == '1'
+
+    def _run(self):
+        while True:
+            try:
+                self.heartbeat()
+                for user_id in self.prune():
+                    if self.on_orphaned:
+                        self.on_orphaned(user_id)
+            except Exception as e:
+                print(f"세션 목록 정리 오류: {e}")
+            time.sleep(SESSION_HEARTBEAT_SECONDS)
+
+    def heartbeat(self):
+        self.client.zadd(f"{self.prefix}:workers", {self.worker_id: time.time()})
+        self.stats['heartbeats'] += 1
+
+    def prune(self):
+        """신호가 끊긴 워커의 세션을 지우고, 그 때문에 세션이 0개가 된 사용자 목록을 돌려준다"""
+        deadline = time.time() - SESSION_WORKER_TIMEOUT_SECONDS
+        orphaned = []
+        for worker_id in self.client.zrangebyscore(f"{self.prefix}:workers", '-inf', deadline):
+            # 여러 워커가 동시에 찾아도 ZREM에 성공한 한 곳만 정리한다
+            if not self.client.zrem(f"{self.prefix}:workers", worker_id):
+                continue
+            sessions = self.client.hgetall(self._worker_key(worker_id))
+            pipe = self.client.pipeline()
+            for sid, user_id in sessions.items():
+                pipe.hdel(f"{self.prefix}:sid", sid)
+                pipe.srem(self._user_key(user_id), sid)
+            pipe.delete(self._worker_key(worker_id))
+            pipe.execute()
+            for user_id in set(sessions.values()):
+                if self.session_count(user_id) == 0:
+                    orphaned.append(user_id)
+            self.stats['pruned_workers'] += 1
+            self.stats['pruned_sessions'] += len(sessions)
+        return orphaned
+
+
+def create_session_registry(message_queue):
+    """메시지 큐 설정에 맞는 세션 목록 생성"""
+    if message_queue and message_queue.startswith(('redis://', 'rediss://')):
+        if redis is None:
+            raise RuntimeError("SOCKETIO_MESSAGE_QUEUE에 Redis를 쓰려면 redis 패키지가 필요합니다.")
+        return RedisSessionRegistry(redis.Redis.from_url(message_queue, decode_responses=True))
+    return LocalSessionRegistry()
+
+session_registry = create_session_registry(SOCKETIO_MESSAGE_QUEUE)
+
+# ✅ [추가] DB 커넥션 풀 설정
+DB_CONFIG = dict(
+    host='localhost', port=3306, user='root',
+    password='1234', db='SNS', charset='utf8mb4',
+    cursorclass=pymysql.cursors.DictCursor
+)
+DB_POOL_SIZE = 20               # 동시에 열어둘 수 있는 최대 커넥션 수
+DB_POOL_TIMEOUT = 5             # 풀이 가득 찼을 때 커넥션을 기다리는 최대 시간(초)
+DB_POOL_MAX_LIFETIME = 1800     # 이 시간(초)보다 오래된 커넥션은 새로 만든다
+DB_POOL_PING_AFTER_IDLE = 30    # 이 시간(초) 이상 쉬었던 커넥션은 꺼낼 때 ping으로 확인
+
+
+class PoolTimeoutError(Exception):
+    """풀에서 DB_POOL_TIMEOUT 안에 커넥션을 얻지 못했을 때 발생"""
+
+
+class PooledConnection:
+    """pymysql 커넥션을 감싸서 close() 시 실제로 끊지 않고 풀에 반납하는 래퍼"""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._closed = False
+
+    def __getattr__(self, name):
+        # cursor(), commit(), rollback() 등은 실제 커넥션으로 그대로 위임
+        return getattr(self._raw, name)
+
+    def close(self):
+        # 기존 핸들러들이 finally에서 conn.close()를 부르므로 여러 번 불려도 안전해야 함
+        if self._closed:
+            return
+        self._closed = True
+        self._pool._release(self._raw, self._created_at)
+
+
+class ConnectionPool:
+    """크기가 제한된 MySQL 커넥션 풀 (체크아웃 시 헬스체크, 수명 초과 시 재생성)"""
+
+    def __init__(self, size, timeout, max_lifetime, ping_after_idle, **connect_kwargs):
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after_idle = ping_after_idle
+        self._connect_kwargs = connect_kwargs
+        self._idle = []  # (raw, created_at, returned_at)
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0, 'created': 0, 'recycled': 0, 'ping_failures': 0,
+            'timeouts': 0, 'in_use': 0,
+            'wait_total_ms': 0.0, 'wait_max_ms': 0.0,
+        }
+
+    def _connect(self):
+        raw = pymysql.connect(**self._connect_kwargs)
+        with self._lock:
+            self._stats['created'] += 1
+        return raw, time.monotonic()
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def get(self):
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeoutError(f"{self.timeout}초 안에 DB 커넥션을 얻지 못했습니다.")
+        waited_ms = (time.monotonic() - started) * 1000
+        try:
+            raw, created_at = self._checkout_idle()
+            if raw is None:
+                raw, created_at = self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['wait_total_ms'] += waited_ms
+            self._stats['wait_max_ms'] = max(self._stats['wait_max_ms'], waited_ms)
+        return PooledConnection(self, raw, created_at)
+
+    def _checkout_idle(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None, None
+                raw, created_at, returned_at = self._idle.pop()
+            now = time.monotonic()
+            if now - created_at > self.max_lifetime:
+                with self._lock:
+                    self._stats['recycled'] += 1
+                self._discard(raw)
+                continue
+            if now - returned_at > self.ping_after_idle:
+                try:
+                    raw.ping(reconnect=False)
+                except Exception:
+                    with self._lock:
+                        self._stats['ping_failures'] += 1
+                    self._discard(raw)
+                    continue
+            return raw, created_at
+
+    def _release(self, raw, created_at):
+        try:
+            # 커밋하지 않은 트랜잭션(읽기 전용 핸들러 포함)의 스냅샷이 다음 요청으로 넘어가지 않도록 정리
+            raw.rollback()
+            reusable = raw.open
+        except Exception:
+            reusable = False
+        with self._lock:
+            self._stats['in_use'] -= 1
+            if reusable:
+                self._idle.append((raw, created_at, time.monotonic()))
+        if not reusable:
+            self._discard(raw)
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['size'] = self.size
+        stats['wait_avg_ms'] = round(stats['wait_total_ms'] / stats['checkouts'], 3) if stats['checkouts'] else 0.0
+        stats['wait_total_ms'] = round(stats['wait_total_ms'], 3)
+        stats['wait_max_ms'] = round(stats['wait_max_ms'], 3)
+        return stats
+
+
+db_pool = ConnectionPool(
+    DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_MAX_LIFETIME, DB_POOL_PING_AFTER_IDLE, **DB_CONFIG
+)
+
+
 def get_connection():
-    return pymysql.connect(
-        host='localhost', port=3306, user='root',
-        password='1234', db='SNS', charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    # ✨ [수정] 매 요청마다 새로 연결하지 않고 풀에서 커넥션을 빌려온다 (close() 시 반납)
+    return db_pool.get()
+
+
+# ✅ [추가] 페이지네이션용 커서 인코딩/디코딩 (클라이언트에는 불투명한 문자열로 전달)
+def encode_cursor(*values):
+    raw = json.dumps([v.strftime('%Y-%m-%d %H:%M:%S') if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token, size):
+    """잘못된 커서면 ValueError를 발생시킨다"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError("잘못된 커서입니다.")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("잘못된 커서입니다.")
+    return values
+
+
+def get_page_size(default, maximum):
+    """?limit= 값을 1 ~ maximum 범위로 맞춰서 돌려준다"""
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, maximum))
+
+
+# ✅ [추가] 접속 상태(presence) 설정
+PRESENCE_GRACE_SECONDS = 10           # 마지막 세션이 끊긴 뒤 이 시간 안에 다시 들어오면 오프라인으로 바꾸지 않는다
+PRESENCE_FLUSH_INTERVAL_SECONDS = 5   # 바뀐 is_online/last_seen을 이 주기로 모아서 DB에 쓴다
+PRESENCE_COALESCE_SECONDS = 1.0       # 이 시간 안의 상태 변화는 마지막 것 하나만 보낸다 (온라인→오프라인→온라인이면 보내지 않음)
+PRESENCE_MAX_SUBSCRIPTIONS = 500      # subscribe_presence 한 번에 구독할 수 있는 최대 사용자 수
+
+
+# ✅ [추가] 접속/종료마다 DB를 갱신하지 않고 메모리에서 상태를 관리한 뒤 주기적으로 한 번에 반영한다
+# 여러 워커에서는 각 워커가 자기에게 세션이 있는(또는 유예 중인) 사용자만 메모리에 들고 있고,
+# 세션이 다른 워커에만 남으면 메모리에서 내린다. 그런 사용자의 상태는 워커들이 반영한 DB에서 읽는다.
+class PresenceTracker:
+    """user_id -> {'is_online', 'last_seen'} 를 들고 있는 접속 상태 관리자"""
+
+    def __init__(self):
+        self._users = {}
+        self._offline_at = {}  # user_id -> 오프라인으로 바꿀 시각 (time.monotonic 기준)
+        self._dirty = set()    # DB에 아직 쓰지 않은 사용자
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self.stats = {'connects': 0, 'disconnects': 0, 'debounced': 0, 'flushes': 0, 'flushed_users': 0, 'failures': 0}
+
+    def connect(self, user_id):
+        """접속 처리. 오프라인이었다가 온라인이 되었으면 True"""
+        with self._lock:
+            self.stats['connects'] += 1
+            if self._offline_at.pop(user_id, None) is not None:
+                # 유예 시간 안에 다시 접속: 상태 변화 없음
+                self.stats['debounced'] += 1
+            entry = self._users.get(user_id)
+            changed = not (entry and entry['is_online'])
+            self._users[user_id] = {'is_online': True, 'last_seen': datetime.now()}
+            self._dirty.add(user_id)
+        self._ensure_worker()
+        return changed
+
+    def disconnect(self, user_id):
+        """마지막 세션 종료. 유예 시간이 지나면 오프라인으로 바뀐다"""
+        with self._lock:
+            self.stats['disconnects'] += 1
+            entry = self._users.setdefault(user_id, {'is_online': True, 'last_seen': None})
+            entry['last_seen'] = datetime.now()
+            self._offline_at[user_id] = time.monotonic() + PRESENCE_GRACE_SECONDS
+        self._ensure_worker()
+
+    def forget(self, user_id):
+        """이 워커의 마지막 세션이 끊겼지만 다른 워커에 세션이 남아 있을 때. 상태는 그 워커가 관리한다"""
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._offline_at.pop(user_id, None)
+            self._dirty.discard(user_id)
+
+    def status(self, user_id):
+        """메모리에 있는 상태 (없으면 None → DB에서 읽는다)"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            return dict(entry) if entry else None
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(PRESENCE_FLUSH_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            try:
+                self.expire()
+                self.flush()
+            except Exception as e:
+                print(f"접속 상태 처리 오류: {e}")
+
+    def expire(self):
+        """유예 시간이 지난 사용자를 오프라인으로 바꾸고 상태 변경을 알린다"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [user_id for user_id, deadline in self._offline_at.items() if deadline <= now]
+        went_offline = []
+        for user_id in expired:
+            # 다른 워커에 세션이 남아 있으면(유예 중 다른 워커로 다시 접속) 여전히 온라인이고, 상태는 그 워커가 관리한다
+            still_connected = session_registry.session_count(user_id) > 0
+            with self._lock:
+                deadline = self._offline_at.get(user_id)
+                if deadline is None or deadline > now:
+                    continue  # 그 사이에 다시 접속했다
+                del self._offline_at[user_id]
+                if still_connected:
+                    if session_registry.local_session_count(user_id) == 0:
+                        self._users.pop(user_id, None)
+                        self._dirty.discard(user_id)
+                    continue
+                entry = self._users[user_id]
+                entry['is_online'] = False
+                self._dirty.add(user_id)
+                went_offline.append((user_id, entry['last_seen']))
+        for user_id, last_seen in went_offline:
+            announce_user_status(user_id, False, last_seen)
+        return len(went_offline)
+
+    def flush(self):
+        """바뀐 상태를 UPDATE 한 번으로 DB에 반영"""
+        with self._lock:
+            user_ids, self._dirty = list(self._dirty), set()
+            rows = [(user_id, self._users[user_id]) for user_id in user_ids]
+        if not rows:
+            return 0
+        conn = None
+        try:
+            conn = get_connection()
+            with conn.cursor() as cursor:
+                online_cases = ' '.join(['WHEN %s THEN %s'] * len(rows))
+                seen_cases = ' '.join(['WHEN %s THEN %s'] * len(rows))
+                params = [v for user_id, entry in rows for v in (user_id, entry['is_online'])]
+                params += [v for user_id, entry in rows for v in (user_id, entry['last_seen'])]
+                params += user_ids
+                cursor.execute(f"""
+                    UPDATE users
+                    SET is_online = CASE user_id {online_cases} END,
+                        last_seen = COALESCE(CASE user_id {seen_cases} END, last_seen)
+                    WHERE user_id IN ({','.join(['%s'] * len(user_ids))})
+                """, params)
+            conn.commit()
+            with self._lock:
+                self.stats['flushes'] += 1
+                self.stats['flushed_users'] += len(rows)
+                # DB에 반영된 오프라인 사용자는 메모리에서 내린다 (조회 시 DB에서 읽음)
+                for user_id in user_ids:
+                    entry = self._users.get(user_id)
+                    if entry and not entry['is_online'] and user_id not in self._dirty \
+                            and user_id not in self._offline_at:
+                        del self._users[user_id]
+            return len(rows)
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            print(f"접속 상태 DB 반영 오류 (다음 주기에 재시도): {e}")
+            with self._lock:
+                self.stats['failures'] += 1
+                self._dirty.update(user_ids)
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+
+presence = PresenceTracker()
+atexit.register(presence.flush)
+# 죽은 워커에 남아 있던 마지막 세션이 정리되면 일반 접속 종료처럼 유예 후 오프라인 처리한다
+session_registry.on_orphaned = presence.disconnect
+
+
+# ✅ [추가] 상태 변경은 모든 클라이언트가 아니라 presence:<user_id> 방을 구독한 소켓에게만 보낸다
+def presence_room(user_id):
+    return f"presence:{user_id}"
+
+
+class PresenceAnnouncer:
+    """짧은 시간 안의 상태 변화를 묶어서 마지막 상태만 보내는 전송기"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}    # user_id -> (is_online, last_seen)
+        self.stats = {'sent': 0, 'coalesced': 0}
+
+    def announce(self, user_id, is_online, last_seen=None):
+        with self._lock:
+            if user_id in self._pending:
+                self.stats['coalesced'] += 1
+            else:
+                socketio.start_background_task(self._flush_later, user_id)
+            self._pending[user_id] = (is_online, last_seen)
+
+    def _flush_later(self, user_id):
+        socketio.sleep(PRESENCE_COALESCE_SECONDS)
+        with self._lock:
+            is_online, last_seen = self._pending.pop(user_id)
+        # 마지막으로 알린 상태는 세션 목록(여러 워커면 Redis)에 두어서 워커가 달라도 같은 기준으로 판단한다
+        if session_registry.swap_announced(user_id, is_online) == is_online:
+            # 되돌아온 깜빡임이거나 다른 워커가 이미 알린 상태는 보내지 않는다
+            with self._lock:
+                self.stats['coalesced'] += 1
+            return
+        with self._lock:
+            self.stats['sent'] += 1
+        payload = {'user_id': user_id, 'is_online': is_online}
+        if last_seen is not None:
+            payload['last_seen'] = last_seen.strftime('%Y-%m-%d %H:%M:%S')
+        socketio.emit('user_status_changed', payload, to=presence_room(user_id))
+
+
+presence_announcer = PresenceAnnouncer()
+
+
+def announce_user_status(user_id, is_online, last_seen=None):
+    """접속 상태 변경을 그 사용자를 구독한 클라이언트에 알린다"""
+    presence_announcer.announce(user_id, is_online, last_seen)
+
+
+# 접속할 때마다 DB를 읽지 않도록 사용자별 채팅 상대 목록을 잠시 캐시한다
+PRESENCE_COUNTERPARTS_TTL_SECONDS = 600
+_counterparts_cache = {}  # user_id -> (만료 시각, 상대방 set)
+_counterparts_lock = threading.Lock()
+
+
+def _chat_counterparts(user_id):
+    """채팅방을 함께 쓰는 상대방 목록"""
+    now = time.monotonic()
+    with _counterparts_lock:
+        cached = _counterparts_cache.get(user_id)
+    if cached and cached[0] > now:
+        return list(cached[1])
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT DISTINCT other.user_id AS other_id
+                FROM chat_participants me
+                JOIN chat_participants other ON other.room_id = me.room_id AND other.user_id <> me.user_id
+                WHERE me.user_id = %s
+            """, (user_id,))
+            other_ids = {row['other_id'] for row in cursor.fetchall()}
+    finally:
+        conn.close()
+    with _counterparts_lock:
+        _counterparts_cache[user_id] = (now + PRESENCE_COUNTERPARTS_TTL_SECONDS, other_ids)
+    return list(other_ids)
+
+
+def remember_chat_counterparts(sender_id, receiver_id):
+    """새 대화 상대를 캐시에도 반영하고, 보낸 사람은 받는 사람의 상태를 구독한다"""
+    with _counterparts_lock:
+        for user_id, other_id in ((sender_id, receiver_id), (receiver_id, sender_id)):
+            cached = _counterparts_cache.get(user_id)
+            if cached:
+                cached[1].add(other_id)
+    join_room(presence_room(receiver_id))
+
+
+# ✅ [추가] 화면에 보이는 사용자(팔로워 목록 등)의 접속 상태를 받아보기 위한 구독
+@socketio.on('subscribe_presence')
+def on_subscribe_presence(data):
+    user_ids = ((data or {}).get('user_ids') or [])[:PRESENCE_MAX_SUBSCRIPTIONS]
+    for user_id in user_ids:
+        join_room(presence_room(user_id))
+    # 구독한 시점의 상태를 한 번 보내고, 그 뒤로는 변경만 user_status_changed로 받는다
+    if user_ids:
+        try:
+            emit('presence_snapshot', {'statuses': load_user_statuses(user_ids)})
+        except Exception as e:
+            print(f"접속 상태 스냅샷 오류: {e}")
+
+
+@socketio.on('unsubscribe_presence')
+def on_unsubscribe_presence(data):
+    user_ids = (data or {}).get('user_ids') or []
+    for user_id in user_ids[:PRESENCE_MAX_SUBSCRIPTIONS]:
+        leave_room(presence_room(user_id))
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print(f'클라이언트 접속 끊김: {request.sid}')
-    user_id = sid_to_user.pop(request.sid, None)
+    user_id, remaining = session_registry.remove(request.sid)
     if user_id:
         leave_room(user_id)
         print(f'사용자 {user_id} 가 자신의 방에서 나갔습니다.')
-        
-        # ✨ [수정] 접속 종료 시 DB 업데이트 및 상태 전파
-        last_seen_time = datetime.now()
-        conn = get_connection()
-        try:
-            with conn.cursor() as cursor:
-                sql = "UPDATE users SET is_online = FALSE, last_seen = %s WHERE user_id = %s"
-                cursor.execute(sql, (last_seen_time, user_id))
-                conn.commit()
-                print(f"사용자 {user_id} 오프라인 처리 완료.")
-            
-            # ✅ [추가] 모든 클라이언트에게 상태 변경 알림
-            emit('user_status_changed', {
-                'user_id': user_id,
-                'is_online': False,
-                'last_seen': last_seen_time.strftime('%Y-%m-%d %H:%M:%S')
-            }, broadcast=True)
 
-        except Exception as e:
-            print(f"접속 상태 업데이트 오류: {e}")
-        finally:
-            if conn: conn.close()
+        # ✨ [수정] 다른 기기(또는 다른 워커)에 남은 세션이 있으면 아직 온라인.
+        # 마지막 세션이면 유예 시간 뒤에 presence가 오프라인 처리와 DB 반영, 상태 전파를 한다.
+        if remaining == 0:
+            presence.disconnect(user_id)
+        elif session_registry.local_session_count(user_id) == 0:
+            # 이 워커의 세션만 끝났다: 남은 세션이 있는 워커가 상태를 관리하도록 메모리에서 내린다
+            presence.forget(user_id)
 
 # 안드로이드 앱에서 접속 직후, 자신의 user_id로 방에 들어오게 함
 @socketio.on('join')
@@ -67,30 +672,33 @@ def on_join(data):
 
     if user_id:
         join_room(user_id)
-        sid_to_user[request.sid] = user_id
+        session_registry.add(request.sid, user_id)
         print(f'사용자 {user_id} 가 자신의 방에 입장했습니다. (sid: {request.sid})')
-        
-        # ✨ [수정] 접속 시 DB 업데이트 및 상태 전파
-        conn = get_connection()
-        try:
-            with conn.cursor() as cursor:
-                sql = "UPDATE users SET is_online = TRUE, last_seen = NOW() WHERE user_id = %s"
-                cursor.execute(sql, (user_id,))
-                conn.commit()
 
-            # ✅ [추가] 모든 클라이언트에게 상태 변경 알림
-            emit('user_status_changed', {
-                'user_id': user_id,
-                'is_online': True
-            }, broadcast=True)
-                
+        # ✅ [추가] 채팅 상대방의 접속 상태는 자동으로 구독
+        # 클라이언트가 presence_user_ids로 목록을 보내면 그것을 쓰고, 아니면 (캐시된) 채팅 상대 목록을 쓴다
+        try:
+            other_ids = data.get('presence_user_ids') if isinstance(data, dict) else None
+            if not isinstance(other_ids, list):
+                other_ids = _chat_counterparts(user_id)
+            for other_id in other_ids[:PRESENCE_MAX_SUBSCRIPTIONS]:
+                join_room(presence_room(other_id))
         except Exception as e:
-            print(f"접속 상태 업데이트 오류: {e}")
-        finally:
-            if conn: conn.close()
+            print(f"접속 상태 구독 오류: {e}")
+
+        # ✨ [수정] DB는 presence가 주기적으로 반영하고, 실제로 오프라인 → 온라인이 된 경우에만 알린다
+        if presence.connect(user_id):
+            announce_user_status(user_id, True)
 
 @app.route('/user/status/<user_id>', methods=['GET'])
 def get_user_status(user_id):
+    # ✅ [추가] 메모리에 있는 접속 상태를 먼저 사용
+    status = presence.status(user_id)
+    if status:
+        if status.get('last_seen'):
+            status['last_seen'] = status['last_seen'].strftime('%Y-%m-%d %H:%M:%S')
+        return jsonify({"success": True, "status": status})
+
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
@@ -113,6 +721,432 @@ def get_user_status(user_id):
         return jsonify({"success": False, "message": "서버 오류"}), 500
     finally:
         if conn: conn.close()
+
+# ✅ [추가] 여러 사용자의 접속 상태를 한 번에 조회
+# body: {"user_ids": [...]} → {"success": True, "statuses": {user_id: {"is_online", "last_seen"}}}
+# 항목 형식은 /user/status/<user_id>의 status와 같고, 없는 사용자는 빠진다.
+PRESENCE_BATCH_MAX_USERS = 500
+
+@app.route('/user/status/batch', methods=['POST'])
+def get_user_status_batch():
+    data = request.get_json() or {}
+    user_ids = data.get('user_ids')
+    if not isinstance(user_ids, list) or not user_ids:
+        return jsonify({"success": False, "message": "user_ids가 필요합니다."}), 400
+    if len(user_ids) > PRESENCE_BATCH_MAX_USERS:
+        return jsonify({"success": False, "message": f"한 번에 최대 {PRESENCE_BATCH_MAX_USERS}명까지 조회할 수 있습니다."}), 400
+
+    try:
+        statuses = load_user_statuses(user_ids)
+    except Exception as e:
+        print(f"Error in /user/status/batch: {e}")
+        return jsonify({"success": False, "message": "서버 오류"}), 500
+    return jsonify({"success": True, "statuses": statuses})
+
+
+def load_user_statuses(user_ids):
+    """메모리에 있는 상태를 먼저 쓰고 나머지는 DB에서 한 번에 읽는다. 없는 사용자는 빠진다"""
+    statuses = {}
+    missing = []
+    for user_id in dict.fromkeys(user_ids):
+        status = presence.status(user_id)
+        if status:
+            statuses[user_id] = status
+        else:
+            missing.append(user_id)
+
+    if missing:
+        conn = get_connection()
+        try:
+            with conn.cursor() as cursor:
+                sql = f"SELECT user_id, is_online, last_seen FROM users WHERE user_id IN ({','.join(['%s'] * len(missing))})"
+                cursor.execute(sql, missing)
+                for row in cursor.fetchall():
+                    statuses[row['user_id']] = {'is_online': bool(row['is_online']), 'last_seen': row['last_seen']}
+        finally:
+            conn.close()
+
+    for status in statuses.values():
+        if status.get('last_seen'):
+            status['last_seen'] = status['last_seen'].strftime('%Y-%m-%d %H:%M:%S')
+    return statuses
+# ✅ [추가] 메시지 전달 이벤트 설정
+# 메시지 하나당 new_message / update_chat_list / update_unread_count 세 이벤트를 보내고
+# 클라이언트가 다시 HTTP로 목록과 개수를 받아가던 것을 chat_delivery 이벤트 하나로 합친다.
+# CHAT_EMIT_LEGACY_EVENTS는 chat_delivery를 모르는 예전 안드로이드 앱을 위한 임시 호환 스위치다.
+# 켜면 메시지 하나에 chat_delivery와 함께 기존 세 이벤트(new_message / update_chat_list / update_unread_count)도 보내
+# emit 수가 4배가 되므로 기본은 꺼 둔다. 예전 앱이 남아 있는 동안만 환경 변수 CHAT_EMIT_LEGACY_EVENTS=1로 켜고,
+# 최소 지원 버전을 chat_delivery를 쓰는 앱으로 올린 뒤에는 이 스위치와 legacy emit 코드를 함께 지운다.
+CHAT_EMIT_LEGACY_EVENTS = os.environ.get('CHAT_EMIT_LEGACY_EVENTS') == '1'
+CHAT_BATCH_WINDOW_MS = 0          # 0보다 크면 이 시간(ms) 동안 같은 수신자에게 가는 메시지를 모아서 한 번에 보낸다
+
+# ✅ [추가] 받는 사람 기준의 채팅 목록 한 줄 (GET /chat/rooms 응답의 항목과 같은 형태)
+def _chat_room_summary(cursor, room_id, viewer_id, other_id):
+    cursor.execute("""
+        SELECT
+            cr.room_id,
+            cr.last_message_id,
+            cr.last_message_content,
+            cr.last_message_at,
+            u.nickname AS other_user_nickname,
+            u.profile_image_url AS other_user_profile_url,
+            u.user_id AS other_user_id,
+            u.is_online AS other_user_is_online,
+            u.last_seen AS other_user_last_seen,
+            COALESCE(cp.unread_count, 0) AS unread_count
+        FROM chat_rooms cr
+        JOIN users u ON u.user_id = %s
+        LEFT JOIN chat_participants cp ON cp.room_id = cr.room_id AND cp.user_id = %s
+        WHERE cr.room_id = %s
+    """, (other_id, viewer_id, room_id))
+    room = cursor.fetchone()
+    if room:
+        if room.get('last_message_at'):
+            room['last_message_at'] = room['last_message_at'].strftime('%Y-%m-%d %H:%M:%S')
+        if room.get('other_user_last_seen'):
+            room['other_user_last_seen'] = room['other_user_last_seen'].strftime('%Y-%m-%d %H:%M:%S')
+    return room
+
+# ✅ [추가] 짧은 시간 동안 같은 수신자에게 가는 메시지를 모아 chat_delivery 하나로 보낸다
+class ChatDeliveryBatcher:
+    """수신자별 chat_delivery 이벤트 묶음 전송"""
+
+    def __init__(self, window_ms):
+        self.window_ms = window_ms
+        self._lock = threading.Lock()
+        self._pending = {}   # receiver_id -> 아직 보내지 않은 payload
+
+    def add(self, receiver_id, payload):
+        with self._lock:
+            batch = self._pending.get(receiver_id)
+            if batch is None:
+                self._pending[receiver_id] = payload
+                socketio.start_background_task(self._flush_later, receiver_id)
+                return
+            batch['messages'].extend(payload['messages'])
+            # 같은 방은 최신 요약 하나만 남긴다
+            rooms = {room['room_id']: room for room in batch['rooms']}
+            for room in payload['rooms']:
+                rooms[room['room_id']] = room
+            batch['rooms'] = list(rooms.values())
+            if 'unread_room_count' in payload:
+                batch['unread_room_count'] = payload['unread_room_count']
+
+    def _flush_later(self, receiver_id):
+        socketio.sleep(self.window_ms / 1000.0)
+        with self._lock:
+            payload = self._pending.pop(receiver_id, None)
+        if payload:
+            socketio.emit('chat_delivery', payload, to=receiver_id)
+
+chat_delivery_batcher = ChatDeliveryBatcher(CHAT_BATCH_WINDOW_MS)
+
+
+def deliver_chat(receiver_id, payload):
+    """chat_delivery 이벤트 전송 (묶음 전송 설정이 있으면 모아서)"""
+    if CHAT_BATCH_WINDOW_MS > 0:
+        chat_delivery_batcher.add(receiver_id, payload)
+    else:
+        socketio.emit('chat_delivery', payload, to=receiver_id)
+
+
+# ✅ [추가] 비동기 메시지 저장 설정
+# True면 메시지에 id만 먼저 붙여 저장 큐에 넣고, 저장은 백그라운드 큐가 묶어서(group commit) 한다.
+# 저장(커밋)이 끝난 메시지만 보낸 사람에게 message_ack, 받는 사람에게 메시지/방 요약/안 읽은 수가 담긴
+# chat_delivery로 보내므로, 받는 사람이 /chat/sync에 없는 메시지를 보게 되는 일이 없다 (지연은 최대 CHAT_PERSIST_MAX_DELAY_MS 정도).
+# 여러 워커를 띄울 때는 모든 워커가 같은 모드를 써야 한다 (AUTO_INCREMENT와 블록 할당이 섞이면 id가 겹칠 수 있음).
+# message_id는 방 안의 순서이자 동기화/읽음 기준이므로 모든 워커가 하나의 증가하는 값에서 받아야 한다.
+# - 단일 프로세스: DB에서 구간을 예약해 두고 메모리에서 나눠준다
+# - Redis 메시지 큐: Redis INCR로 메시지마다 받는다
+# - 그 밖의 메시지 큐(여러 워커): DB 시퀀스에서 메시지마다 받는다
+CHAT_ASYNC_PERSIST = False
+CHAT_ID_BLOCK_SIZE = 1000         # 단일 프로세스일 때 message_id를 DB에서 한 번에 이만큼씩 예약
+CHAT_PERSIST_QUEUE_SIZE = 10000   # 저장 대기 큐 크기
+CHAT_PERSIST_BACKPRESSURE_SECONDS = 5  # 큐가 가득 차면 핸들러가 이 시간까지 기다린다 (순서를 지키려고 직접 저장하지 않음). 넘으면 message_failed
+CHAT_PERSIST_BATCH_SIZE = 200     # 한 트랜잭션에 저장할 최대 메시지 수
+CHAT_PERSIST_MAX_DELAY_MS = 20    # 첫 메시지를 받은 뒤 묶음을 채우려고 기다리는 최대 시간
+CHAT_PERSIST_MAX_RETRIES = 3      # 저장 실패 시 재시도 횟수 (넘으면 보낸 사람에게 message_failed, 받는 사람에게는 보내지 않음)
+
+
+class MessageIdAllocator:
+    """id_sequences 테이블에서 message_id 구간을 예약해 두고 메모리에서 하나씩 나눠준다"""
+
+    def __init__(self, name='messages', block_size=CHAT_ID_BLOCK_SIZE):
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def next_id(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._reserve_block()
+            message_id = self._next
+            self._next += 1
+            return message_id
+
+    def _reserve_block(self):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT next_id FROM id_sequences WHERE name = %s FOR UPDATE", (self.name,))
+                row = cursor.fetchone()
+                # 동기 모드(AUTO_INCREMENT)로 저장된 메시지보다 뒤에서 시작한다
+                cursor.execute("SELECT COALESCE(MAX(message_id), 0) + 1 AS floor_id FROM messages")
+                start = max(row['next_id'] if row else 1, cursor.fetchone()['floor_id'])
+                cursor.execute(
+                    "INSERT INTO id_sequences (name, next_id) VALUES (%s, %s) ON DUPLICATE KEY UPDATE next_id = VALUES(next_id)",
+                    (self.name, start + self.block_size)
+                )
+            conn.commit()
+            return start, start + self.block_size
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+class RedisMessageIdAllocator:
+    """모든 워커가 함께 쓰는 Redis 카운터에서 message_id를 하나씩 받는다"""
+
+    def __init__(self, client, key='sns:ids:messages'):
+        self.client = client
+        self.key = key
+        self._initialized = False
+
+    def next_id(self):
+        if not self._initialized:
+            # 카운터가 없으면(처음 또는 Redis 초기화 후) 이미 저장된 메시지 뒤에서 시작한다
+            if not self.client.exists(self.key):
+                conn = get_connection()
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT COALESCE(MAX(message_id), 0) AS max_id FROM messages")
+                        self.client.set(self.key, cursor.fetchone()['max_id'], nx=True)
+                finally:
+                    conn.close()
+            self._initialized = True
+        return self.client.incr(self.key)
+
+
+def create_message_id_allocator(message_queue):
+    """메시지 큐 설정에 맞는 message_id 할당기 생성"""
+    if message_queue and message_queue.startswith(('redis://', 'rediss://')) and redis is not None:
+        return RedisMessageIdAllocator(redis.Redis.from_url(message_queue, decode_responses=True))
+    if message_queue:
+        return MessageIdAllocator(block_size=1)
+    return MessageIdAllocator()
+
+
+def _persist_chat_messages(cursor, messages):
+    """메시지 여러 개를 한 트랜잭션에서 저장 (호출한 쪽에서 커밋)"""
+    messages = sorted(messages, key=lambda m: m['message_id'])
+    cursor.executemany(
+        "INSERT INTO messages (message_id, room_id, sender_id, receiver_id, M_content, send_at) VALUES (%s, %s, %s, %s, %s, %s)",
+        [(m['message_id'], m['room_id'], m['sender_id'], m['receiver_id'], m['content'], m['send_at']) for m in messages]
+    )
+
+    # 방마다 가장 최근 메시지로 한 번만 갱신. 순서가 뒤바뀌어 저장되어도 더 최신 값을 덮지 않는다.
+    latest = {}
+    for m in messages:
+        if m['room_id'] not in latest or m['message_id'] > latest[m['room_id']]['message_id']:
+            latest[m['room_id']] = m
+    cursor.executemany(
+        """UPDATE chat_rooms SET last_message_id = %s, last_message_content = %s, last_message_at = %s
+           WHERE room_id = %s AND last_message_id < %s""",
+        [(m['message_id'], m['content'], m['send_at'], room_id, m['message_id']) for room_id, m in latest.items()]
+    )
+
+    # 동기 경로와 같이 보낸 사람을 뺀 방 멤버 전체의 안 읽은 수를 올린다 (방·보낸 사람별로 한 번씩)
+    sent = {}
+    for m in messages:
+        key = (m['room_id'], m['sender_id'])
+        sent[key] = sent.get(key, 0) + 1
+    cursor.executemany(
+        "UPDATE chat_participants SET unread_count = unread_count + %s * (user_id <> %s) WHERE room_id = %s",
+        [(count, sender_id, room_id) for (room_id, sender_id), count in sent.items()]
+    )
+    # 방 멤버 전체의 채팅 목록 정렬 시각
+    cursor.executemany(
+        """UPDATE chat_participants SET last_message_at = %s
+           WHERE room_id = %s AND (last_message_at IS NULL OR last_message_at < %s)""",
+        [(m['send_at'], room_id, m['send_at']) for room_id, m in latest.items()]
+    )
+
+
+def _notify_persisted(cursor, messages):
+    """저장이 끝난 메시지의 보낸 사람에게 ack, 받는 사람에게 메시지와 방 요약, 안 읽은 방 개수를 보낸다"""
+    acks = {}
+    for m in messages:
+        acks.setdefault(m['sender_id'], []).append(
+            {'message_id': m['message_id'], 'room_id': m['room_id'], 'client_msg_id': m.get('client_msg_id')}
+        )
+    for sender_id, items in acks.items():
+        socketio.emit('message_ack', {'messages': items}, to=sender_id)
+
+    rooms_by_receiver = {}
+    payloads_by_receiver = {}
+    for m in sorted(messages, key=lambda m: m['message_id']):
+        rooms_by_receiver.setdefault(m['receiver_id'], {})[m['room_id']] = m['sender_id']
+        payloads_by_receiver.setdefault(m['receiver_id'], []).append(m['payload'])
+    for receiver_id, rooms in rooms_by_receiver.items():
+        summaries = [_chat_room_summary(cursor, room_id, receiver_id, sender_id) for room_id, sender_id in rooms.items()]
+        cursor.execute(
+            "SELECT COUNT(*) AS unread_room_count FROM chat_participants WHERE user_id = %s AND unread_count > 0",
+            (receiver_id,)
+        )
+        deliver_chat(receiver_id, {
+            'messages': payloads_by_receiver[receiver_id],
+            'rooms': [room for room in summaries if room],
+            'unread_room_count': cursor.fetchone()['unread_room_count'],
+        })
+        if CHAT_EMIT_LEGACY_EVENTS:
+            for payload in payloads_by_receiver[receiver_id]:
+                socketio.emit('new_message', payload, to=receiver_id)
+            for room_id in rooms:
+                socketio.emit('update_chat_list', {'room_id': room_id}, to=receiver_id)
+            socketio.emit('update_unread_count', to=receiver_id)
+
+
+# 다시 시도해도 같은 결과인 행 단위 오류 (중복 키, 잘못된 값 등)
+_BAD_ROW_ERRORS = (pymysql.err.IntegrityError, pymysql.err.DataError)
+
+
+def notify_message_failed(message):
+    """저장하지 못한 메시지를 보낸 사람에게 알린다 (받는 사람에게는 저장된 뒤에만 보내므로 알릴 것이 없다)"""
+    socketio.emit('message_failed', {
+        'message_id': message.get('message_id'), 'room_id': message.get('room_id'),
+        'client_msg_id': message.get('client_msg_id')
+    }, to=message['sender_id'])
+
+
+class ChatPersistQueue:
+    """메시지 저장 대기 큐와 묶음 저장(group commit) 스레드"""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=CHAT_PERSIST_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._worker = None
+        self.stats = {
+            'enqueued': 0, 'persisted': 0, 'batches': 0, 'backpressure': 0, 'retries': 0, 'split_batches': 0, 'failed': 0,
+            'flush_ms_avg': 0.0, 'flush_ms_max': 0.0, 'latency_ms_max': 0.0,
+        }
+
+    def submit(self, message):
+        """큐에 넣는다. 가득 차 있으면 CHAT_PERSIST_BACKPRESSURE_SECONDS까지 기다리고, 그래도 못 넣으면 False
+
+        큐를 건너뛰고 직접 저장하면 먼저 받은 id의 메시지보다 먼저 커밋되어 동기화에서 빠질 수 있으므로 기다린다.
+        """
+        message['queued_at'] = time.monotonic()
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            with self._lock:
+                self.stats['backpressure'] += 1
+            try:
+                self._queue.put(message, timeout=CHAT_PERSIST_BACKPRESSURE_SECONDS)
+            except queue.Full:
+                with self._lock:
+                    self.stats['failed'] += 1
+                return False
+        with self._lock:
+            self.stats['enqueued'] += 1
+        return True
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, daemon=True)
+                    self._worker.start()
+
+    def _take_batch(self, timeout=None):
+        batch = [self._queue.get(timeout=timeout)]
+        deadline = time.monotonic() + CHAT_PERSIST_MAX_DELAY_MS / 1000.0
+        while len(batch) < CHAT_PERSIST_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            self.write(self._take_batch())
+
+    def drain(self):
+        """남은 메시지를 모두 저장 (종료 시)"""
+        while True:
+            try:
+                batch = self._take_batch(timeout=0.01)
+            except queue.Empty:
+                return
+            self.write(batch)
+
+    def write(self, messages):
+        for attempt in range(CHAT_PERSIST_MAX_RETRIES + 1):
+            conn = None
+            started = time.monotonic()
+            error = None
+            try:
+                conn = get_connection()
+                with conn.cursor() as cursor:
+                    _persist_chat_messages(cursor, messages)
+                    conn.commit()
+                    self._record_flush(messages, started)
+                    try:
+                        _notify_persisted(cursor, messages)
+                    except Exception as e:
+                        print(f"메시지 저장 알림 오류: {e}")
+                return True
+            except Exception as e:
+                if conn:
+                    conn.rollback()
+                print(f"메시지 묶음 저장 오류 ({attempt + 1}회): {e}")
+                error = e
+            finally:
+                if conn:
+                    conn.close()
+            # 커넥션을 풀에 돌려준 뒤에 나눠 저장하거나 기다렸다가 다시 시도한다
+            if len(messages) > 1 and isinstance(error, _BAD_ROW_ERRORS):
+                # 잘못된 행 하나 때문에 묶음 전체를 실패시키지 않도록 하나씩 다시 저장한다
+                with self._lock:
+                    self.stats['split_batches'] += 1
+                return all([self.write([m]) for m in messages])
+            with self._lock:
+                self.stats['retries'] += 1
+            time.sleep(min(0.1 * 2 ** attempt, 2))
+        with self._lock:
+            self.stats['failed'] += len(messages)
+        for m in messages:
+            notify_message_failed(m)
+        return False
+
+    def _record_flush(self, messages, started):
+        now = time.monotonic()
+        flush_ms = (now - started) * 1000
+        with self._lock:
+            self.stats['batches'] += 1
+            self.stats['persisted'] += len(messages)
+            batches = self.stats['batches']
+            self.stats['flush_ms_avg'] += (flush_ms - self.stats['flush_ms_avg']) / batches
+            self.stats['flush_ms_max'] = max(self.stats['flush_ms_max'], flush_ms)
+            oldest = min(m['queued_at'] for m in messages)
+            self.stats['latency_ms_max'] = max(self.stats['latency_ms_max'], (now - oldest) * 1000)
+
+
+message_id_allocator = create_message_id_allocator(SOCKETIO_MESSAGE_QUEUE)
+chat_persist_queue = ChatPersistQueue()
+atexit.register(chat_persist_queue.drain)
+
+
 # 1:1 메시지를 처리하는 핸들러
 @socketio.on('private_message')
 def handle_private_message(data):
@@ -124,29 +1158,66 @@ def handle_private_message(data):
     if not all([room_id, sender_id, receiver_id, content]):
         return
 
+    if CHAT_ASYNC_PERSIST:
+        _handle_private_message_async(data)
+        return
+
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # 1. messages 테이블에 메시지 저장 (is_read는 기본값 FALSE로 저장됨)
+            # 1. messages 테이블에 메시지 저장 (읽음 여부는 chat_participants.last_read_message_id로 판단)
             sql = "INSERT INTO messages (room_id, sender_id, receiver_id, M_content) VALUES (%s, %s, %s, %s)"
             cursor.execute(sql, (room_id, sender_id, receiver_id, content))
 
             new_message_id = cursor.lastrowid
             data['message_id'] = new_message_id
             # 2. chat_rooms 테이블에 마지막 메시지 정보 업데이트
-            sql_update = "UPDATE chat_rooms SET last_message_content = %s, last_message_at = NOW() WHERE room_id = %s"
-            cursor.execute(sql_update, (content, room_id))
+            sql_update = "UPDATE chat_rooms SET last_message_id = %s, last_message_content = %s, last_message_at = NOW() WHERE room_id = %s"
+            cursor.execute(sql_update, (new_message_id, content, room_id))
+
+            # ✨ [수정] 3. 방 멤버 전체의 채팅 목록 정렬 시각을 갱신하고, 보낸 사람을 뺀 멤버의 안 읽은 수 증가
+            sql_members = """
+                UPDATE chat_participants
+                SET last_message_at = NOW(), unread_count = unread_count + (user_id <> %s)
+                WHERE room_id = %s
+            """
+            cursor.execute(sql_members, (sender_id, room_id))
+
+            # ✅ [추가] 4. 받는 사람에게 보낼 방 요약과 안 읽은 방 개수를 같은 트랜잭션에서 읽는다
+            cursor.execute("SELECT send_at FROM messages WHERE message_id = %s", (new_message_id,))
+            row = cursor.fetchone()
+            if row and row.get('send_at'):
+                data['send_at'] = row['send_at'].strftime('%Y-%m-%d %H:%M:%S')
+            room = _chat_room_summary(cursor, room_id, receiver_id, sender_id)
+            cursor.execute(
+                "SELECT COUNT(*) AS unread_room_count FROM chat_participants WHERE user_id = %s AND unread_count > 0",
+                (receiver_id,)
+            )
+            unread_room_count = cursor.fetchone()['unread_room_count']
             
             conn.commit()
             print("Message saved and room updated.")
-        
-        # 받는 사람의 채팅방(ChatRoomActivity)으로 실시간 메시지 전송
-        emit('new_message', data, room=receiver_id)
-        
-        # ✨ [추가] 받는 사람의 채팅 목록(MessageActivity)에 업데이트 신호 전송
-        emit('update_chat_list', {'room_id': room_id}, room=receiver_id)
 
-        emit('update_unread_count', room=receiver_id)
+        # ✨ [수정] 메시지, 채팅 목록 한 줄, 안 읽은 방 개수를 chat_delivery 하나로 전송
+        deliver_chat(receiver_id, {
+            'messages': [data],
+            'rooms': [room] if room else [],
+            'unread_room_count': unread_room_count,
+        })
+        # ✅ [추가] 보낸 사람에게 저장 완료 알림
+        emit('message_ack', {'messages': [
+            {'message_id': new_message_id, 'room_id': room_id, 'client_msg_id': data.get('client_msg_id')}
+        ]}, room=sender_id)
+
+        # ✅ [추가] 새로 대화를 시작한 상대의 접속 상태도 받아보도록 구독
+        remember_chat_counterparts(sender_id, receiver_id)
+
+        if CHAT_EMIT_LEGACY_EVENTS:
+            # 받는 사람의 채팅방(ChatRoomActivity)으로 실시간 메시지 전송
+            emit('new_message', data, room=receiver_id)
+            # 받는 사람의 채팅 목록(MessageActivity)에 업데이트 신호 전송
+            emit('update_chat_list', {'room_id': room_id}, room=receiver_id)
+            emit('update_unread_count', room=receiver_id)
         
     except Exception as e:
         if conn: conn.rollback()
@@ -154,29 +1225,49 @@ def handle_private_message(data):
     finally:
         if conn: conn.close()
 
+
+# ✅ [추가] 비동기 저장 모드: id를 붙여 저장 큐에 맡기고, 받는 사람에게는 저장된 뒤에 전달한다
+def _handle_private_message_async(data):
+    try:
+        message_id = message_id_allocator.next_id()
+    except Exception as e:
+        print(f"메시지 id 할당 오류: {e}")
+        notify_message_failed(data)
+        return
+    send_at = datetime.now()
+    data['message_id'] = message_id
+    data['send_at'] = send_at.strftime('%Y-%m-%d %H:%M:%S')
+
+    # 받는 사람에게는 저장이 끝난 뒤 _notify_persisted가 메시지와 방 요약, 안 읽은 수를 함께 보낸다
+    # (큐가 계속 가득 차 있으면 보낸 사람에게 message_failed)
+    queued = chat_persist_queue.submit({
+        'message_id': message_id,
+        'room_id': data['room_id'],
+        'sender_id': data['sender_id'],
+        'receiver_id': data['receiver_id'],
+        'content': data['content'],
+        'send_at': send_at,
+        'client_msg_id': data.get('client_msg_id'),
+        'payload': data,
+    })
+    if not queued:
+        notify_message_failed(data)
+        return
+    remember_chat_counterparts(data['sender_id'], data['receiver_id'])
+
 @app.route('/chat/unread-room-count/<user_id>', methods=['GET'])
 def get_unread_room_count(user_id):
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # 사용자가 참여하고 있는 각 채팅방의 안 읽은 메시지 수를 계산한 후,
-            # 그 수가 0보다 큰 방의 개수를 세는 쿼리
+            # ✨ [수정] 메시지를 매번 세지 않고, 방별로 유지되는 안 읽은 수 카운터에서
+            # 0보다 큰 방의 개수만 (user_id, unread_count) 인덱스로 센다
             sql = """
-                SELECT COUNT(T.room_id) as unread_room_count
-                FROM (
-                    SELECT
-                        cr.room_id,
-                        (SELECT COUNT(*) FROM messages m
-                         WHERE m.room_id = cr.room_id
-                         AND m.receiver_id = %s
-                         AND m.send_at > IF(cr.user1_id = %s, cr.user1_last_read_at, cr.user2_last_read_at)
-                        ) as unread_messages
-                    FROM chat_rooms cr
-                    WHERE cr.user1_id = %s OR cr.user2_id = %s
-                ) AS T
-                WHERE T.unread_messages > 0
+                SELECT COUNT(*) as unread_room_count
+                FROM chat_participants
+                WHERE user_id = %s AND unread_count > 0
             """
-            cursor.execute(sql, (user_id, user_id, user_id, user_id))
+            cursor.execute(sql, (user_id,))
             result = cursor.fetchone()
             count = result['unread_room_count'] if result else 0
             return jsonify({"success": True, "unread_room_count": count})
@@ -188,6 +1279,24 @@ def get_unread_room_count(user_id):
         if conn: conn.close()
 
 
+# ✅ [추가] 읽음 처리: 참여자의 last_read_message_id를 방의 마지막 메시지까지 올리고 안 읽은 수를 0으로.
+# 읽은 메시지 수와 상관없이 chat_participants 한 행만 갱신한다. 참여자가 아니면 None.
+def mark_room_read(cursor, room_id, user_id):
+    """채팅방을 끝까지 읽음 처리하고 워터마크를 반환"""
+    cursor.execute("""
+        UPDATE chat_participants
+        SET unread_count = 0,
+            last_read_message_id = GREATEST(last_read_message_id,
+                COALESCE((SELECT MAX(message_id) FROM messages WHERE room_id = %s), 0))
+        WHERE room_id = %s AND user_id = %s
+    """, (room_id, room_id, user_id))
+    cursor.execute(
+        "SELECT last_read_message_id FROM chat_participants WHERE room_id = %s AND user_id = %s",
+        (room_id, user_id)
+    )
+    row = cursor.fetchone()
+    return row['last_read_message_id'] if row else None
+
 @socketio.on('message_read')
 def handle_message_read(data):
     room_id = data.get('room_id')
@@ -200,24 +1309,12 @@ def handle_message_read(data):
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # 1. 해당 채팅방에서 수신자가 아직 안 읽은 모든 메시지를 '읽음'으로 변경
-            sql = "UPDATE messages SET is_read = TRUE WHERE room_id = %s AND receiver_id = %s AND is_read = FALSE"
-            cursor.execute(sql, (room_id, reader_id))
-            
-            # ✨ [수정] chat_rooms 테이블의 마지막 읽은 시간도 지금 시간으로 갱신
-            # 이 코드가 실시간 대화 후 '안읽음'이 남는 문제를 해결합니다.
-            cursor.execute("SELECT user1_id FROM chat_rooms WHERE room_id = %s", (room_id,))
-            room_info = cursor.fetchone()
-            if room_info and room_info['user1_id'] == reader_id:
-                update_sql = "UPDATE chat_rooms SET user1_last_read_at = NOW() WHERE room_id = %s"
-            else:
-                update_sql = "UPDATE chat_rooms SET user2_last_read_at = NOW() WHERE room_id = %s"
-            cursor.execute(update_sql, (room_id,))
-            
+            # ✨ [수정] 1. 메시지 행마다 is_read를 바꾸지 않고, 읽은 위치(워터마크)만 한 행 갱신
+            last_read_message_id = mark_room_read(cursor, room_id, reader_id)
             conn.commit()
             
         # 2. 메시지를 보냈던 원조 송신자에게 "네 메시지 상대가 다 읽었어" 라고 알려줌
-        emit('messages_were_read', {'room_id': room_id}, room=sender_id)
+        emit('messages_were_read', {'room_id': room_id, 'last_read_message_id': last_read_message_id}, room=sender_id)
         print(f"사용자 {reader_id}가 채팅방 {room_id}의 메시지를 읽었습니다. {sender_id}에게 알림 전송.")
 
     except Exception as e:
@@ -247,6 +1344,7 @@ def start_or_get_chat_room():
     try:
         with conn.cursor() as cursor:
             # 기존에 채팅방이 있는지 확인
+            # (1:1 방은 정렬된 (user1_id, user2_id) 쌍이 고유 키라서 한 번의 인덱스 조회로 찾는다)
             sql = "SELECT room_id FROM chat_rooms WHERE user1_id = %s AND user2_id = %s"
             cursor.execute(sql, (user1, user2))
             room = cursor.fetchone()
@@ -257,8 +1355,13 @@ def start_or_get_chat_room():
                 # 없으면 새로 생성
                 sql = "INSERT INTO chat_rooms (user1_id, user2_id, last_message_at) VALUES (%s, %s, NOW())"
                 cursor.execute(sql, (user1, user2))
-                conn.commit()
                 room_id = cursor.lastrowid
+                # ✅ [추가] 두 참여자를 채팅방 멤버로 등록 (채팅 목록 정렬 시각, 안 읽은 수 포함)
+                cursor.execute(
+                    "INSERT IGNORE INTO chat_participants (room_id, user_id, unread_count, last_message_at) VALUES (%s, %s, 0, NOW()), (%s, %s, 0, NOW())",
+                    (room_id, user1, room_id, user2)
+                )
+                conn.commit()
 
             return jsonify({"success": True, "room_id": room_id})
     except Exception as e:
@@ -267,38 +1370,56 @@ def start_or_get_chat_room():
     finally:
         if conn: conn.close()
 
+# ✅ [추가] 채팅 목록의 각 방에 다른 참여자 정보를 붙인다 (방 개수와 상관없이 쿼리 한 번)
+# participant_ids에는 나를 뺀 모든 참여자가 들어가고, other_user_*는 그중 첫 번째 참여자 기준이다.
+def attach_room_members(cursor, rooms, viewer_id):
+    if not rooms:
+        return rooms
+    room_ids = [room['room_id'] for room in rooms]
+    cursor.execute(f"""
+        SELECT cp.room_id, u.user_id, u.nickname, u.profile_image_url, u.is_online, u.last_seen
+        FROM chat_participants cp
+        JOIN users u ON u.user_id = cp.user_id
+        WHERE cp.room_id IN ({','.join(['%s'] * len(room_ids))}) AND cp.user_id <> %s
+        ORDER BY cp.room_id, cp.user_id
+    """, room_ids + [viewer_id])
+    members = {}
+    for row in cursor.fetchall():
+        members.setdefault(row['room_id'], []).append(row)
+    for room in rooms:
+        others = members.get(room['room_id'], [])
+        first = others[0] if others else {}
+        room['other_user_nickname'] = first.get('nickname')
+        room['other_user_profile_url'] = first.get('profile_image_url')
+        room['other_user_id'] = first.get('user_id')
+        room['other_user_is_online'] = first.get('is_online')
+        room['other_user_last_seen'] = first.get('last_seen')
+        room['participant_ids'] = [member['user_id'] for member in others]
+    return rooms
+
 # [추가] 2. 특정 사용자의 모든 채팅방 목록을 가져오는 API
 @app.route('/chat/rooms/<user_id>', methods=['GET'])
 def get_chat_rooms(user_id):
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # ✨ [수정] SQL 쿼리에 unread_count 계산 로직 추가
-            # messages 테이블에서 is_read가 FALSE이고, 받는 사람이 나(user_id)인 메시지의 수를 셉니다.
+            # ✨ [수정] 내 멤버십 행을 (user_id, last_message_at) 인덱스로 한 번에 훑고,
+            # 상대방 정보는 방 목록에 대해 한 번에 붙인다
             sql = """
                 SELECT
                     cr.room_id,
+                    cr.last_message_id,
                     cr.last_message_content,
                     cr.last_message_at,
-                    IF(cr.user1_id = %s, u2.nickname, u1.nickname) AS other_user_nickname,
-                    IF(cr.user1_id = %s, u2.profile_image_url, u1.profile_image_url) AS other_user_profile_url,
-                    IF(cr.user1_id = %s, u2.user_id, u1.user_id) AS other_user_id,
-                    IF(cr.user1_id = %s, u2.is_online, u1.is_online) AS other_user_is_online,
-                    IF(cr.user1_id = %s, u2.last_seen, u1.last_seen) AS other_user_last_seen,
-                    (
-                        SELECT COUNT(*) FROM messages m 
-                        WHERE m.room_id = cr.room_id 
-                        AND m.receiver_id = %s 
-                        AND m.send_at > IF(cr.user1_id = %s, cr.user1_last_read_at, cr.user2_last_read_at)
-                    ) as unread_count
-                FROM chat_rooms cr
-                JOIN users u1 ON cr.user1_id = u1.user_id
-                JOIN users u2 ON cr.user2_id = u2.user_id
-                WHERE cr.user1_id = %s OR cr.user2_id = %s
-                ORDER BY cr.last_message_at DESC
+                    cp.unread_count
+                FROM chat_participants cp
+                JOIN chat_rooms cr ON cr.room_id = cp.room_id
+                WHERE cp.user_id = %s
+                ORDER BY cp.last_message_at DESC
             """
-            cursor.execute(sql, (user_id, user_id, user_id, user_id, user_id, user_id, user_id, user_id, user_id))
+            cursor.execute(sql, (user_id,))
             rooms = cursor.fetchall()
+            attach_room_members(cursor, rooms, user_id)
 
             for room in rooms:
                 if room.get('last_message_at'):
@@ -325,50 +1446,168 @@ def mark_as_read(room_id):
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("SELECT user1_id FROM chat_rooms WHERE room_id = %s", (room_id,))
-            room_info = cursor.fetchone()
-            if not room_info:
+            # ✨ [수정] 읽은 위치(워터마크) 한 행만 갱신
+            last_read_message_id = mark_room_read(cursor, room_id, viewer_id)
+            if last_read_message_id is None:
                 return jsonify({"success": False, "message": "채팅방이 없습니다."}), 404
-            
-            if room_info['user1_id'] == viewer_id:
-                update_sql = "UPDATE chat_rooms SET user1_last_read_at = NOW() WHERE room_id = %s"
-            else:
-                update_sql = "UPDATE chat_rooms SET user2_last_read_at = NOW() WHERE room_id = %s"
-            
-            cursor.execute(update_sql, (room_id,))
             conn.commit()
-            return jsonify({"success": True, "message": "모든 메시지를 읽음 처리했습니다."})
+            return jsonify({"success": True, "message": "모든 메시지를 읽음 처리했습니다.", "last_read_message_id": last_read_message_id})
     except Exception as e:
         if conn: conn.rollback()
         print(f"읽음 처리 오류: {e}")
         return jsonify({"success": False, "message": "서버 오류"}), 500
     finally:
         if conn: conn.close()
+CHAT_PAGE_SIZE = 50
+CHAT_MAX_PAGE_SIZE = 200
+
+# ✨ [수정] 전체 대화 대신 (room_id, message_id) 인덱스로 한 페이지씩 가져온다
+# - 파라미터 없음: 가장 최근 메시지 limit개
+# - before_message_id: 그보다 오래된 메시지 limit개 (위로 스크롤)
+# - after_message_id: 그 이후의 메시지 limit개
+# 응답의 messages는 항상 오래된 순이고, has_more는 같은 방향으로 더 불러올 메시지가 있는지 알려준다.
 @app.route('/chat/messages/<int:room_id>', methods=['GET'])
 def get_messages_by_room(room_id):
+    limit = get_page_size(CHAT_PAGE_SIZE, CHAT_MAX_PAGE_SIZE)
+    before_message_id = request.args.get('before_message_id', type=int)
+    after_message_id = request.args.get('after_message_id', type=int)
+
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # 해당 채팅방의 모든 메시지를 시간 순으로 정렬해서 가져옵니다.
-            sql = "SELECT * FROM messages WHERE room_id = %s ORDER BY send_at ASC"
-            cursor.execute(sql, (room_id,))
+            sql = "SELECT * FROM messages WHERE room_id = %s"
+            params = [room_id]
+            if after_message_id is not None:
+                sql += " AND message_id > %s ORDER BY message_id ASC LIMIT %s"
+                params += [after_message_id, limit + 1]
+            else:
+                if before_message_id is not None:
+                    sql += " AND message_id < %s"
+                    params.append(before_message_id)
+                sql += " ORDER BY message_id DESC LIMIT %s"
+                params.append(limit + 1)
+            cursor.execute(sql, params)
             messages = cursor.fetchall()
+
+            has_more = len(messages) > limit
+            messages = messages[:limit]
+            if after_message_id is None:
+                messages.reverse()
+
+            # ✨ [수정] is_read는 받는 사람의 읽은 위치(워터마크)로 계산한다
+            cursor.execute(
+                "SELECT user_id, last_read_message_id FROM chat_participants WHERE room_id = %s",
+                (room_id,)
+            )
+            read_marks = {row['user_id']: row['last_read_message_id'] for row in cursor.fetchall()}
             
             # 안드로이드에서 다루기 쉽도록 날짜(datetime)를 문자열로 변환합니다.
             for msg in messages:
                 if msg.get('send_at'):
                     msg['send_at'] = msg['send_at'].strftime('%Y-%m-%d %H:%M:%S')
                     
-                if 'is_read' in msg:
-                    msg['is_read'] = bool(msg['is_read'])
+                msg['is_read'] = msg['message_id'] <= read_marks.get(msg['receiver_id'], 0)
 
-            return jsonify({"success": True, "messages": messages})
+            return jsonify({"success": True, "messages": messages, "has_more": has_more})
             
     except Exception as e:
         print(f"Error in /chat/messages/{room_id}: {e}")
         return jsonify({"success": False, "message": "서버 오류"}), 500
     finally:
         if conn: conn.close()
+
+# ✅ [추가] 재접속한 클라이언트용 변경분 동기화 API
+# body: {"user_id": ..., "since_message_id": 마지막으로 받은 메시지 id, "rooms": {room_id: 방별 마지막 message_id}}
+# rooms에 없는 방은 since_message_id(없으면 0)를 기준으로 한다.
+# 그 이후에 메시지가 생긴 방의 요약(rooms)과 새 메시지(messages, 오래된 순)만 돌려준다.
+# 메시지가 CHAT_SYNC_MAX_MESSAGES를 넘으면 has_more=True이고, high_water_marks를 rooms로 다시 보내 이어받는다.
+CHAT_SYNC_MAX_MESSAGES = 500
+
+@app.route('/chat/sync', methods=['POST'])
+def sync_chat():
+    data = request.get_json() or {}
+    user_id = data.get('user_id')
+    if not user_id:
+        return jsonify({"success": False, "message": "user_id가 필요합니다."}), 400
+    try:
+        since = int(data.get('since_message_id') or 0)
+        room_marks = {int(room_id): int(mark) for room_id, mark in (data.get('rooms') or {}).items()}
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({"success": False, "message": "잘못된 동기화 기준입니다."}), 400
+
+    threshold = min([since] + list(room_marks.values()))
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            # 1. 기준 이후에 메시지가 생긴 방만 요약과 함께 가져온다
+            cursor.execute("""
+                SELECT
+                    cr.room_id,
+                    cr.last_message_id,
+                    cr.last_message_content,
+                    cr.last_message_at,
+                    cp.unread_count
+                FROM chat_participants cp
+                JOIN chat_rooms cr ON cr.room_id = cp.room_id
+                WHERE cp.user_id = %s AND cr.last_message_id > %s
+                ORDER BY cp.last_message_at DESC
+            """, (user_id, threshold))
+            rooms = [room for room in cursor.fetchall()
+                     if room['last_message_id'] > room_marks.get(room['room_id'], since)]
+            attach_room_members(cursor, rooms, user_id)
+
+            # 2. 방마다 (room_id, message_id) 인덱스로 기준 이후 메시지만 읽는다
+            messages, high_water_marks, has_more = [], {}, False
+            for room in rooms:
+                remaining = CHAT_SYNC_MAX_MESSAGES - len(messages)
+                mark = room_marks.get(room['room_id'], since)
+                if remaining <= 0:
+                    has_more = True
+                    break
+                cursor.execute(
+                    "SELECT * FROM messages WHERE room_id = %s AND message_id > %s ORDER BY message_id ASC LIMIT %s",
+                    (room['room_id'], mark, remaining + 1)
+                )
+                rows = cursor.fetchall()
+                if len(rows) > remaining:
+                    has_more = True
+                    rows = rows[:remaining]
+                messages.extend(rows)
+                high_water_marks[room['room_id']] = rows[-1]['message_id'] if rows else mark
+
+            # 3. is_read는 받는 사람의 워터마크로 계산
+            read_marks = {}
+            if rooms:
+                room_ids = [room['room_id'] for room in rooms]
+                cursor.execute(
+                    f"SELECT room_id, user_id, last_read_message_id FROM chat_participants WHERE room_id IN ({','.join(['%s'] * len(room_ids))})",
+                    room_ids
+                )
+                read_marks = {(row['room_id'], row['user_id']): row['last_read_message_id'] for row in cursor.fetchall()}
+
+            messages.sort(key=lambda msg: msg['message_id'])
+            for msg in messages:
+                if msg.get('send_at'):
+                    msg['send_at'] = msg['send_at'].strftime('%Y-%m-%d %H:%M:%S')
+                msg['is_read'] = msg['message_id'] <= read_marks.get((msg['room_id'], msg['receiver_id']), 0)
+            for room in rooms:
+                if room.get('last_message_at'):
+                    room['last_message_at'] = room['last_message_at'].strftime('%Y-%m-%d %H:%M:%S')
+                if room.get('other_user_last_seen'):
+                    room['other_user_last_seen'] = room['other_user_last_seen'].strftime('%Y-%m-%d %H:%M:%S')
+
+            return jsonify({
+                "success": True,
+                "rooms": rooms,
+                "messages": messages,
+                "high_water_marks": {str(room_id): mark for room_id, mark in high_water_marks.items()},
+                "has_more": has_more,
+            })
+    except Exception as e:
+        print(f"Error in /chat/sync: {e}")
+        return jsonify({"success": False, "message": "서버 오류"}), 500
+    finally:
+        if conn: conn.close()
 # ✨ [추가] 3. 특정 채팅방의 메시지를 모두 '읽음'으로 처리하는 API
 # ✨ [수정] 3. 특정 채팅방의 메시지를 모두 '읽음'으로 처리하는 API (DB 스키마에 맞게 수정)
 
@@ -474,6 +1713,7 @@ def register():
             sql = "INSERT INTO users (user_id, password, birth_date, phone, name) VALUES (%s, %s, %s, %s, %s)"
             cursor.execute(sql, (user_id, hashed_password, birth_date, phone, name))
             conn.commit()
+        user_search_index.upsert(user_id, name=name)  # ✅ [추가] 검색 색인 반영
         return jsonify({"success": True})
     except Exception as e:
         print(e)
@@ -490,8 +1730,10 @@ def update_nickname():
     try:
         with conn.cursor() as cursor:
             sql = "UPDATE users SET nickname = %s WHERE user_id = %s"
-            cursor.execute(sql, (nickname, user_id))
+            updated = cursor.execute(sql, (nickname, user_id))
             conn.commit()
+        if updated == 1:
+            user_search_index.upsert(user_id, nickname=nickname)  # ✅ [추가] 검색 색인 반영 (없는 사용자는 넣지 않는다)
         return jsonify({"success": True, "message": "닉네임이 업데이트 되었습니다."})
     except Exception as e:
         print(e)
@@ -548,25 +1790,22 @@ def get_profile(user_id):
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            sql = "SELECT name, nickname, gender, profile_image_url FROM users WHERE user_id = %s"
+            # ✨ [수정] 게시물/팔로워/팔로잉 수는 COUNT(*) 대신 users의 카운터 컬럼에서 읽는다
+            sql = """
+                SELECT name, nickname, gender, profile_image_url, post_count, follower_count, following_count
+                FROM users WHERE user_id = %s
+            """
             cursor.execute(sql, (user_id,))
             user_data = cursor.fetchone()
             if not user_data:
                 return jsonify({"success": False, "message": "사용자를 찾을 수 없습니다."}), 404
-            cursor.execute("SELECT COUNT(*) as count FROM posts WHERE user_id = %s AND is_deleted = FALSE", (user_id,))
-            post_count = cursor.fetchone()['count']
-            
-            cursor.execute("SELECT COUNT(*) as count FROM follows WHERE following_id = %s", (user_id,))
-            follower_count = cursor.fetchone()['count']
-            cursor.execute("SELECT COUNT(*) as count FROM follows WHERE follower_id = %s", (user_id,))
-            following_count = cursor.fetchone()['count']
             profile_info = {
                 "name": user_data.get('name'),
                 "nickname": user_data.get('nickname'),
                 "gender": user_data.get('gender'),
-                "post_count": post_count,
-                "follower_count": follower_count,
-                "following_count": following_count,
+                "post_count": user_data.get('post_count'),
+                "follower_count": user_data.get('follower_count'),
+                "following_count": user_data.get('following_count'),
                 "profile_image_url": user_data.get('profile_image_url')
             }
             return jsonify({"success": True, "data": profile_info})
@@ -587,8 +1826,10 @@ def update_profile_image():
     try:
         with conn.cursor() as cursor:
             sql = "UPDATE users SET profile_image_url = %s WHERE user_id = %s"
-            cursor.execute(sql, (image_url, user_id))
+            updated = cursor.execute(sql, (image_url, user_id))
         conn.commit()
+        if updated == 1:
+            user_search_index.upsert(user_id, profile_image_url=image_url)  # ✅ [추가] 검색 결과에 보이는 이미지도 반영
         return jsonify({"success": True, "message": "프로필 이미지가 업데이트되었습니다."})
     except Exception as e:
         print(e)
@@ -621,8 +1862,11 @@ def update_profile():
             # ✅ 2. 어떤 SQL문이 실행되는지 터미널에 출력
             print(f"실행될 SQL: {cursor.mogrify(sql, (name, nickname, gender, profile_image_url, user_id))}")
             
-            cursor.execute(sql, (name, nickname, gender, profile_image_url, user_id))
+            updated = cursor.execute(sql, (name, nickname, gender, profile_image_url, user_id))
         conn.commit()
+        # ✅ [추가] 검색 색인 반영 (실제로 바뀐 사용자만)
+        if updated == 1:
+            user_search_index.upsert(user_id, name=name, nickname=nickname, profile_image_url=profile_image_url)
         print("--- 프로필 업데이트 성공 ---")
         return jsonify({"success": True, "message": "프로필이 업데이트되었습니다."})
     except Exception as e:
@@ -656,6 +1900,472 @@ def check_user_exists():
         return jsonify({"success": False, "message": "서버 오류"}), 500
     finally:
         conn.close()
+# ✅ [추가] 비정규화된 카운터 (posts.like_count/comment_count, users.post_count/follower_count/following_count/unread_alarm_count)
+# 원본 테이블을 바꾸는 같은 트랜잭션 안에서 함께 갱신하고, 어긋난 값은 reconcile_counters_job이 바로잡는다.
+_POST_COUNTERS = ('like_count', 'comment_count')
+_USER_COUNTERS = ('post_count', 'follower_count', 'following_count', 'unread_alarm_count')
+
+
+def bump_post_counter(cursor, post_id, column, delta):
+    assert column in _POST_COUNTERS
+    cursor.execute(f"UPDATE posts SET {column} = GREATEST({column} + %s, 0) WHERE post_id = %s", (delta, post_id))
+
+
+def bump_user_counter(cursor, user_id, column, delta):
+    assert column in _USER_COUNTERS
+    cursor.execute(f"UPDATE users SET {column} = GREATEST({column} + %s, 0) WHERE user_id = %s", (delta, user_id))
+
+
+# ✅ [추가] 알림 묶기: (받는 사람, 종류, post_id) 가 같고 아직 읽지 않은 알림이
+# 묶음을 연 지 NOTIFICATION_GROUP_WINDOW_HOURS 안이면 새 행을 만들지 않고 그 행에 행동한 사람을 더한다.
+# ("A, B 님 외 340명이 게시물을 좋아합니다") actor_id는 가장 최근에 행동한 사람이다.
+# 열려 있는 묶음만 group_key(유일 키)를 가지고, 읽거나 연 시각(opened_at)부터 기간이 지나면 NULL로 닫는다.
+# 묶음에 들어간 사람은 alarm_actors에 한 번씩만 기록하고, 좋아요 취소/언팔로우 때 retract_alarms로 뺀다.
+NOTIFICATION_GROUP_WINDOW_HOURS = 24
+NOTIFICATION_RECENT_ACTORS = 3      # 묶음마다 기억해 둘 최근 행동한 사람 수
+
+
+def alarm_group_key(user_id, alarm_type, post_id):
+    return f"{user_id}|{alarm_type}|{'' if post_id is None else post_id}"
+
+
+def _lock_alarm_group(cursor, user_id, alarm_type, post_id):
+    """열려 있는 묶음을 잠가서 돌려준다. 없으면 빈 묶음(actor_count = 0)을 만들어서 돌려준다"""
+    group_key = alarm_group_key(user_id, alarm_type, post_id)
+    while True:
+        # 유일 키로 삽입-또는-기존 행 찾기를 한 문장으로 해서 동시에 만들어도 묶음이 둘이 되지 않는다
+        cursor.execute("""
+            INSERT INTO alarms (user_id, actor_id, alarm_type, post_id, actor_count, recent_actor_ids, group_key, opened_at)
+            VALUES (%s, %s, %s, %s, 0, '[]', %s, NOW())
+            ON DUPLICATE KEY UPDATE alarm_id = LAST_INSERT_ID(alarm_id)
+        """, (user_id, user_id, alarm_type, post_id, group_key))
+        alarm_id = cursor.lastrowid
+        cursor.execute("""
+            SELECT alarm_id, actor_count, recent_actor_ids,
+                   opened_at < NOW() - INTERVAL %s HOUR AS expired
+            FROM alarms WHERE alarm_id = %s
+            FOR UPDATE
+        """, (NOTIFICATION_GROUP_WINDOW_HOURS, alarm_id))
+        group = cursor.fetchone()
+        if group['actor_count'] and group['expired']:
+            # 연 지 기간이 지난 묶음은 (그 사이 계속 새 사람이 들어왔어도) 닫고 새 묶음을 연다
+            cursor.execute("UPDATE alarms SET group_key = NULL WHERE alarm_id = %s", (alarm_id,))
+            continue
+        return group
+
+
+def next_alarm_seq(cursor, user_id):
+    """받는 사람별로 단조 증가하는 알림 순번 (GET /notifications?since= 재개 토큰)
+
+    users 행을 커밋할 때까지 잠그므로 같은 사람의 알림은 순번 순서대로 커밋된다.
+    """
+    cursor.execute("UPDATE users SET alarm_seq = alarm_seq + 1 WHERE user_id = %s", (user_id,))
+    cursor.execute("SELECT alarm_seq FROM users WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    return row['alarm_seq'] if row else 0
+
+
+def create_alarms(cursor, alarms):
+    """알림 (받는 사람, 행동한 사람, 종류, post_id) 목록을 저장하고 받는 사람의 안 읽은 알림 수를 올린다
+
+    새로 만들거나 갱신한 alarm_id 목록을 돌려준다. 커밋한 뒤 push_notifications에 넘기면 된다.
+    """
+    if not alarms:
+        return []
+    # 같은 묶음에 들어갈 알림끼리 먼저 모은다 (순서 유지)
+    groups = {}
+    for user_id, actor_id, alarm_type, post_id in alarms:
+        groups.setdefault((user_id, alarm_type, post_id), []).append(actor_id)
+
+    counts = {}
+    alarm_ids = []
+    # 여러 요청이 같은 묶음/받는 사람을 건드려도 잠그는 순서가 같도록 정렬해서 처리한다
+    for (user_id, alarm_type, post_id), actor_ids in sorted(groups.items(), key=lambda item: alarm_group_key(*item[0])):
+        group = _lock_alarm_group(cursor, user_id, alarm_type, post_id)
+        recent = json.loads(group['recent_actor_ids'] or '[]')
+        added = 0
+        for actor_id in actor_ids:
+            if cursor.execute("INSERT IGNORE INTO alarm_actors (alarm_id, actor_id) VALUES (%s, %s)",
+                              (group['alarm_id'], actor_id)):
+                added += 1
+            else:
+                # 이미 묶음에 있는 사람이 다시 행동(좋아요 취소 후 다시 좋아요 등)하면 순서만 앞으로
+                cursor.execute("UPDATE alarm_actors SET acted_at = NOW() WHERE alarm_id = %s AND actor_id = %s",
+                               (group['alarm_id'], actor_id))
+            if actor_id in recent:
+                recent.remove(actor_id)
+            recent.insert(0, actor_id)
+        recent = recent[:NOTIFICATION_RECENT_ACTORS]
+
+        cursor.execute("""
+            UPDATE alarms SET actor_id = %s, actor_count = actor_count + %s, recent_actor_ids = %s, alarmed_at = NOW(),
+                seq = %s
+            WHERE alarm_id = %s
+        """, (recent[0], added, json.dumps(recent), next_alarm_seq(cursor, user_id), group['alarm_id']))
+        alarm_ids.append(group['alarm_id'])
+        if group['actor_count'] == 0:
+            counts[user_id] = counts.get(user_id, 0) + 1
+
+    for user_id, count in counts.items():
+        bump_user_counter(cursor, user_id, 'unread_alarm_count', count)
+    return alarm_ids
+
+
+def retract_alarms(cursor, alarms):
+    """좋아요 취소/언팔로우 등으로 철회된 알림 (받는 사람, 행동한 사람, 종류, post_id) 을 열린 묶음에서 뺀다
+
+    마지막 사람이 빠진 묶음은 지우고 안 읽은 알림 수도 내린다. 이미 닫힌(읽은) 묶음은 건드리지 않는다.
+    알림이 바뀐 받는 사람 목록을 돌려준다. 커밋한 뒤 push_notifications(user_ids=)에 넘기면 된다.
+    """
+    changed = set()
+    for user_id, actor_id, alarm_type, post_id in sorted(alarms, key=lambda alarm: alarm_group_key(alarm[0], *alarm[2:])):
+        cursor.execute(
+            "SELECT alarm_id, actor_count, recent_actor_ids FROM alarms WHERE group_key = %s FOR UPDATE",
+            (alarm_group_key(user_id, alarm_type, post_id),)
+        )
+        group = cursor.fetchone()
+        if not group:
+            continue
+        if not cursor.execute("DELETE FROM alarm_actors WHERE alarm_id = %s AND actor_id = %s",
+                              (group['alarm_id'], actor_id)):
+            continue
+        changed.add(user_id)
+        if group['actor_count'] <= 1:
+            cursor.execute("DELETE FROM alarm_actors WHERE alarm_id = %s", (group['alarm_id'],))
+            cursor.execute("DELETE FROM alarms WHERE alarm_id = %s", (group['alarm_id'],))
+            bump_user_counter(cursor, user_id, 'unread_alarm_count', -1)
+            continue
+        recent = json.loads(group['recent_actor_ids'] or '[]')
+        if actor_id in recent:
+            # 최근 목록에서 빠진 자리는 남은 사람 중 가장 최근에 행동한 사람들로 다시 채운다
+            cursor.execute(
+                "SELECT actor_id FROM alarm_actors WHERE alarm_id = %s ORDER BY acted_at DESC LIMIT %s",
+                (group['alarm_id'], NOTIFICATION_RECENT_ACTORS)
+            )
+            recent = [row['actor_id'] for row in cursor.fetchall()]
+        cursor.execute("""
+            UPDATE alarms SET actor_id = %s, actor_count = actor_count - 1, recent_actor_ids = %s, seq = %s
+            WHERE alarm_id = %s
+        """, (recent[0], json.dumps(recent), next_alarm_seq(cursor, user_id), group['alarm_id']))
+    return changed
+
+
+# ✅ [추가] 알림 실시간 전송: 커밋이 끝난 알림을 받는 사람의 방으로 notification 이벤트로 보낸다.
+# since는 GET /notifications?since= 에 그대로 쓰는 재개 토큰(받는 사람별 알림 순번)이라, 재접속한 클라이언트는
+# 마지막으로 받은 토큰으로 놓친 알림만 가져오면 된다. 알림이 철회/정리되어 안 읽은 수만 바뀌면
+# notification_count 이벤트를 보낸다. 폴링은 소켓을 못 쓸 때의 대비책으로 NOTIFICATION_POLL_INTERVAL_SECONDS마다.
+NOTIFICATION_POLL_INTERVAL_SECONDS = 300
+
+
+def push_notifications(conn, alarm_ids, user_ids=()):
+    """커밋된 알림과 안 읽은 알림 수가 바뀐 사용자에게 전송 (실패해도 요청에는 영향 없음)"""
+    if not alarm_ids and not user_ids:
+        return
+    try:
+        rows = []
+        with conn.cursor() as cursor:
+            if alarm_ids:
+                cursor.execute(f"""
+                    SELECT a.alarm_id, a.user_id, a.alarm_type, a.post_id, a.actor_id, a.actor_count, a.seq,
+                           u.unread_alarm_count
+                    FROM alarms a
+                    JOIN users u ON u.user_id = a.user_id
+                    WHERE a.alarm_id IN ({','.join(['%s'] * len(alarm_ids))})
+                """, list(alarm_ids))
+                rows = cursor.fetchall()
+            notified = {row['user_id'] for row in rows}
+            count_user_ids = [user_id for user_id in set(user_ids) if user_id not in notified]
+            counts = []
+            if count_user_ids:
+                cursor.execute(
+                    f"SELECT user_id, unread_alarm_count, alarm_seq FROM users WHERE user_id IN ({','.join(['%s'] * len(count_user_ids))})",
+                    count_user_ids
+                )
+                counts = cursor.fetchall()
+        for row in rows:
+            socketio.emit('notification', {
+                'alarm_id': row['alarm_id'],
+                'alarm_type': row['alarm_type'],
+                'post_id': row['post_id'],
+                'actor_id': row['actor_id'],
+                'actor_count': row['actor_count'],
+                'unread_count': row['unread_alarm_count'],
+                'since': encode_cursor(row['seq']),
+            }, to=row['user_id'])
+        for row in counts:
+            socketio.emit('notification_count', {
+                'unread_count': row['unread_alarm_count'],
+                'since': encode_cursor(row['alarm_seq']),
+            }, to=row['user_id'])
+    except Exception as e:
+        print(f"알림 전송 오류: {e}")
+
+
+def _uncount_post(cursor, post_id):
+    """영구 삭제 직전에 호출: 아직 삭제 처리되지 않은 게시물이었다면 작성자의 게시물 수를 줄인다"""
+    cursor.execute("SELECT user_id, is_deleted FROM posts WHERE post_id = %s", (post_id,))
+    row = cursor.fetchone()
+    if row and not row['is_deleted']:
+        bump_user_counter(cursor, row['user_id'], 'post_count', -1)
+
+
+# ✅ [추가] 홈 타임라인(fan-out-on-write) 관련 함수들
+# 게시물을 쓸 때 작성자 본인과 팔로워들의 home_timeline에 미리 넣어두고, /feed는 이 테이블만 읽는다.
+# 'push': home_timeline에서 읽기, 'pull': 기존처럼 follows로 매번 계산,
+# 'hybrid': 일반 작성자는 push, 팔로워가 많은 작성자는 읽을 때 최근 게시물 캐시에서 합친다
+FEED_MODE = 'hybrid'
+TIMELINE_BACKFILL_LIMIT = 50    # 새로 팔로우했을 때 타임라인에 채워 넣을 상대방의 최근 게시물 수
+TIMELINE_REBUILD_LIMIT = 800    # 타임라인을 재생성할 때 보관할 최대 게시물 수
+TIMELINE_REBUILD_BATCH_SIZE = 100  # 전체 재생성 시 한 트랜잭션에서 처리할 사용자 수
+
+FEED_CELEBRITY_THRESHOLD = 10000        # 팔로워가 이 수 이상이면 fan-out 하지 않고 읽을 때 합친다
+FEED_CELEBRITY_REFRESH_MINUTES = 10     # 대형 계정 목록을 다시 계산하는 주기
+FEED_AUTHOR_CACHE_SIZE = 100            # 대형 계정별로 캐시해 둘 최근 게시물 수
+FEED_AUTHOR_CACHE_TTL = 30              # 캐시 유효 시간(초). 다른 워커에서 쓴 글도 이 안에 반영된다
+
+feed_metrics = {
+    'timelines_push': 0,        # home_timeline만으로 만든 피드 페이지
+    'timelines_hybrid': 0,      # 대형 계정 게시물을 읽을 때 합친 피드 페이지
+    'timelines_pull': 0,        # follows로 매번 계산한 피드 페이지
+    'fanout_posts': 0,          # 팔로워 타임라인에 push한 게시물
+    'fanout_skipped_posts': 0,  # 대형 계정이라 push를 건너뛴 게시물
+    'demoted_backfills': 0,     # 대형 계정에서 빠져서 팔로워 타임라인을 채워 넣은 작성자
+}
+_feed_metrics_lock = threading.Lock()
+
+
+def _count_feed_metric(name, amount=1):
+    with _feed_metrics_lock:
+        feed_metrics[name] += amount
+
+
+class CelebrityAuthors:
+    """팔로워 수가 FEED_CELEBRITY_THRESHOLD 이상인 작성자 목록과 그들의 최근 게시물 캐시"""
+
+    def __init__(self):
+        self._ids = set()
+        self._loaded = False
+        self._recent = {}  # author_id -> (loaded_at, [(P_created_at 문자열, post_id), ...] 최신순)
+        self._lock = threading.Lock()
+
+    def refresh(self, cursor):
+        """목록을 다시 계산한다. 대형 계정에서 빠진 작성자의 게시물은 팔로워 타임라인에 채워 넣는다 (호출한 쪽에서 커밋)"""
+        cursor.execute("SELECT user_id FROM users WHERE follower_count >= %s", (FEED_CELEBRITY_THRESHOLD,))
+        ids = {row['user_id'] for row in cursor.fetchall()}
+        with self._lock:
+            demoted = self._ids - ids if self._loaded else set()
+            self._ids = ids
+            self._loaded = True
+        for author_id in demoted:
+            backfill_demoted_author(cursor, author_id)
+        return len(ids)
+
+    def ids(self, cursor):
+        if not self._loaded:
+            self.refresh(cursor)
+        return self._ids
+
+    def classify(self, cursor, author_id):
+        """게시물 작성 시점에 정확한 팔로워 수로 대형 계정 여부를 판단하고 목록도 갱신"""
+        cursor.execute("SELECT follower_count FROM users WHERE user_id = %s", (author_id,))
+        row = cursor.fetchone()
+        is_celebrity = bool(row) and row['follower_count'] >= FEED_CELEBRITY_THRESHOLD
+        with self._lock:
+            demoted = not is_celebrity and author_id in self._ids
+            if is_celebrity:
+                self._ids.add(author_id)
+            else:
+                self._ids.discard(author_id)
+        if demoted:
+            backfill_demoted_author(cursor, author_id)
+        return is_celebrity
+
+    def invalidate(self, author_id):
+        with self._lock:
+            self._recent.pop(author_id, None)
+
+    def _recent_posts(self, cursor, author_id):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._recent.get(author_id)
+        if cached and now - cached[0] < FEED_AUTHOR_CACHE_TTL:
+            return cached[1]
+        cursor.execute("""
+            SELECT post_id, P_created_at FROM posts
+            WHERE user_id = %s AND is_deleted = FALSE
+            ORDER BY P_created_at DESC, post_id DESC
+            LIMIT %s
+        """, (author_id, FEED_AUTHOR_CACHE_SIZE))
+        entries = [(_feed_key_time(row['P_created_at']), row['post_id']) for row in cursor.fetchall()]
+        with self._lock:
+            self._recent[author_id] = (now, entries)
+        return entries
+
+    def posts_before(self, cursor, author_id, after, limit):
+        """after((시간, post_id)) 보다 오래된 최근 게시물을 최대 limit개 돌려준다"""
+        cached = self._recent_posts(cursor, author_id)
+        entries = [e for e in cached if e < (after[0], after[1])] if after else cached
+        # 캐시가 꽉 차 있지 않다면 작성자의 게시물을 전부 들고 있는 것이다
+        if len(entries) >= limit or len(cached) < FEED_AUTHOR_CACHE_SIZE:
+            return entries[:limit]
+        # 캐시 범위보다 깊은 페이지는 해당 작성자 인덱스로 직접 조회
+        sql = "SELECT post_id, P_created_at FROM posts WHERE user_id = %s AND is_deleted = FALSE"
+        params = [author_id]
+        if after:
+            sql += " AND (P_created_at < %s OR (P_created_at = %s AND post_id < %s))"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY P_created_at DESC, post_id DESC LIMIT %s"
+        params.append(limit)
+        cursor.execute(sql, params)
+        return [(_feed_key_time(row['P_created_at']), row['post_id']) for row in cursor.fetchall()]
+
+
+celebrity_authors = CelebrityAuthors()
+
+
+def _post_author(cursor, post_id):
+    cursor.execute("SELECT user_id FROM posts WHERE post_id = %s", (post_id,))
+    row = cursor.fetchone()
+    return row['user_id'] if row else None
+
+
+def _feed_key_time(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if isinstance(value, datetime) else value
+
+
+def backfill_demoted_author(cursor, author_id):
+    """대형 계정에서 일반 계정이 된 작성자의 최근 게시물을 팔로워들의 타임라인에 채워 넣는다
+
+    대형 계정일 때 쓴 게시물은 fan-out 되지 않았고 이제는 읽을 때 합쳐지지도 않으므로,
+    그대로 두면 팔로워들의 피드에서 사라진다. INSERT IGNORE라서 여러 워커가 동시에 해도 괜찮다.
+    """
+    cursor.execute("""
+        INSERT IGNORE INTO home_timeline (user_id, post_id, author_id, P_created_at)
+        SELECT f.follower_id, p.post_id, p.user_id, p.P_created_at
+        FROM (
+            SELECT post_id, user_id, P_created_at FROM posts
+            WHERE user_id = %s AND is_deleted = FALSE
+            ORDER BY P_created_at DESC, post_id DESC
+            LIMIT %s
+        ) p
+        JOIN follows f ON f.following_id = p.user_id
+    """, (author_id, TIMELINE_BACKFILL_LIMIT))
+    _count_feed_metric('demoted_backfills')
+
+
+def refresh_celebrity_authors_job():
+    """대형 계정 목록을 주기적으로 다시 계산하는 스케줄링 작업"""
+    conn = None
+    try:
+        conn = get_connection()
+        with conn.cursor() as cursor:
+            count = celebrity_authors.refresh(cursor)
+        conn.commit()
+        print(f"[{datetime.now()}] 대형 계정 목록 갱신: {count}명")
+    except Exception as e:
+        print(f"대형 계정 목록 갱신 오류: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def fan_out_post(cursor, post_id, author_id=None):
+    """작성자 본인과 팔로워들의 타임라인에 게시물을 추가 (삭제되지 않은 게시물만)
+
+    hybrid 모드에서 대형 계정의 게시물은 본인 타임라인에만 넣고, 팔로워들은 읽을 때 합친다.
+    """
+    push_to_followers = True
+    if FEED_MODE == 'hybrid':
+        author_id = author_id or _post_author(cursor, post_id)
+        celebrity_authors.invalidate(author_id)
+        push_to_followers = not celebrity_authors.classify(cursor, author_id)
+    _count_feed_metric('fanout_posts' if push_to_followers else 'fanout_skipped_posts')
+
+    if push_to_followers:
+        cursor.execute("""
+            INSERT IGNORE INTO home_timeline (user_id, post_id, author_id, P_created_at)
+            SELECT f.follower_id, p.post_id, p.user_id, p.P_created_at
+            FROM posts p
+            JOIN follows f ON f.following_id = p.user_id
+            WHERE p.post_id = %s AND p.is_deleted = FALSE
+        """, (post_id,))
+    cursor.execute("""
+        INSERT IGNORE INTO home_timeline (user_id, post_id, author_id, P_created_at)
+        SELECT p.user_id, p.post_id, p.user_id, p.P_created_at
+        FROM posts p
+        WHERE p.post_id = %s AND p.is_deleted = FALSE
+    """, (post_id,))
+
+
+def retract_post(cursor, post_id, author_id=None):
+    """모든 타임라인에서 게시물을 제거"""
+    cursor.execute("DELETE FROM home_timeline WHERE post_id = %s", (post_id,))
+    if FEED_MODE == 'hybrid':
+        celebrity_authors.invalidate(author_id or _post_author(cursor, post_id))
+
+
+def backfill_author(cursor, user_id, author_id):
+    """새로 팔로우한 사용자의 최근 게시물을 내 타임라인에 채워 넣는다"""
+    if FEED_MODE == 'hybrid' and author_id in celebrity_authors.ids(cursor):
+        return  # 대형 계정 게시물은 읽을 때 합쳐진다
+    cursor.execute("""
+        INSERT IGNORE INTO home_timeline (user_id, post_id, author_id, P_created_at)
+        SELECT %s, p.post_id, p.user_id, p.P_created_at
+        FROM posts p
+        WHERE p.user_id = %s AND p.is_deleted = FALSE
+        ORDER BY p.P_created_at DESC, p.post_id DESC
+        LIMIT %s
+    """, (user_id, author_id, TIMELINE_BACKFILL_LIMIT))
+
+
+def retract_author(cursor, user_id, author_id):
+    """언팔로우한 사용자의 게시물을 내 타임라인에서 제거"""
+    cursor.execute("DELETE FROM home_timeline WHERE user_id = %s AND author_id = %s", (user_id, author_id))
+
+
+def rebuild_home_timeline(cursor, user_id):
+    """posts/follows 원본 테이블로부터 한 사용자의 타임라인을 다시 만든다"""
+    cursor.execute("DELETE FROM home_timeline WHERE user_id = %s", (user_id,))
+    sql = """
+        INSERT INTO home_timeline (user_id, post_id, author_id, P_created_at)
+        SELECT %s, p.post_id, p.user_id, p.P_created_at
+        FROM posts p
+        WHERE (p.user_id IN (
+            SELECT following_id FROM follows WHERE follower_id = %s
+        ) OR p.user_id = %s)
+          AND p.is_deleted = FALSE
+    """
+    params = [user_id, user_id, user_id]
+    if FEED_MODE == 'hybrid':
+        # 대형 계정(본인 제외) 게시물은 타임라인에 넣지 않는다
+        celebrity_ids = list(celebrity_authors.ids(cursor) - {user_id})
+        if celebrity_ids:
+            sql += f" AND p.user_id NOT IN ({','.join(['%s'] * len(celebrity_ids))})"
+            params += celebrity_ids
+    sql += " ORDER BY p.P_created_at DESC, p.post_id DESC LIMIT %s"
+    params.append(TIMELINE_REBUILD_LIMIT)
+    cursor.execute(sql, params)
+    return cursor.rowcount
+
+
+def rebuild_all_home_timelines(cursor, batch_size=TIMELINE_REBUILD_BATCH_SIZE):
+    """모든 사용자의 타임라인을 user_id 순으로 batch_size명씩 나눠 다시 만든다 (묶음마다 커밋)"""
+    rebuilt = 0
+    last_user_id = ''
+    while True:
+        cursor.execute("SELECT user_id FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                       (last_user_id, batch_size))
+        user_ids = [row['user_id'] for row in cursor.fetchall()]
+        if not user_ids:
+            break
+        for user_id in user_ids:
+            rebuild_home_timeline(cursor, user_id)
+        cursor.connection.commit()
+        rebuilt += len(user_ids)
+        last_user_id = user_ids[-1]
+    return rebuilt
+
+
 @app.route('/posts', methods=['POST'])
 def create_post():
     data = request.get_json()
@@ -667,13 +2377,19 @@ def create_post():
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            sql = "INSERT INTO posts (user_id, P_content) VALUES (%s, %s)"
-            cursor.execute(sql, (user_id, content))
+            # ✨ [수정] 첫 번째 이미지를 대표 이미지(cover_image_url)로 함께 저장
+            sql = "INSERT INTO posts (user_id, P_content, cover_image_url) VALUES (%s, %s, %s)"
+            cursor.execute(sql, (user_id, content, image_urls[0]))
             post_id = cursor.lastrowid
             if image_urls:
                 image_data = [(post_id, url, index) for index, url in enumerate(image_urls)]
                 sql_images = "INSERT INTO post_images (post_id, image_url, image_order) VALUES (%s, %s, %s)"
                 cursor.executemany(sql_images, image_data)
+
+            bump_user_counter(cursor, user_id, 'post_count', 1)
+
+            # ✅ [추가] 작성자와 팔로워들의 홈 타임라인에 게시물 추가
+            fan_out_post(cursor, post_id, user_id)
         conn.commit()
         return jsonify({"success": True, "message": "게시물이 성공적으로 작성되었습니다."})
     except Exception as e:
@@ -683,6 +2399,257 @@ def create_post():
     finally:
         conn.close()
 
+# ✅ [추가] 좋아요 write-behind 버퍼
+# LIKE_WRITE_BEHIND를 켜면 toggle_like는 DB에 바로 쓰지 않고 (user_id, post_id)별 최종 의도만 메모리에 기록하고,
+# 백그라운드 스레드가 짧은 주기(또는 쌓인 개수 기준)로 여러 행짜리 INSERT/DELETE로 한꺼번에 반영한다.
+# 같은 사용자의 요청이 항상 같은 워커로 가야(sticky session) 자신의 최신 상태가 보장된다.
+LIKE_WRITE_BEHIND = False
+LIKE_FLUSH_INTERVAL_SECONDS = 1.0   # 이 주기마다 버퍼를 비운다
+LIKE_FLUSH_MAX_PENDING = 500        # 쌓인 의도가 이 개수를 넘으면 주기를 기다리지 않고 비운다
+
+
+class LikeBuffer:
+    """(user_id, post_id) -> {'liked': 원하는 최종 상태, 'base': DB에 있던 상태} 를 모아두는 버퍼"""
+
+    def __init__(self):
+        self._pending = {}
+        self._inflight = {}  # flush 중이라 아직 커밋되지 않은 의도
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # flush 하나가 커밋(또는 실패 후 되돌리기)까지 끝날 때까지 잡는다
+        self._wakeup = threading.Event()
+        self._worker = None
+        self.stats = {'toggles': 0, 'collapsed': 0, 'flushes': 0, 'flushed_intents': 0, 'failures': 0}
+
+    def toggle(self, user_id, post_id, load_db_state):
+        """좋아요 상태를 뒤집고 새 상태(True=좋아요)를 돌려준다"""
+        key = (user_id, post_id)
+        while True:
+            with self._lock:
+                known = key in self._pending or key in self._inflight
+            base = None if known else load_db_state()
+            with self._lock:
+                entry = self._pending.get(key)
+                if entry is None:
+                    inflight = self._inflight.get(key)
+                    if inflight is not None:
+                        # 곧 커밋될 상태를 기준으로 삼는다
+                        base = inflight['liked']
+                    elif base is None:
+                        continue  # 확인하는 사이에 반영이 끝났으므로 DB 상태를 다시 읽는다
+                    entry = self._pending[key] = {'liked': base, 'base': base}
+                self.stats['toggles'] += 1
+                entry['liked'] = not entry['liked']
+                liked = entry['liked']
+                if entry['liked'] == entry['base']:
+                    # 좋아요 → 취소처럼 원래대로 돌아온 연타는 DB에 쓸 필요가 없다
+                    del self._pending[key]
+                    self.stats['collapsed'] += 1
+                pending_count = len(self._pending)
+                break
+        self._ensure_worker()
+        if pending_count >= LIKE_FLUSH_MAX_PENDING:
+            self._wakeup.set()
+        return liked
+
+    def overlay(self, viewer_id, post_ids):
+        """아직 DB에 반영되지 않은 의도를 읽기에 반영하기 위한 값을 돌려준다
+
+        (viewer의 post_id -> 좋아요 상태, post_id -> 좋아요 수 증감)
+        """
+        post_ids = set(post_ids)
+        viewer_state, deltas = {}, {}
+        with self._lock:
+            # 반영 중인 의도 위에 그 이후의 의도가 쌓이는 순서대로 계산
+            for items in (self._inflight, self._pending):
+                for (user_id, post_id), entry in items.items():
+                    if post_id not in post_ids:
+                        continue
+                    deltas[post_id] = deltas.get(post_id, 0) + (int(entry['liked']) - int(entry['base']))
+                    if user_id == viewer_id:
+                        viewer_state[post_id] = entry['liked']
+        return viewer_state, deltas
+
+    def pending_likes(self, user_id):
+        """아직 DB에 반영되지 않은 user_id의 좋아요 의도 {post_id: 좋아요 상태}"""
+        state = {}
+        with self._lock:
+            for items in (self._inflight, self._pending):
+                for (liker_id, post_id), entry in items.items():
+                    if liker_id == user_id:
+                        state[post_id] = entry['liked']
+        return state
+
+    def discard(self, user_id, post_ids):
+        """DB에 직접 반영할 요청(일괄 좋아요 취소 등) 전에 해당 의도를 버린다
+
+        반영 중인 flush가 있으면 그것이 커밋될 때까지 기다린 뒤에 버리므로, 호출한 쪽의 DB 쓰기가 항상 나중에 적용된다.
+        DB 잠금을 잡은 트랜잭션 안에서 호출하면 안 된다.
+        """
+        with self._flush_lock:
+            with self._lock:
+                for post_id in post_ids:
+                    self._pending.pop((user_id, post_id), None)
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(LIKE_FLUSH_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            items, self._pending = self._pending, {}
+            self._inflight = items
+        if not items:
+            return 0
+        conn = None
+        try:
+            conn = get_connection()
+            with conn.cursor() as cursor:
+                alarm_ids, retracted = _apply_like_intents(cursor, items)
+            conn.commit()
+            push_notifications(conn, alarm_ids, retracted)
+            with self._lock:
+                self._inflight = {}
+                self.stats['flushes'] += 1
+                self.stats['flushed_intents'] += len(items)
+            return len(items)
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            print(f"좋아요 버퍼 반영 오류 (다음 주기에 재시도): {e}")
+            with self._lock:
+                self._inflight = {}
+                self.stats['failures'] += 1
+                # 그 사이에 새로 들어온 의도가 있으면 그것이 최신이므로 상태는 유지하고 기준값만 되돌린다
+                for key, entry in items.items():
+                    newer = self._pending.get(key)
+                    if newer is None:
+                        self._pending[key] = entry
+                    else:
+                        newer['base'] = entry['base']
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+
+def _apply_like_intents(cursor, items):
+    """모아둔 좋아요 의도를 여러 행짜리 문장 몇 개로 DB에 반영 (호출한 쪽에서 커밋)
+
+    (만든 alarm_id 목록, 알림이 철회된 받는 사람 목록)을 돌려준다.
+    """
+    post_ids = list({post_id for _, post_id in items})
+    # 공유 잠금: 반영하는 동안 게시물이 영구 삭제되어 좋아요가 남는 일이 없게 한다
+    cursor.execute(
+        f"SELECT post_id, user_id FROM posts WHERE post_id IN ({','.join(['%s'] * len(post_ids))}) LOCK IN SHARE MODE",
+        post_ids
+    )
+    authors = {row['post_id']: row['user_id'] for row in cursor.fetchall()}
+    # 그 사이에 영구 삭제된 게시물에 대한 의도는 버린다
+    keys = [key for key in items if key[1] in authors]
+    if not keys:
+        return [], set()
+
+    pairs = ','.join(['(%s, %s)'] * len(keys))
+    pair_params = [value for user_id, post_id in keys for value in (post_id, user_id)]
+    cursor.execute(f"SELECT post_id, user_id FROM likes WHERE (post_id, user_id) IN ({pairs}) FOR UPDATE", pair_params)
+    existing = {(row['user_id'], row['post_id']) for row in cursor.fetchall()}
+
+    to_insert = [key for key in keys if items[key]['liked'] and key not in existing]
+    to_delete = [key for key in keys if not items[key]['liked'] and key in existing]
+
+    if to_insert:
+        cursor.executemany("INSERT INTO likes (post_id, user_id) VALUES (%s, %s)",
+                           [(post_id, user_id) for user_id, post_id in to_insert])
+    if to_delete:
+        cursor.execute(
+            f"DELETE FROM likes WHERE (post_id, user_id) IN ({','.join(['(%s, %s)'] * len(to_delete))})",
+            [value for user_id, post_id in to_delete for value in (post_id, user_id)]
+        )
+
+    deltas = {}
+    for _, post_id in to_insert:
+        deltas[post_id] = deltas.get(post_id, 0) + 1
+    for _, post_id in to_delete:
+        deltas[post_id] = deltas.get(post_id, 0) - 1
+    deltas = {post_id: delta for post_id, delta in deltas.items() if delta}
+    if deltas:
+        cases = ' '.join(['WHEN %s THEN %s'] * len(deltas))
+        cursor.execute(
+            f"UPDATE posts SET like_count = GREATEST(like_count + CASE post_id {cases} END, 0) "
+            f"WHERE post_id IN ({','.join(['%s'] * len(deltas))})",
+            [value for item in deltas.items() for value in item] + list(deltas)
+        )
+
+    retracted = retract_alarms(cursor, [(authors[post_id], user_id, 'like', post_id)
+                                        for user_id, post_id in to_delete if authors[post_id] != user_id])
+    alarm_ids = create_alarms(cursor, [(authors[post_id], user_id, 'like', post_id)
+                                       for user_id, post_id in to_insert if authors[post_id] != user_id])
+    return alarm_ids, retracted
+
+
+like_buffer = LikeBuffer()
+# 서버 종료 시 남아 있는 의도를 마지막으로 반영
+atexit.register(like_buffer.flush)
+
+
+# ✅ [추가] 게시물 목록에 이미지/좋아요/댓글 정보를 한 번에 채워 넣는 공통 함수
+# 게시물마다 쿼리를 날리지 않고, post_id 목록 전체에 대해 IN (...) 쿼리 3번으로 끝낸다.
+def hydrate_posts(cursor, posts, viewer_id=None):
+    """posts(dict 목록)에 images, like_count, is_liked_by_user, comment_count를 채운다"""
+    if not posts:
+        return posts
+    post_ids = list({post['post_id'] for post in posts})
+    placeholders = ','.join(['%s'] * len(post_ids))
+
+    images_by_post = {post_id: [] for post_id in post_ids}
+    cursor.execute(
+        f"SELECT post_id, image_url FROM post_images WHERE post_id IN ({placeholders}) ORDER BY post_id, image_order ASC",
+        post_ids
+    )
+    for row in cursor.fetchall():
+        images_by_post[row['post_id']].append(row['image_url'])
+
+    # ✨ [수정] 좋아요/댓글 수는 COUNT(*) 대신 posts의 카운터 컬럼에서 읽는다
+    cursor.execute(
+        f"SELECT post_id, like_count, comment_count FROM posts WHERE post_id IN ({placeholders})",
+        post_ids
+    )
+    counters = {row['post_id']: row for row in cursor.fetchall()}
+
+    liked_post_ids = set()
+    if viewer_id:
+        cursor.execute(
+            f"SELECT post_id FROM likes WHERE user_id = %s AND post_id IN ({placeholders})",
+            [viewer_id] + post_ids
+        )
+        liked_post_ids = {row['post_id'] for row in cursor.fetchall()}
+
+    # ✅ [추가] write-behind 버퍼에 아직 남아 있는 좋아요/취소도 반영해서 내 최신 상태를 보여준다
+    pending_state, pending_deltas = like_buffer.overlay(viewer_id, post_ids)
+
+    for post in posts:
+        post_id = post['post_id']
+        counter = counters.get(post_id, {})
+        post['images'] = images_by_post.get(post_id, [])
+        post['like_count'] = max(counter.get('like_count', 0) + pending_deltas.get(post_id, 0), 0)
+        post['is_liked_by_user'] = pending_state.get(post_id, post_id in liked_post_ids)
+        post['comment_count'] = counter.get('comment_count', 0)
+    return posts
+
+
 # @app.route('/posts/<user_id>', methods=['GET'])
 # def get_user_posts(user_id):
 #     current_user_id = request.args.get('current_user_id')
@@ -746,37 +2713,11 @@ def get_user_posts(user_id):
             posts = cursor.fetchall()
 
             for post in posts:
-                post_id = post['post_id']
-                
-                # 날짜 및 이미지 정보 (수정 없음)
                 if post.get('P_created_at'):
                     post['P_created_at'] = post['P_created_at'].strftime('%Y-%m-%d %H:%M:%S')
 
-                sql_images = "SELECT image_url FROM post_images WHERE post_id = %s ORDER BY image_order ASC"
-                cursor.execute(sql_images, (post_id,))
-                images = cursor.fetchall()
-                post['images'] = [image['image_url'] for image in images]
-
-                # 좋아요 정보 조회 (수정됨)
-                try:
-                    cursor.execute("SELECT COUNT(*) as count FROM likes WHERE post_id = %s", (post_id,))
-                    like_result = cursor.fetchone()
-                    # ✅ [수정] 좋아요가 0개일 때(None)를 대비한 안전장치 추가
-                    post['like_count'] = like_result['count'] if like_result else 0
-                    
-                    if current_user_id:
-                        cursor.execute("SELECT 1 FROM likes WHERE post_id = %s AND user_id = %s", (post_id, current_user_id))
-                        post['is_liked_by_user'] = True if cursor.fetchone() else False
-                    else:
-                        post['is_liked_by_user'] = False
-                except Exception as like_error:
-                    post['like_count'] = 0
-                    post['is_liked_by_user'] = False
-                
-                # ✅ [수정] 댓글 개수 계산 로직을 올바른 위치로 이동하고 안전장치 추가
-                cursor.execute("SELECT COUNT(*) as count FROM comments WHERE post_id = %s", (post_id,))
-                comment_result = cursor.fetchone()
-                post['comment_count'] = comment_result['count'] if comment_result else 0
+            # ✨ [수정] 이미지/좋아요/댓글 정보는 게시물 수와 상관없이 일괄 조회
+            hydrate_posts(cursor, posts, current_user_id)
 
             return jsonify({"success": True, "posts": posts})
     except Exception as e:
@@ -862,36 +2803,14 @@ def get_post_detail(post_id):
             if not post_data:
                 return jsonify({"success": False, "message": "게시물을 찾을 수 없습니다."}), 404
 
-            try:
-                cursor.execute("SELECT COUNT(*) as count FROM likes WHERE post_id = %s", (post_id,))
-                like_result = cursor.fetchone()
-                # ✅ [수정] 좋아요가 0개일 때를 대비한 안전장치 추가
-                post_data['like_count'] = like_result['count'] if like_result else 0
-                
-                if current_user_id:
-                    cursor.execute("SELECT 1 FROM likes WHERE post_id = %s AND user_id = %s", (post_id, current_user_id))
-                    post_data['is_liked_by_user'] = True if cursor.fetchone() else False
-                else:
-                    post_data['is_liked_by_user'] = False
-            except Exception as like_error:
-                post_data['like_count'] = 0
-                post_data['is_liked_by_user'] = False
-
-            cursor.execute("SELECT COUNT(*) as count FROM comments WHERE post_id = %s", (post_id,))
-            comment_result = cursor.fetchone()
-            # ✅ [수정] 댓글이 0개일 때를 대비한 안전장치 추가
-            post_data['comment_count'] = comment_result['count'] if comment_result else 0
+            # ✨ [수정] 피드/프로필과 같은 일괄 조회 함수 사용
+            hydrate_posts(cursor, [post_data], current_user_id)
 
             post_data['comments_disabled'] = bool(post_data.get('comments_disabled', 0))
             post_data['likes_hidden'] = bool(post_data.get('likes_hidden', 0))
             
             if post_data.get('P_created_at'):
                 post_data['P_created_at'] = post_data['P_created_at'].strftime('%Y-%m-%d %H:%M:%S')
-
-            sql_images = "SELECT image_url FROM post_images WHERE post_id = %s ORDER BY image_order ASC"
-            cursor.execute(sql_images, (post_id,))
-            images = cursor.fetchall()
-            post_data['images'] = [image['image_url'] for image in images]
             
             return jsonify({"success": True, "post": post_data})
     except Exception as e:
@@ -906,8 +2825,13 @@ def soft_delete_post(post_id):
     try:
         with conn.cursor() as cursor:
             # Instead of DELETE, use UPDATE to set the is_deleted flag and timestamp
-            sql = "UPDATE posts SET is_deleted = TRUE, deleted_at = NOW() WHERE post_id = %s"
-            cursor.execute(sql, (post_id,))
+            # ✨ [수정] 이미 삭제된 게시물을 다시 삭제해도 게시물 수가 두 번 줄지 않도록 조건 추가
+            sql = "UPDATE posts SET is_deleted = TRUE, deleted_at = NOW() WHERE post_id = %s AND is_deleted = FALSE"
+            if cursor.execute(sql, (post_id,)) > 0:
+                author_id = _post_author(cursor, post_id)
+                bump_user_counter(cursor, author_id, 'post_count', -1)
+                # ✅ [추가] 삭제된 게시물은 모든 홈 타임라인에서 제거
+                retract_post(cursor, post_id, author_id)
         conn.commit()
         return jsonify({"success": True, "message": "게시물이 삭제 처리되었습니다."})
     except Exception as e:
@@ -950,6 +2874,8 @@ def delete_post(post_id):
                         print(f"Firebase 파일 삭제 중 오류 발생: {e}")
 
             cursor.execute("DELETE FROM post_images WHERE post_id = %s", (post_id,))
+            _uncount_post(cursor, post_id)
+            retract_post(cursor, post_id)
             rows_deleted = cursor.execute("DELETE FROM posts WHERE post_id = %s", (post_id,))
             
         conn.commit()
@@ -974,7 +2900,7 @@ def get_recently_deleted_posts(user_id):
             sql = """
                 SELECT 
                     post_id, 
-                    (SELECT image_url FROM post_images WHERE post_id = p.post_id ORDER BY image_order ASC LIMIT 1) as thumbnail_url, 
+                    p.cover_image_url as thumbnail_url, 
                     DATEDIFF(deleted_at + INTERVAL 30 DAY, NOW()) as days_left 
                 FROM posts p 
                 WHERE user_id = %s AND is_deleted = TRUE 
@@ -996,6 +2922,7 @@ def delete_account():
     user_id = data.get('user_id')
     if not user_id:
         return jsonify({"success": False, "message": "사용자 ID가 필요합니다."}), 400
+    conn = None
     try:
         user_to_delete = auth.get_user_by_email(user_id)
         auth.delete_user(user_to_delete.uid)
@@ -1029,15 +2956,31 @@ def delete_account():
                             print(f"Firebase 파일 삭제 오류: {e}")
             
             cursor.execute("DELETE FROM post_images WHERE post_id IN (SELECT post_id FROM posts WHERE user_id = %s)", (user_id,))
+            cursor.execute("DELETE FROM home_timeline WHERE post_id IN (SELECT post_id FROM posts WHERE user_id = %s)", (user_id,))
+            cursor.execute("DELETE FROM home_timeline WHERE user_id = %s", (user_id,))
             cursor.execute("DELETE FROM posts WHERE user_id = %s", (user_id,))
+            # ✅ [추가] 팔로우 관계가 사라지는 상대방들의 카운터도 함께 줄인다
+            cursor.execute("""
+                UPDATE users u JOIN follows f ON f.following_id = u.user_id
+                SET u.follower_count = GREATEST(u.follower_count - 1, 0)
+                WHERE f.follower_id = %s
+            """, (user_id,))
+            cursor.execute("""
+                UPDATE users u JOIN follows f ON f.follower_id = u.user_id
+                SET u.following_count = GREATEST(u.following_count - 1, 0)
+                WHERE f.following_id = %s
+            """, (user_id,))
             cursor.execute("DELETE FROM follows WHERE follower_id = %s OR following_id = %s", (user_id, user_id))
             cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
         conn.commit()
-        conn.close()
+        user_search_index.remove(user_id)  # ✅ [추가] 검색 색인에서 제거
         return jsonify({"success": True, "message": "계정이 성공적으로 삭제되었습니다."})
     except Exception as e:
         print(e)
         return jsonify({"success": False, "message": "계정 삭제 중 오류 발생"}), 500
+    finally:
+        # ✨ [수정] 풀 커넥션이 오류 시에도 반드시 반납되도록 finally로 이동
+        if conn: conn.close()
 
 # app.py
 
@@ -1060,9 +3003,10 @@ def update_post(post_id):
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # 2. 게시물 내용(P_content) 업데이트
-            sql = "UPDATE posts SET P_content = %s WHERE post_id = %s"
-            cursor.execute(sql, (content, post_id))
+            # 2. 게시물 내용(P_content)과 대표 이미지 업데이트
+            cover_image_url = image_urls[0] if image_urls else None
+            sql = "UPDATE posts SET P_content = %s, cover_image_url = %s WHERE post_id = %s"
+            cursor.execute(sql, (content, cover_image_url, post_id))
 
             # 3. 기존 이미지 목록을 모두 삭제
             sql = "DELETE FROM post_images WHERE post_id = %s"
@@ -1151,6 +3095,16 @@ def toggle_likes(post_id):
 #     finally:
 #         conn.close()
 
+def _load_like_state(user_id, post_id):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM likes WHERE post_id = %s AND user_id = %s", (post_id, user_id))
+            return cursor.fetchone() is not None
+    finally:
+        conn.close()
+
+
 @app.route('/posts/like/<int:post_id>', methods=['POST'])
 def toggle_like(post_id):
     data = request.get_json()
@@ -1159,7 +3113,19 @@ def toggle_like(post_id):
     if not user_id:
         return jsonify({"success": False, "message": "사용자 정보가 필요합니다."}), 400
 
+    # ✅ [추가] write-behind 모드: 의도만 버퍼에 기록하고 바로 응답 (DB 반영은 백그라운드에서 일괄 처리)
+    if LIKE_WRITE_BEHIND:
+        try:
+            liked = like_buffer.toggle(user_id, post_id, lambda: _load_like_state(user_id, post_id))
+        except Exception as e:
+            print(e)
+            return jsonify({"success": False, "message": "서버 오류"}), 500
+        message = "게시물을 좋아합니다." if liked else "좋아요를 취소했습니다."
+        return jsonify({"success": True, "message": message})
+
     conn = get_connection()
+    alarm_ids = []
+    retracted = set()
     try:
         with conn.cursor() as cursor:
             sql = "SELECT * FROM likes WHERE post_id = %s AND user_id = %s"
@@ -1169,10 +3135,17 @@ def toggle_like(post_id):
             if is_liked:
                 sql = "DELETE FROM likes WHERE post_id = %s AND user_id = %s"
                 cursor.execute(sql, (post_id, user_id))
+                bump_post_counter(cursor, post_id, 'like_count', -1)
                 message = "좋아요를 취소했습니다."
+                # ✅ [추가] 아직 읽지 않은 좋아요 알림 묶음에서 뺀다
+                cursor.execute("SELECT user_id FROM posts WHERE post_id = %s", (post_id,))
+                post = cursor.fetchone()
+                if post and post['user_id'] != user_id:
+                    retracted = retract_alarms(cursor, [(post['user_id'], user_id, 'like', post_id)])
             else:
                 sql = "INSERT INTO likes (post_id, user_id) VALUES (%s, %s)"
                 cursor.execute(sql, (post_id, user_id))
+                bump_post_counter(cursor, post_id, 'like_count', 1)
                 message = "게시물을 좋아합니다."
 
                 # ✅ [알림 기능 추가] 'like' 타입 알림 생성
@@ -1181,10 +3154,11 @@ def toggle_like(post_id):
                 post_author_id = cursor.fetchone()['user_id']
                 # 2. 자기 게시물이 아닐 때만 알림 생성
                 if post_author_id != user_id:
-                    sql_notify = "INSERT INTO alarms (user_id, actor_id, alarm_type, post_id) VALUES (%s, %s, 'like', %s)"
-                    cursor.execute(sql_notify, (post_author_id, user_id, post_id))
+                    alarm_ids = create_alarms(cursor, [(post_author_id, user_id, 'like', post_id)])
 
         conn.commit()
+        # ✅ [추가] 받는 사람에게 실시간 알림 (취소했으면 바뀐 안 읽은 알림 수)
+        push_notifications(conn, alarm_ids, retracted)
         return jsonify({"success": True, "message": message})
     except Exception as e:
         conn.rollback()
@@ -1195,63 +3169,115 @@ def toggle_like(post_id):
 
 # app.py
 
+FEED_PAGE_SIZE = 20       # cursor 없이 호출하는 기존 클라이언트도 이 개수만큼 받는다
+FEED_MAX_PAGE_SIZE = 100
+
+
+def _feed_candidate_keys(cursor, user_id, after, count):
+    """FEED_MODE에 따라 피드 한 페이지의 (P_created_at 문자열, post_id) 목록을 최신순으로 돌려준다
+
+    OFFSET 없이 마지막으로 본 (작성 시간, post_id) 다음부터 인덱스로 바로 찾아간다.
+    """
+    if FEED_MODE == 'pull':
+        sql = """
+            SELECT p.post_id, p.P_created_at
+            FROM posts p
+            WHERE (p.user_id IN (
+                SELECT following_id FROM follows WHERE follower_id = %s
+            ) OR p.user_id = %s)
+              AND p.is_deleted = FALSE
+        """
+        params = [user_id, user_id]
+        alias = 'p'
+    else:
+        # 미리 만들어 둔 home_timeline을 (user_id, P_created_at, post_id) 인덱스로 읽는다
+        sql = "SELECT t.post_id, t.P_created_at FROM home_timeline t WHERE t.user_id = %s"
+        params = [user_id]
+        alias = 't'
+    if after:
+        sql += f" AND ({alias}.P_created_at < %s OR ({alias}.P_created_at = %s AND {alias}.post_id < %s))"
+        params += [after[0], after[0], after[1]]
+    sql += f" ORDER BY {alias}.P_created_at DESC, {alias}.post_id DESC LIMIT %s"
+    params.append(count)
+    cursor.execute(sql, params)
+    keys = [(_feed_key_time(row['P_created_at']), row['post_id']) for row in cursor.fetchall()]
+
+    if FEED_MODE != 'hybrid':
+        _count_feed_metric('timelines_pull' if FEED_MODE == 'pull' else 'timelines_push')
+        return keys
+
+    # hybrid: 내가 팔로우하는 대형 계정들의 최근 게시물을 캐시에서 가져와 합친다
+    celebrity_ids = celebrity_authors.ids(cursor)
+    followed_celebrities = []
+    if celebrity_ids:
+        cursor.execute("SELECT following_id FROM follows WHERE follower_id = %s", (user_id,))
+        followed_celebrities = [row['following_id'] for row in cursor.fetchall() if row['following_id'] in celebrity_ids]
+    if not followed_celebrities:
+        _count_feed_metric('timelines_push')
+        return keys
+
+    merged = set(keys)
+    for author_id in followed_celebrities:
+        merged.update(celebrity_authors.posts_before(cursor, author_id, after, count))
+    _count_feed_metric('timelines_hybrid')
+    # 팔로우 도중 대형 계정이 된 경우 같은 게시물이 양쪽에 있을 수 있으므로 post_id로 중복 제거
+    unique = {}
+    for key in merged:
+        unique.setdefault(key[1], key)
+    return sorted(unique.values(), reverse=True)[:count]
+
 # ✅ [수정됨] 팔로우 기반으로 동작하는 최종 버전의 홈 피드 API
+# ✨ [수정] (P_created_at, post_id) 기준 커서 페이지네이션 (?limit=, ?cursor= → next_cursor)
 @app.route('/feed', methods=['GET'])
 def get_feed():
     current_user_id = request.args.get('current_user_id')
     if not current_user_id:
         return jsonify({"success": False, "message": "사용자 정보가 필요합니다."}), 400
 
+    limit = get_page_size(FEED_PAGE_SIZE, FEED_MAX_PAGE_SIZE)
+    cursor_token = request.args.get('cursor')
+    try:
+        after = decode_cursor(cursor_token, 2) if cursor_token else None
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # 팔로우/내 게시물 가져오는 SQL (수정 없음)
-            sql = """
-                SELECT 
-                    p.post_id, p.P_content, p.P_created_at,
-                    u.user_id as author_id, u.nickname, u.profile_image_url
-                FROM posts p
-                JOIN users u ON p.user_id = u.user_id
-                WHERE (p.user_id IN (
-                    SELECT following_id FROM follows WHERE follower_id = %s
-                ) OR p.user_id = %s)
-                  AND p.is_deleted = FALSE
-                ORDER BY p.P_created_at DESC
-            """
-            cursor.execute(sql, (current_user_id, current_user_id))
-            posts = cursor.fetchall()
+            # 1. 이번 페이지에 들어갈 (작성 시간, post_id) 후보를 고르고
+            keys = _feed_candidate_keys(cursor, current_user_id, after, limit + 1)
+
+            # 다음 페이지가 있는지 알기 위해 하나 더 가져온다
+            next_cursor = None
+            if len(keys) > limit:
+                keys = keys[:limit]
+                next_cursor = encode_cursor(*keys[-1])
+
+            # 2. 고른 게시물만 한 번에 읽어서 순서대로 정렬
+            posts = []
+            if keys:
+                post_ids = [post_id for _, post_id in keys]
+                sql = f"""
+                    SELECT 
+                        p.post_id, p.P_content, p.P_created_at,
+                        u.user_id as author_id, u.nickname, u.profile_image_url
+                    FROM posts p
+                    JOIN users u ON p.user_id = u.user_id
+                    WHERE p.post_id IN ({','.join(['%s'] * len(post_ids))})
+                      AND p.is_deleted = FALSE
+                """
+                cursor.execute(sql, post_ids)
+                rows = {row['post_id']: row for row in cursor.fetchall()}
+                posts = [rows[post_id] for post_id in post_ids if post_id in rows]
 
             for post in posts:
-                post_id = post['post_id']
-                
-                # 날짜 및 이미지 정보 (수정 없음)
                 if post.get('P_created_at'):
                     post['P_created_at'] = post['P_created_at'].strftime('%Y-%m-%d %H:%M:%S')
 
-                sql_images = "SELECT image_url FROM post_images WHERE post_id = %s ORDER BY image_order ASC"
-                cursor.execute(sql_images, (post_id,))
-                images = cursor.fetchall()
-                post['images'] = [image['image_url'] for image in images]
-
-                # 좋아요 정보 조회 (수정됨)
-                try:
-                    cursor.execute("SELECT COUNT(*) as count FROM likes WHERE post_id = %s", (post_id,))
-                    like_result = cursor.fetchone()
-                    # ✅ [수정] 좋아요가 0개일 때(None)를 대비한 안전장치 추가
-                    post['like_count'] = like_result['count'] if like_result else 0
-                    
-                    cursor.execute("SELECT 1 FROM likes WHERE post_id = %s AND user_id = %s", (post_id, current_user_id))
-                    post['is_liked_by_user'] = True if cursor.fetchone() else False
-                except Exception as like_error:
-                    post['like_count'] = 0
-                    post['is_liked_by_user'] = False
-                
-                # ✅ [수정] 댓글 개수 계산 로직을 올바른 위치로 이동하고 안전장치 추가
-                cursor.execute("SELECT COUNT(*) as count FROM comments WHERE post_id = %s", (post_id,))
-                comment_result = cursor.fetchone()
-                post['comment_count'] = comment_result['count'] if comment_result else 0
+            # ✨ [수정] 게시물별 반복 쿼리 대신 일괄 조회
+            hydrate_posts(cursor, posts, current_user_id)
             
-            return jsonify({"success": True, "posts": posts})
+            return jsonify({"success": True, "posts": posts, "next_cursor": next_cursor})
     except Exception as e:
         print(f"Error in get_feed: {e}")
         return jsonify({"success": False, "message": "피드 정보를 가져오는 중 오류 발생"}), 500
@@ -1323,7 +3349,7 @@ def get_liked_posts(user_id):
                 SELECT 
                     p.post_id, p.P_content, p.P_created_at,
                     u.user_id as author_id, u.nickname, u.profile_image_url,
-                    (SELECT image_url FROM post_images WHERE post_id = p.post_id ORDER BY image_order ASC LIMIT 1) as thumbnail_url
+                    p.cover_image_url as thumbnail_url
                 FROM likes l
                 JOIN posts p ON l.post_id = p.post_id
                 JOIN users u ON p.user_id = u.user_id
@@ -1344,20 +3370,33 @@ def get_liked_posts(user_id):
             posts = cursor.fetchall()
             
             for post in posts:
-                post_id = post['post_id']
                 if post.get('P_created_at'):
                     post['P_created_at'] = post['P_created_at'].strftime('%Y-%m-%d %H:%M:%S')
-                sql_images = "SELECT image_url FROM post_images WHERE post_id = %s ORDER BY image_order ASC"
-                cursor.execute(sql_images, (post_id,))
-                images = cursor.fetchall()
-                post['images'] = [image['image_url'] for image in images]
-                try:
-                    cursor.execute("SELECT COUNT(*) as count FROM likes WHERE post_id = %s", (post_id,))
-                    post['like_count'] = cursor.fetchone()['count']
-                    post['is_liked_by_user'] = True 
-                except Exception as like_error:
-                    post['like_count'] = 0
-                    post['is_liked_by_user'] = True
+
+            # ✅ [추가] 버퍼에만 있는(아직 DB에 없는) 좋아요도 방금 누른 것으로 보고 목록에 넣는다
+            listed = {post['post_id'] for post in posts}
+            buffered = [post_id for post_id, liked in like_buffer.pending_likes(user_id).items()
+                        if liked and post_id not in listed]
+            if buffered:
+                cursor.execute(f"""
+                    SELECT 
+                        p.post_id, p.P_content, p.P_created_at,
+                        u.user_id as author_id, u.nickname, u.profile_image_url,
+                        p.cover_image_url as thumbnail_url
+                    FROM posts p
+                    JOIN users u ON p.user_id = u.user_id
+                    WHERE p.post_id IN ({','.join(['%s'] * len(buffered))}) AND p.is_deleted = FALSE
+                """, buffered)
+                recent = cursor.fetchall()
+                for post in recent:
+                    if post.get('P_created_at'):
+                        post['P_created_at'] = post['P_created_at'].strftime('%Y-%m-%d %H:%M:%S')
+                posts = posts + recent if sort_order == 'oldest' else recent + posts
+
+            # ✨ [수정] 좋아요 목록이므로 본인 기준으로 조회하면 is_liked_by_user는 모두 True가 된다
+            hydrate_posts(cursor, posts, user_id)
+            # 버퍼에 좋아요 취소가 남아 있는 게시물은 목록에서 뺀다
+            posts = [post for post in posts if post['is_liked_by_user']]
             
             return jsonify({"success": True, "posts": posts})
     except Exception as e:
@@ -1375,18 +3414,40 @@ def unlike_posts_batch():
     if not user_id or not post_ids:
         return jsonify({"success": False, "message": "필수 정보가 누락되었습니다."}), 400
 
+    # ✅ [추가] 버퍼에 남아 있는 같은 게시물의 의도는 버리고 DB에 바로 반영
+    like_buffer.discard(user_id, post_ids)
+
     conn = get_connection()
+    retracted = set()
     try:
         with conn.cursor() as cursor:
             # post_ids 리스트를 SQL의 IN 절에서 사용할 수 있도록 포맷팅
             # post_ids가 (1, 2, 3) 형태가 되도록 함
             placeholders = ','.join(['%s'] * len(post_ids))
+            params = [user_id] + post_ids
+
+            # ✅ [추가] 실제로 좋아요가 있던 게시물만 좋아요 수를 줄이기 위해 먼저 확인 (행 잠금)
+            cursor.execute(f"SELECT post_id FROM likes WHERE user_id = %s AND post_id IN ({placeholders}) FOR UPDATE", params)
+            liked_post_ids = [row['post_id'] for row in cursor.fetchall()]
+
             sql = f"DELETE FROM likes WHERE user_id = %s AND post_id IN ({placeholders})"
             
             # user_id와 post_ids 리스트를 합쳐서 쿼리 파라미터로 전달
-            params = [user_id] + post_ids
             cursor.execute(sql, params)
+            if liked_post_ids:
+                cursor.execute(
+                    f"UPDATE posts SET like_count = GREATEST(like_count - 1, 0) WHERE post_id IN ({','.join(['%s'] * len(liked_post_ids))})",
+                    liked_post_ids
+                )
+                # ✅ [추가] 아직 읽지 않은 좋아요 알림 묶음에서 뺀다
+                cursor.execute(
+                    f"SELECT post_id, user_id FROM posts WHERE post_id IN ({','.join(['%s'] * len(liked_post_ids))})",
+                    liked_post_ids
+                )
+                retracted = retract_alarms(cursor, [(row['user_id'], user_id, 'like', row['post_id'])
+                                                    for row in cursor.fetchall() if row['user_id'] != user_id])
         conn.commit()
+        push_notifications(conn, [], retracted)
         return jsonify({"success": True, "message": "선택한 게시물의 좋아요를 취소했습니다."})
     except Exception as e:
         conn.rollback()
@@ -1454,10 +3515,12 @@ def add_comment(post_id):
         return jsonify({"success": False, "message": "필수 정보 누락"}), 400
     
     conn = get_connection()
+    alarm_ids = []
     try:
         with conn.cursor() as cursor:
             sql = "INSERT INTO comments (post_id, user_id, C_content) VALUES (%s, %s, %s)"
             cursor.execute(sql, (post_id, user_id, content))
+            bump_post_counter(cursor, post_id, 'comment_count', 1)
 
             # ✅ [알림 기능 추가] 'comment' 타입 알림 생성
             # 1. 게시물 작성자 ID 조회
@@ -1465,10 +3528,11 @@ def add_comment(post_id):
             post_author_id = cursor.fetchone()['user_id']
             # 2. 자기 게시물이 아닐 때만 알림 생성
             if post_author_id != user_id:
-                sql_notify = "INSERT INTO alarms (user_id, actor_id, alarm_type, post_id) VALUES (%s, %s, 'comment', %s)"
-                cursor.execute(sql_notify, (post_author_id, user_id, post_id))
+                alarm_ids = create_alarms(cursor, [(post_author_id, user_id, 'comment', post_id)])
 
         conn.commit()
+        # ✅ [추가] 받는 사람에게 실시간 알림
+        push_notifications(conn, alarm_ids)
         return jsonify({"success": True, "message": "댓글이 등록되었습니다."})
     except Exception as e:
         conn.rollback()
@@ -1483,8 +3547,13 @@ def restore_post(post_id):
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            sql = "UPDATE posts SET is_deleted = FALSE, deleted_at = NULL WHERE post_id = %s"
+            sql = "UPDATE posts SET is_deleted = FALSE, deleted_at = NULL WHERE post_id = %s AND is_deleted = TRUE"
             rows_affected = cursor.execute(sql, (post_id,))
+            # ✅ [추가] 복원된 게시물을 원래 작성 시간 위치로 다시 타임라인에 넣는다
+            if rows_affected > 0:
+                author_id = _post_author(cursor, post_id)
+                bump_user_counter(cursor, author_id, 'post_count', 1)
+                fan_out_post(cursor, post_id, author_id)
         conn.commit()
         if rows_affected > 0:
             return jsonify({"success": True, "message": "게시물이 복원되었습니다."})
@@ -1529,6 +3598,8 @@ def _execute_permanent_delete(post_id, conn):
             cursor.execute("DELETE FROM likes WHERE post_id = %s", (post_id,))
             cursor.execute("DELETE FROM comments WHERE post_id = %s", (post_id,))
             cursor.execute("DELETE FROM post_images WHERE post_id = %s", (post_id,))
+            _uncount_post(cursor, post_id)
+            retract_post(cursor, post_id)
             rows_affected = cursor.execute("DELETE FROM posts WHERE post_id = %s", (post_id,))
             return rows_affected > 0
     except Exception as e:
@@ -1588,6 +3659,241 @@ def auto_delete_old_posts_job():
         if conn:
             conn.close()
 
+# ✅ [추가] 비정규화된 카운터가 원본 테이블과 어긋났는지 조금씩 확인하고 바로잡는 스케줄링 작업
+COUNTER_RECONCILE_MINUTES = 30   # 실행 주기
+COUNTER_RECONCILE_BATCH = 500    # 한 번에 확인하는 행 수 (배치마다 커밋해서 잠금을 짧게 유지)
+COUNTER_RECONCILE_MAX_BATCHES = 20  # 한 번 실행할 때 테이블별로 처리할 최대 배치 수
+
+# 테이블별로 어디까지 확인했는지 기억해 두고, 다음 실행에서 이어서 진행한다
+_reconcile_position = {'users': None, 'posts': None}
+reconcile_metrics = {'runs': 0, 'checked': 0, 'repaired': 0, 'last_run_ms': 0.0, 'last_repaired': 0}
+
+_COUNTER_SOURCES = {
+    'users': ('user_id', {
+        'post_count': "(SELECT COUNT(*) FROM posts p WHERE p.user_id = t.user_id AND p.is_deleted = FALSE)",
+        'follower_count': "(SELECT COUNT(*) FROM follows f WHERE f.following_id = t.user_id)",
+        'following_count': "(SELECT COUNT(*) FROM follows f WHERE f.follower_id = t.user_id)",
+        'unread_alarm_count': "(SELECT COUNT(*) FROM alarms a WHERE a.user_id = t.user_id AND a.is_read = FALSE)",
+    }),
+    'posts': ('post_id', {
+        'like_count': "(SELECT COUNT(*) FROM likes l WHERE l.post_id = t.post_id)",
+        'comment_count': "(SELECT COUNT(*) FROM comments c WHERE c.post_id = t.post_id)",
+    }),
+}
+
+
+def _reconcile_batch(cursor, table):
+    """다음 배치를 확인해서 어긋난 행만 고친다. (확인한 행 수, 고친 행 수)를 돌려준다"""
+    key, counters = _COUNTER_SOURCES[table]
+    columns = ', '.join(f"t.{col}, {expr} AS actual_{col}" for col, expr in counters.items())
+    sql = f"SELECT t.{key}, {columns} FROM {table} t"
+    params = []
+    if _reconcile_position[table] is not None:
+        sql += f" WHERE t.{key} > %s"
+        params.append(_reconcile_position[table])
+    sql += f" ORDER BY t.{key} LIMIT %s"
+    params.append(COUNTER_RECONCILE_BATCH)
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+
+    # 테이블 끝까지 확인했으면 처음부터 다시 시작
+    _reconcile_position[table] = rows[-1][key] if len(rows) == COUNTER_RECONCILE_BATCH else None
+
+    drifted = [row[key] for row in rows if any(row[col] != row[f'actual_{col}'] for col in counters)]
+    if drifted:
+        # 확인과 수정 사이에 바뀐 값이 있을 수 있으므로 UPDATE 안에서 다시 계산한다
+        assignments = ', '.join(f"t.{col} = {expr}" for col, expr in counters.items())
+        cursor.execute(
+            f"UPDATE {table} t SET {assignments} WHERE t.{key} IN ({','.join(['%s'] * len(drifted))})",
+            drifted
+        )
+        print(f"카운터 보정 ({table}): {drifted}")
+    return len(rows), len(drifted)
+
+
+def reconcile_counters_job():
+    """카운터 컬럼과 실제 COUNT(*)가 다른 행을 찾아서 바로잡는 스케줄링 작업"""
+    started = time.monotonic()
+    checked = repaired = 0
+    conn = None
+    try:
+        conn = get_connection()
+        with conn.cursor() as cursor:
+            for table in _COUNTER_SOURCES:
+                for _ in range(COUNTER_RECONCILE_MAX_BATCHES):
+                    batch_checked, batch_repaired = _reconcile_batch(cursor, table)
+                    conn.commit()
+                    checked += batch_checked
+                    repaired += batch_repaired
+                    if _reconcile_position[table] is None:
+                        break
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"카운터 보정 작업 중 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+        elapsed_ms = (time.monotonic() - started) * 1000
+        reconcile_metrics['runs'] += 1
+        reconcile_metrics['checked'] += checked
+        reconcile_metrics['repaired'] += repaired
+        reconcile_metrics['last_repaired'] = repaired
+        reconcile_metrics['last_run_ms'] = round(elapsed_ms, 1)
+        print(f"[{datetime.now()}] 카운터 보정 완료: {checked}행 확인, {repaired}행 수정 ({elapsed_ms:.0f}ms)")
+
+# ✅ [추가] alarms / story_views 보관 기간 정리 작업
+# 작은 묶음(RETENTION_CHUNK_SIZE)으로 지우고 묶음마다 커밋해서 잠금을 오래 잡지 않는다.
+RETENTION_MINUTES = 60              # 실행 주기
+ALARM_RETENTION_DAYS = 90           # 이보다 오래된 알림은 삭제
+ALARM_MAX_PER_USER = 1000           # 사용자별로 최신 알림을 이 개수까지만 보관
+STORY_VIEW_RETENTION_HOURS = 48     # 스토리는 24시간 뒤 보이지 않으므로, 이보다 오래된 스토리의 조회 기록은 삭제
+RETENTION_CHUNK_SIZE = 1000         # 한 번에 지우는 행 수
+RETENTION_MAX_CHUNKS = 50           # 한 번 실행할 때 규칙별로 처리할 최대 묶음 수
+RETENTION_USER_BATCH = 500          # 한 번 실행할 때 사용자별 개수 제한을 확인할 사용자 수
+RETENTION_ARCHIVE_DIR = None        # 경로를 지정하면 지운 묶음을 <테이블>-<첫 키>-<마지막 키>-<해시>.jsonl.gz 로 보관
+
+_retention_user_position = None     # 사용자별 개수 제한을 어디까지 확인했는지 (다음 실행에서 이어서)
+retention_metrics = {'runs': 0, 'alarms_removed': 0, 'story_views_removed': 0, 'last_removed': {}, 'last_run_ms': 0.0}
+
+
+_ARCHIVE_KEYS = {'alarms': ('alarm_id',), 'story_views': ('story_id', 'viewer_id')}
+
+
+def _archive_rows(table, rows):
+    """커밋된 묶음을 gzip JSON Lines 파일 하나로 보관한다
+
+    파일 이름이 묶음의 키로 정해지므로 같은 묶음을 다시 보관해도 덮어쓸 뿐 중복되지 않는다.
+    """
+    if not RETENTION_ARCHIVE_DIR or not rows:
+        return
+    keys = sorted(tuple(row[key] for key in _ARCHIVE_KEYS[table]) for row in rows)
+    digest = hashlib.sha1(json.dumps(keys, default=str).encode('utf-8')).hexdigest()[:12]
+    os.makedirs(RETENTION_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(RETENTION_ARCHIVE_DIR, f"{table}-{keys[0][0]}-{keys[-1][0]}-{digest}.jsonl.gz")
+    # 다 쓴 뒤에 이름을 바꿔서, 쓰다가 죽어도 반쯤 쓴 파일이 남지 않게 한다
+    with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, default=str) + '\n')
+    os.replace(path + '.tmp', path)
+
+
+def _delete_alarm_chunk(cursor, where, params):
+    """조건에 맞는 알림을 한 묶음 지운다 (안 읽은 알림 수도 함께 줄임). 지운 행들을 돌려준다"""
+    # 잠금 읽기: 그 사이에 create_alarms가 갱신했거나 읽음 처리된 행은 최신 값으로 다시 조건을 보고,
+    # 지울 때까지 잠가 두므로 안 읽은 알림 수를 실제로 지우는 행의 is_read로 줄일 수 있다
+    cursor.execute(f"SELECT * FROM alarms WHERE {where} LIMIT %s FOR UPDATE", params + [RETENTION_CHUNK_SIZE])
+    rows = cursor.fetchall()
+    if not rows:
+        return []
+    unread = {}
+    for row in rows:
+        if not row['is_read']:
+            unread[row['user_id']] = unread.get(row['user_id'], 0) + 1
+    for user_id, count in unread.items():
+        bump_user_counter(cursor, user_id, 'unread_alarm_count', -count)
+    alarm_ids = [row['alarm_id'] for row in rows]
+    cursor.execute(f"DELETE FROM alarms WHERE alarm_id IN ({','.join(['%s'] * len(alarm_ids))})", alarm_ids)
+    cursor.execute(f"DELETE FROM alarm_actors WHERE alarm_id IN ({','.join(['%s'] * len(alarm_ids))})", alarm_ids)
+    return rows
+
+
+def _delete_story_view_chunk(cursor):
+    """오래된 스토리(또는 이미 지워진 스토리)의 조회 기록을 한 묶음 지운다. 지운 행들을 돌려준다"""
+    cursor.execute("""
+        SELECT sv.* FROM story_views sv
+        LEFT JOIN stories s ON s.story_id = sv.story_id
+        WHERE s.story_id IS NULL OR s.created_at < NOW() - INTERVAL %s HOUR
+        LIMIT %s
+    """, (STORY_VIEW_RETENTION_HOURS, RETENTION_CHUNK_SIZE))
+    rows = cursor.fetchall()
+    if not rows:
+        return []
+    keys = [value for row in rows for value in (row['story_id'], row['viewer_id'])]
+    cursor.execute(
+        f"DELETE FROM story_views WHERE (story_id, viewer_id) IN ({','.join(['(%s, %s)'] * len(rows))})",
+        keys
+    )
+    return rows
+
+
+def _run_retention_rule(conn, table, delete_chunk):
+    """delete_chunk(cursor)를 더 지울 것이 없거나 최대 묶음 수에 닿을 때까지 반복 (묶음마다 커밋 후 보관)"""
+    removed = 0
+    for _ in range(RETENTION_MAX_CHUNKS):
+        with conn.cursor() as cursor:
+            rows = delete_chunk(cursor)
+        conn.commit()
+        _archive_rows(table, rows)
+        if table == 'alarms':
+            # 안 읽은 알림이 지워진 사용자에게 바뀐 안 읽은 알림 수를 알린다
+            push_notifications(conn, [], {row['user_id'] for row in rows if not row['is_read']})
+        removed += len(rows)
+        if len(rows) < RETENTION_CHUNK_SIZE:
+            break
+    return removed
+
+
+def _alarm_cap_rules(conn):
+    """이번 실행에서 확인할 사용자들 중 보관 개수를 넘은 사용자의 (조건, 파라미터) 목록"""
+    global _retention_user_position
+    with conn.cursor() as cursor:
+        sql = "SELECT user_id FROM users"
+        params = []
+        if _retention_user_position is not None:
+            sql += " WHERE user_id > %s"
+            params.append(_retention_user_position)
+        sql += " ORDER BY user_id LIMIT %s"
+        params.append(RETENTION_USER_BATCH)
+        cursor.execute(sql, params)
+        user_ids = [row['user_id'] for row in cursor.fetchall()]
+        _retention_user_position = user_ids[-1] if len(user_ids) == RETENTION_USER_BATCH else None
+
+        rules = []
+        for user_id in user_ids:
+            # (user_id, alarmed_at, alarm_id) 인덱스에서 ALARM_MAX_PER_USER번째 다음 알림을 찾는다
+            cursor.execute("""
+                SELECT alarmed_at, alarm_id FROM alarms WHERE user_id = %s
+                ORDER BY alarmed_at DESC, alarm_id DESC
+                LIMIT 1 OFFSET %s
+            """, (user_id, ALARM_MAX_PER_USER))
+            boundary = cursor.fetchone()
+            if boundary:
+                rules.append(("user_id = %s AND (alarmed_at < %s OR (alarmed_at = %s AND alarm_id <= %s))",
+                              [user_id, boundary['alarmed_at'], boundary['alarmed_at'], boundary['alarm_id']]))
+    conn.commit()
+    return rules
+
+
+def retention_job():
+    """오래된 알림, 사용자별 개수를 넘은 알림, 만료된 스토리의 조회 기록을 정리하는 스케줄링 작업"""
+    started = time.monotonic()
+    removed = {'alarms_expired': 0, 'alarms_over_cap': 0, 'story_views': 0}
+    conn = None
+    try:
+        conn = get_connection()
+        removed['alarms_expired'] = _run_retention_rule(
+            conn, 'alarms', lambda cursor: _delete_alarm_chunk(
+                cursor, "alarmed_at < NOW() - INTERVAL %s DAY", [ALARM_RETENTION_DAYS]))
+        for where, params in _alarm_cap_rules(conn):
+            removed['alarms_over_cap'] += _run_retention_rule(
+                conn, 'alarms', lambda cursor: _delete_alarm_chunk(cursor, where, params))
+        removed['story_views'] = _run_retention_rule(conn, 'story_views', _delete_story_view_chunk)
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"보관 기간 정리 작업 중 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+        elapsed_ms = (time.monotonic() - started) * 1000
+        retention_metrics['runs'] += 1
+        retention_metrics['alarms_removed'] += removed['alarms_expired'] + removed['alarms_over_cap']
+        retention_metrics['story_views_removed'] += removed['story_views']
+        retention_metrics['last_removed'] = removed
+        retention_metrics['last_run_ms'] = round(elapsed_ms, 1)
+        print(f"[{datetime.now()}] 보관 기간 정리 완료: {removed} ({elapsed_ms:.0f}ms)")
+
 # @app.route('/comments/<user_id>', methods=['GET'])
 # def get_user_comments(user_id):
 #     conn = get_connection()
@@ -1631,7 +3937,7 @@ def get_user_comments(user_id):
                 SELECT 
                     c.comment_id, c.C_content AS content, c.C_created_at AS created_at,
                     p.post_id, u.nickname, u.profile_image_url,
-                    (SELECT image_url FROM post_images WHERE post_id = p.post_id ORDER BY image_order ASC LIMIT 1) as post_thumbnail_url
+                    p.cover_image_url as post_thumbnail_url
                 FROM comments c
                 JOIN posts p ON c.post_id = p.post_id
                 JOIN users u ON c.user_id = u.user_id
@@ -1888,54 +4194,557 @@ def get_story_viewers(story_id):
         if conn:
             conn.close()
 
+# ✅ [추가] 탐색 탭 후보 풀
+# 사용자마다 후보 게시물을 미리 섞어서 explore_candidates에 (slot 번호, post_id)로 저장해 두고,
+# 요청마다 ORDER BY RAND() 하는 대신 seed로 정해지는 slot 순열의 일부만 PK로 읽는다.
+EXPLORE_POOL_SIZE = 300             # 사용자별 후보 풀 크기
+EXPLORE_PAGE_SIZE = 30              # 한 번에 돌려주는 게시물 수
+EXPLORE_POOL_MAX_AGE_MINUTES = 30   # 첫 페이지 요청 시 이보다 오래된 풀은 새로 만든다
+EXPLORE_REFRESH_MINUTES = 10        # 최근 사용자들의 풀을 미리 갱신하는 주기
+EXPLORE_ACTIVE_WINDOW_MINUTES = 60  # 이 시간 안에 탐색 탭을 연 사용자만 미리 갱신
+EXPLORE_PAGING_GRACE_SECONDS = 120  # 페이지를 넘기는 중인 사용자의 풀은 갱신하지 않는다
+# 풀을 갱신해도 바로 전 세대(generation)의 후보는 남겨 두어서, 그 세대 커서로 페이지를 넘기던 사용자는 끝까지 같은 순열을 본다.
+# 커서의 세대가 그보다 오래되면(= 두 번 이상 갱신됨) 만료된 커서로 보고 빈 목록을 돌려준다.
+
+_explore_last_access = {}  # user_id -> 마지막으로 탐색 탭을 읽은 시각(time.time())
+
+
+def refresh_explore_pool(cursor, user_id):
+    """팔로우한 사용자/내 최근 게시물로 새 세대의 후보 풀을 만들고 (세대, 크기)를 돌려준다"""
+    cursor.execute("""
+        SELECT p.post_id
+        FROM posts p
+        WHERE (p.user_id IN (
+            SELECT following_id FROM follows WHERE follower_id = %s
+        ) OR p.user_id = %s) AND p.is_deleted = FALSE
+        ORDER BY p.P_created_at DESC
+        LIMIT %s
+    """, (user_id, user_id, EXPLORE_POOL_SIZE))
+    post_ids = [row['post_id'] for row in cursor.fetchall()]
+    random.shuffle(post_ids)
+
+    # 세대 번호를 먼저 올려서 풀 행을 잠근다. 동시에 새로고침해도 같은 세대를 두 번 만들지 않는다
+    cursor.execute("""
+        INSERT INTO explore_pools (user_id, size, generation, refreshed_at) VALUES (%s, 0, 1, NOW())
+        ON DUPLICATE KEY UPDATE generation = generation + 1
+    """, (user_id,))
+    cursor.execute("SELECT generation FROM explore_pools WHERE user_id = %s", (user_id,))
+    generation = cursor.fetchone()['generation']
+
+    # 바로 전 세대는 페이지를 넘기던 커서를 위해 남겨 둔다
+    cursor.execute("DELETE FROM explore_candidates WHERE user_id = %s AND generation < %s", (user_id, generation - 1))
+    if post_ids:
+        cursor.executemany(
+            "INSERT INTO explore_candidates (user_id, generation, slot, post_id) VALUES (%s, %s, %s, %s)",
+            [(user_id, generation, slot, post_id) for slot, post_id in enumerate(post_ids)]
+        )
+    cursor.execute("UPDATE explore_pools SET size = %s, refreshed_at = NOW() WHERE user_id = %s",
+                   (len(post_ids), user_id))
+    return generation, len(post_ids)
+
+
+def _explore_slots(seed, size, start, count):
+    """seed로 정해지는 0..size-1 의 순열에서 start번째부터 count개의 slot 번호를 돌려준다
+
+    slot = (offset + i * stride) % size 이고 stride는 size와 서로소라서 같은 seed 안에서는 겹치지 않는다.
+    """
+    if size <= 0:
+        return []
+    rng = random.Random(seed)
+    offset = rng.randrange(size)
+    stride = rng.randrange(1, size + 1)
+    while math.gcd(stride, size) != 1:
+        stride = stride % size + 1
+    return [(offset + i * stride) % size for i in range(start, min(size, start + count))]
+
+
+def refresh_explore_pools_job():
+    """최근 탐색 탭을 사용한 사용자들의 후보 풀을 미리 갱신하는 스케줄링 작업"""
+    now = time.time()
+    user_ids = [
+        user_id for user_id, accessed_at in list(_explore_last_access.items())
+        if now - accessed_at < EXPLORE_ACTIVE_WINDOW_MINUTES * 60
+        and now - accessed_at > EXPLORE_PAGING_GRACE_SECONDS
+    ]
+    for user_id, accessed_at in list(_explore_last_access.items()):
+        if now - accessed_at >= EXPLORE_ACTIVE_WINDOW_MINUTES * 60:
+            _explore_last_access.pop(user_id, None)
+    if not user_ids:
+        return
+
+    conn = None
+    try:
+        conn = get_connection()
+        with conn.cursor() as cursor:
+            placeholders = ','.join(['%s'] * len(user_ids))
+            cursor.execute(
+                f"SELECT user_id FROM explore_pools WHERE user_id IN ({placeholders}) AND refreshed_at < NOW() - INTERVAL %s MINUTE",
+                user_ids + [EXPLORE_REFRESH_MINUTES]
+            )
+            stale_user_ids = [row['user_id'] for row in cursor.fetchall()]
+            for user_id in stale_user_ids:
+                refresh_explore_pool(cursor, user_id)
+                conn.commit()
+        print(f"[{datetime.now()}] 탐색 후보 풀 갱신: {len(stale_user_ids)}명")
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"탐색 후보 풀 갱신 중 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
 @app.route('/posts/explore', methods=['GET'])
 def get_explore_posts():
     current_user_id = request.args.get('current_user_id')
     if not current_user_id:
         return jsonify([]), 400
 
+    # ✨ [수정] 응답 본문은 기존처럼 목록이고, 다음 페이지 커서는 X-Next-Cursor 헤더로 전달한다
+    # 커서 없이 부르면(당겨서 새로고침) 새 seed로 섞인 첫 페이지를 돌려준다.
+    # 커서에는 (seed, 시작 위치, 풀 세대, 풀 크기)가 들어 있어서 도중에 풀이 갱신되어도 같은 순열을 이어서 본다.
+    limit = get_page_size(EXPLORE_PAGE_SIZE, EXPLORE_POOL_SIZE)
+    cursor_token = request.args.get('cursor')
+    generation = size = None
+    try:
+        if cursor_token:
+            try:
+                seed, start, generation, size = decode_cursor(cursor_token, 4)
+            except ValueError:
+                seed, start = decode_cursor(cursor_token, 2)  # 세대가 없는 예전 커서는 현재 세대로 이어 본다
+        else:
+            seed, start = random.getrandbits(31), 0
+        values = [seed, start] + ([generation, size] if generation is not None else [])
+        if not all(type(value) is int and value >= 0 for value in values):
+            raise ValueError("잘못된 커서입니다.")
+    except ValueError:
+        return jsonify([]), 400
+    _explore_last_access[current_user_id] = time.time()
+
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # ▼▼▼ [수정] "OR p.user_id = %s" 조건을 추가하여 내 게시물도 포함시킵니다. ▼▼▼
-            sql = """
-                SELECT 
-                    p.post_id,
-                    (SELECT image_url FROM post_images WHERE post_id = p.post_id ORDER BY image_order ASC LIMIT 1) as thumbnail_url
-                FROM posts p
-                WHERE (p.user_id IN (
-                    SELECT following_id FROM follows WHERE follower_id = %s
-                ) OR p.user_id = %s) AND p.is_deleted = FALSE
-                ORDER BY RAND() 
-            """
-            # ▼▼▼ 파라미터도 2개로 늘어납니다. ▼▼▼
-            cursor.execute(sql, (current_user_id, current_user_id))
-            posts = cursor.fetchall()
-            return jsonify(posts)
+            cursor.execute("""
+                SELECT size, generation, refreshed_at < NOW() - INTERVAL %s MINUTE AS is_stale
+                FROM explore_pools WHERE user_id = %s
+            """, (EXPLORE_POOL_MAX_AGE_MINUTES, current_user_id))
+            pool = cursor.fetchone()
+            if generation is not None:
+                if pool is not None and generation > pool['generation']:
+                    return jsonify([]), 400  # 만든 적 없는 세대
+                if pool is None or generation < pool['generation'] - 1:
+                    return jsonify([])  # 만료된 커서: 그 세대의 후보가 이미 지워졌다
+                # 커서의 크기는 믿지 않는다. 현재 세대면 풀 크기로, 바로 전 세대면 최대 풀 크기로 제한한다
+                size = min(size, pool['size'] if generation == pool['generation'] else EXPLORE_POOL_SIZE)
+            elif pool is None or (not cursor_token and pool['is_stale']):
+                generation, size = refresh_explore_pool(cursor, current_user_id)
+                conn.commit()
+            else:
+                generation, size = pool['generation'], pool['size']
+
+            slots = _explore_slots(seed, size, start, limit)
+            posts = []
+            if slots:
+                sql = f"""
+                    SELECT ec.slot, p.post_id, p.cover_image_url
+                    FROM explore_candidates ec
+                    JOIN posts p ON p.post_id = ec.post_id
+                    WHERE ec.user_id = %s AND ec.generation = %s AND ec.slot IN ({','.join(['%s'] * len(slots))})
+                      AND p.is_deleted = FALSE
+                """
+                cursor.execute(sql, [current_user_id, generation] + slots)
+                by_slot = {row['slot']: row for row in cursor.fetchall()}
+                posts = [
+                    {"post_id": by_slot[slot]['post_id'], "thumbnail_url": by_slot[slot]['cover_image_url']}
+                    for slot in slots if slot in by_slot
+                ]
+
+            response = jsonify(posts)
+            if start + limit < size:
+                response.headers['X-Next-Cursor'] = encode_cursor(seed, start + limit, generation, size)
+            return response
     except Exception as e:
         print(f"Error in get_explore_posts: {e}")
         return jsonify([]), 500
     finally:
         conn.close()
 
-# ✅ [추가] 사용자 검색 API
+# ✅ [추가] 사용자 검색 색인 설정
+USER_SEARCH_PAGE_SIZE = 20
+USER_SEARCH_MAX_PAGE_SIZE = 50
+USER_SEARCH_MAX_CANDIDATES = 200    # 접두어 범위가 이보다 크면 범위를 매번 훑지 않고 접두어별 상위 목록을 쓴다
+USER_SEARCH_TOP_KEEP = USER_SEARCH_MAX_PAGE_SIZE * 2  # 접두어별로 기억해 둘 상위 사용자 수 (빠지는 사람이 있어도 다시 훑지 않도록 여유를 둔다)
+USER_SEARCH_WARM_PREFIX_LEN = 2     # 색인을 만들 때 이 길이까지의 큰 접두어는 상위 목록을 미리 만든다
+USER_SEARCH_LOAD_BATCH = 10000      # 색인을 만들 때 users를 한 번에 읽는 행 수
+USER_SEARCH_REBUILD_MINUTES = 360   # 팔로워 수와 (Redis로 못 받은) 다른 워커의 변경을 반영하려고 색인을 다시 만드는 주기
+USER_SEARCH_SYNC_CHANNEL = 'sns:user_search'  # 색인 변경을 다른 워커에 전달하는 Redis 채널
+
+_CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+_CHOSEONG_SET = frozenset(_CHOSEONG)
+
+
+def normalize_search_text(text):
+    """소문자로 바꾸고 공백을 하나로 줄인다"""
+    return ' '.join(text.lower().split()) if text else ''
+
+
+def to_choseong(text):
+    """한글 음절은 초성으로 바꾸고 공백은 뺀다 ('홍 길동' -> 'ㅎㄱㄷ')"""
+    chars = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            chars.append(_CHOSEONG[code // 588])
+        elif ch != ' ':
+            chars.append(ch)
+    return ''.join(chars)
+
+
+class UserSearchIndex:
+    """닉네임/이름 접두어 검색용 메모리 색인
+
+    (검색 키, user_id)를 정렬된 리스트에 넣어 두고 bisect로 접두어 범위를 찾는다.
+    - _terms: 닉네임/이름과 그 안의 각 단어부터 시작하는 부분 ('kim min su'는 'min su', 'su'로도 찾힌다)
+    - _initials: 한글이 들어간 키의 초성 ('홍길동' -> 'ㅎㄱㄷ')
+    - _top: 범위가 큰 접두어의 상위 목록 {(초성 여부, 접두어): {'ranked': [순위...], 'complete': 범위 전체인지}}
+      'ranked'는 항상 범위 안에서 정확한 상위 len(ranked)명이다. 사용자가 바뀌면 목록에서 빼고,
+      새 순위가 목록의 마지막보다 좋을 때만 넣는다. 모자라게 되면 검색할 때 범위를 다시 훑는다.
+    이 워커에서 일어난 가입/프로필 수정은 바로 반영하고 on_change로 다른 워커에 알린다 (UserSearchSync).
+    놓친 변경과 팔로워 수는 주기적인 재생성으로 맞춘다.
+    """
+
+    def __init__(self):
+        self._users = {}      # user_id -> {'name', 'nickname', 'profile_image_url', 'follower_count', 'forms'}
+        self._terms = []
+        self._initials = []
+        self._top = {}
+        self._loaded = False
+        self._loader = None
+        self._pending = None  # 재생성 중에 들어온 변경 [(user_id, fields 또는 None)]. 새 색인에 다시 적용한다
+        self.on_change = None  # on_change(user_id, fields 또는 None): 이 워커에서 일어난 변경을 알린다
+        self._lock = threading.Lock()
+        self.stats = {'queries': 0, 'db_fallbacks': 0, 'rebuilds': 0, 'top_rebuilds': 0, 'last_rebuild_seconds': None}
+
+    @staticmethod
+    def _keys(doc):
+        """색인 키를 만들고, 순위 계산에 쓸 정규화된 닉네임/이름과 초성을 doc['forms']에 넣어 둔다"""
+        terms, initials = set(), set()
+        nickname, name = normalize_search_text(doc.get('nickname')), normalize_search_text(doc.get('name'))
+        doc['forms'] = (nickname, name, to_choseong(nickname), to_choseong(name))
+        for text in (nickname, name):
+            for i, ch in enumerate(text):
+                if ch != ' ' and (i == 0 or text[i - 1] == ' '):
+                    terms.add(text[i:])
+                    initial = to_choseong(text[i:])
+                    if any(c in _CHOSEONG_SET for c in initial):
+                        initials.add(initial)
+        return terms, initials
+
+    @staticmethod
+    def _insert(entries, keys, user_id):
+        for key in keys:
+            bisect.insort(entries, (key, user_id))
+
+    @staticmethod
+    def _delete(entries, keys, user_id):
+        for key in keys:
+            i = bisect.bisect_left(entries, (key, user_id))
+            if i < len(entries) and entries[i] == (key, user_id):
+                del entries[i]
+
+    @staticmethod
+    def _rank(query, by_initials, user_id, doc):
+        """정확히 같음 → 닉네임 접두어 → 이름 접두어 → 중간 단어 접두어, 같으면 팔로워 많은 순 (작을수록 앞)"""
+        nickname, name = doc['forms'][2:] if by_initials else doc['forms'][:2]
+        if query in (nickname, name):
+            match = 0
+        elif nickname.startswith(query):
+            match = 1
+        elif name.startswith(query):
+            match = 2
+        else:
+            match = 3
+        return (match, -(doc['follower_count'] or 0), len(nickname or name), user_id)
+
+    def _rank_range(self, users, entries, query, by_initials, lo, hi, keep):
+        """entries[lo:hi] 범위 전체에서 상위 keep명의 순위를 구한다"""
+        ranks = {}
+        for i in range(lo, hi):
+            user_id = entries[i][1]
+            if user_id not in ranks:
+                ranks[user_id] = self._rank(query, by_initials, user_id, users[user_id])
+        return {'ranked': heapq.nsmallest(keep, ranks.values()), 'complete': len(ranks) <= keep}
+
+    def _warm_top(self, users, entries, by_initials, top):
+        """짧은 접두어 중 범위가 큰 것의 상위 목록을 미리 만든다 (재생성 중, 잠금 밖에서 호출)"""
+        for length in range(1, USER_SEARCH_WARM_PREFIX_LEN + 1):
+            lo = 0
+            while lo < len(entries):
+                prefix = entries[lo][0][:length]
+                hi = bisect.bisect_left(entries, (prefix + '\U0010ffff',), lo)
+                if len(prefix) == length and hi - lo > USER_SEARCH_MAX_CANDIDATES:
+                    top[(by_initials, prefix)] = self._rank_range(users, entries, prefix, by_initials, lo, hi,
+                                                                  USER_SEARCH_TOP_KEEP)
+                lo = max(hi, lo + 1)
+
+    @staticmethod
+    def _prefixes(keys):
+        return {key[:length] for key in keys for length in range(1, len(key) + 1)}
+
+    def _untrack(self, user_id, keys, by_initials):
+        """사용자의 예전 키에 해당하는 상위 목록에서 사용자를 뺀다"""
+        if not self._top:
+            return
+        for prefix in self._prefixes(keys):
+            top = self._top.get((by_initials, prefix))
+            if top:
+                top['ranked'] = [rank for rank in top['ranked'] if rank[-1] != user_id]
+
+    def _track(self, user_id, doc, keys, by_initials):
+        """사용자의 새 키에 해당하는 상위 목록에, 목록의 정확성을 해치지 않을 때만 넣는다"""
+        if not self._top:
+            return
+        for prefix in self._prefixes(keys):
+            top = self._top.get((by_initials, prefix))
+            if top is None:
+                continue
+            rank = self._rank(prefix, by_initials, user_id, doc)
+            ranked = top['ranked']
+            if top['complete'] or (ranked and rank < ranked[-1]):
+                bisect.insort(ranked, rank)
+                if len(ranked) > USER_SEARCH_TOP_KEEP:
+                    ranked.pop()
+                    top['complete'] = False
+
+    def _apply(self, user_id, fields):
+        """fields가 None이면 삭제, 아니면 기존 값에 합쳐서 다시 색인한다 (잠금을 잡은 상태에서 호출)"""
+        old = self._users.get(user_id)
+        if old is not None:
+            terms, initials = self._keys(old)
+            self._delete(self._terms, terms, user_id)
+            self._delete(self._initials, initials, user_id)
+            self._untrack(user_id, terms, False)
+            self._untrack(user_id, initials, True)
+        if fields is None:
+            self._users.pop(user_id, None)
+            return
+        doc = dict(old) if old else {'name': None, 'nickname': None, 'profile_image_url': None, 'follower_count': 0}
+        doc.update(fields)
+        self._users[user_id] = doc
+        terms, initials = self._keys(doc)
+        self._insert(self._terms, terms, user_id)
+        self._insert(self._initials, initials, user_id)
+        self._track(user_id, doc, terms, False)
+        self._track(user_id, doc, initials, True)
+
+    def apply_change(self, user_id, fields):
+        """변경 하나를 반영한다 (fields가 None이면 삭제). 다른 워커에서 받은 변경도 이것으로 반영한다"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((user_id, fields))
+            if self._loaded:
+                self._apply(user_id, fields)
+
+    def upsert(self, user_id, **fields):
+        """가입/프로필 수정이 커밋된 뒤 호출. 넘긴 필드만 바꾼다"""
+        self.apply_change(user_id, fields)
+        if self.on_change:
+            self.on_change(user_id, fields)
+
+    def remove(self, user_id):
+        self.apply_change(user_id, None)
+        if self.on_change:
+            self.on_change(user_id, None)
+
+    def rebuild(self, cursor):
+        """users 전체를 user_id 순서로 나눠 읽어서 새 색인을 만든 뒤 한 번에 바꿔 끼운다"""
+        started = time.monotonic()
+        with self._lock:
+            self._pending = []
+        try:
+            users, terms, initials = {}, [], []
+            last_id = ''
+            while True:
+                cursor.execute("""
+                    SELECT user_id, name, nickname, profile_image_url, follower_count
+                    FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s
+                """, (last_id, USER_SEARCH_LOAD_BATCH))
+                rows = cursor.fetchall()
+                for row in rows:
+                    user_id = row.pop('user_id')
+                    users[user_id] = row
+                    row_terms, row_initials = self._keys(row)
+                    terms.extend((key, user_id) for key in row_terms)
+                    initials.extend((key, user_id) for key in row_initials)
+                if len(rows) < USER_SEARCH_LOAD_BATCH:
+                    break
+                last_id = user_id
+            terms.sort()
+            initials.sort()
+            top = {}
+            self._warm_top(users, terms, False, top)
+            self._warm_top(users, initials, True, top)
+            with self._lock:
+                self._users, self._terms, self._initials, self._top = users, terms, initials, top
+                self._loaded = True
+                for user_id, fields in self._pending:
+                    self._apply(user_id, fields)
+        finally:
+            with self._lock:
+                self._pending = None
+        self.stats['rebuilds'] += 1
+        self.stats['last_rebuild_seconds'] = round(time.monotonic() - started, 3)
+        return len(users)
+
+    def _ensure_loaded(self):
+        """처음 검색할 때 백그라운드에서 색인을 만든다. 다 만들어질 때까지는 DB로 검색한다"""
+        if self._loader is None:
+            with self._lock:
+                if self._loader is None:
+                    self._loader = threading.Thread(target=rebuild_user_search_index_job, daemon=True)
+                    self._loader.start()
+        return self._loaded
+
+    def search(self, query, limit):
+        """순위: 닉네임/이름이 정확히 같음 → 닉네임 접두어 → 이름 접두어 → 중간 단어 접두어, 같으면 팔로워 많은 순
+
+        색인이 아직 없으면 None을 돌려준다.
+        """
+        if not self._ensure_loaded():
+            return None
+        query = normalize_search_text(query)
+        by_initials = all(c in _CHOSEONG_SET or c == ' ' for c in query)
+        if by_initials:
+            query = query.replace(' ', '')
+        if not query:
+            return []
+
+        with self._lock:
+            self.stats['queries'] += 1
+            entries = self._initials if by_initials else self._terms
+            lo = bisect.bisect_left(entries, (query,))
+            hi = bisect.bisect_left(entries, (query + '\U0010ffff',), lo)
+            if hi - lo <= USER_SEARCH_MAX_CANDIDATES:
+                ranked = self._rank_range(self._users, entries, query, by_initials, lo, hi, limit)['ranked']
+            else:
+                # 범위가 크면 접두어별 상위 목록을 쓰고, 없거나 모자라면 범위 전체를 한 번 훑어서 만든다
+                top = self._top.get((by_initials, query))
+                if top is None or (len(top['ranked']) < limit and not top['complete']):
+                    top = self._rank_range(self._users, entries, query, by_initials, lo, hi, USER_SEARCH_TOP_KEEP)
+                    self._top[(by_initials, query)] = top
+                    self.stats['top_rebuilds'] += 1
+                ranked = top['ranked'][:limit]
+            docs = [(rank[-1], self._users[rank[-1]]) for rank in ranked]
+
+        return [
+            {"user_id": user_id, "name": doc['name'], "nickname": doc['nickname'],
+             "profile_image_url": doc['profile_image_url']}
+            for user_id, doc in docs
+        ]
+
+
+user_search_index = UserSearchIndex()
+
+
+class UserSearchSync:
+    """검색 색인 변경을 Redis pub/sub으로 모든 워커에 전달한다
+
+    구독이 끊겼다가 다시 붙으면 그 사이의 변경을 놓쳤을 수 있으므로 색인을 다시 만든다.
+    """
+
+    def __init__(self, client, index, channel=USER_SEARCH_SYNC_CHANNEL):
+        self.client = client
+        self.index = index
+        self.channel = channel
+        self.origin = f"{os.getpid()}-{random.getrandbits(48):012x}"
+        self.stats = {'published': 0, 'received': 0, 'resubscribes': 0}
+        index.on_change = self.publish
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def publish(self, user_id, fields):
+        try:
+            self.client.publish(self.channel, json.dumps(
+                {'origin': self.origin, 'user_id': user_id, 'fields': fields}, ensure_ascii=False, default=str))
+            self.stats['published'] += 1
+        except Exception as e:
+            print(f"검색 색인 변경 전달 오류: {e}")
+
+    def _run(self):
+        subscribed_before = False
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                if subscribed_before and self.index._loaded:
+                    self.stats['resubscribes'] += 1
+                    rebuild_user_search_index_job()
+                subscribed_before = True
+                for message in pubsub.listen():
+                    change = json.loads(message['data'])
+                    if change['origin'] == self.origin:
+                        continue
+                    self.index.apply_change(change['user_id'], change['fields'])
+                    self.stats['received'] += 1
+            except Exception as e:
+                print(f"검색 색인 변경 구독 오류: {e}")
+                time.sleep(1)
+
+
+def create_user_search_sync(message_queue, index):
+    """여러 워커(Redis 메시지 큐)로 실행할 때만 색인 변경을 주고받는다"""
+    if message_queue and message_queue.startswith(('redis://', 'rediss://')):
+        return UserSearchSync(redis.Redis.from_url(message_queue, decode_responses=True), index)
+    return None
+
+user_search_sync = create_user_search_sync(SOCKETIO_MESSAGE_QUEUE, user_search_index)
+
+
+def rebuild_user_search_index_job():
+    """사용자 검색 색인을 주기적으로 다시 만드는 스케줄링 작업"""
+    conn = None
+    try:
+        conn = get_connection()
+        with conn.cursor() as cursor:
+            count = user_search_index.rebuild(cursor)
+        print(f"[{datetime.now()}] 사용자 검색 색인 갱신: {count}명 ({user_search_index.stats['last_rebuild_seconds']}초)")
+    except Exception as e:
+        print(f"사용자 검색 색인 갱신 오류: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+# ✨ [수정] 사용자 검색 API
+# - 메모리 색인으로 닉네임/이름 접두어와 초성('ㅎㄱㄷ')을 찾고, 순위를 매겨 ?limit= 개수만 돌려준다
+# - 색인이 만들어지기 전에는 DB에서 접두어로 찾는다
 @app.route('/search/users', methods=['GET'])
 def search_users():
     query = request.args.get('query', '')
-    if not query:
+    if not query.strip():
         return jsonify({"success": True, "users": []})
+    limit = get_page_size(USER_SEARCH_PAGE_SIZE, USER_SEARCH_MAX_PAGE_SIZE)
+
+    users = user_search_index.search(query, limit)
+    if users is not None:
+        return jsonify({"success": True, "users": users})
 
+    user_search_index.stats['db_fallbacks'] += 1
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # 닉네임 또는 이름에 검색어가 포함된 사용자를 찾음
+            # 닉네임 또는 이름이 검색어로 시작하는 사용자를 찾음
             sql = """
                 SELECT user_id, name, nickname, profile_image_url 
                 FROM users 
                 WHERE nickname LIKE %s OR name LIKE %s
+                ORDER BY follower_count DESC
+                LIMIT %s
             """
-            search_query = f"%{query}%"
-            cursor.execute(sql, (search_query, search_query))
+            escaped = query.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            search_query = f"{escaped}%"
+            cursor.execute(sql, (search_query, search_query, limit))
             users = cursor.fetchall()
             return jsonify({"success": True, "users": users})
     except Exception as e:
@@ -2041,6 +4850,8 @@ def toggle_follow():
         return jsonify({"success": False, "message": "필수 정보가 누락되었습니다."}), 400
 
     conn = get_connection()
+    alarm_ids = []
+    retracted = set()
     try:
         with conn.cursor() as cursor:
             sql = "SELECT follow_id FROM follows WHERE follower_id = %s AND following_id = %s"
@@ -2051,20 +4862,32 @@ def toggle_follow():
                 sql_delete = "DELETE FROM follows WHERE follower_id = %s AND following_id = %s"
                 cursor.execute(sql_delete, (follower_id, following_id))
                 new_status = False
+                bump_user_counter(cursor, following_id, 'follower_count', -1)
+                bump_user_counter(cursor, follower_id, 'following_count', -1)
+                # ✅ [추가] 언팔로우한 사용자의 게시물을 내 타임라인에서 제거
+                retract_author(cursor, follower_id, following_id)
+                # ✅ [추가] 아직 읽지 않은 팔로우 알림 묶음에서 뺀다
+                retracted = retract_alarms(cursor, [(following_id, follower_id, 'follow', None)])
             else:
                 sql_insert = "INSERT INTO follows (follower_id, following_id) VALUES (%s, %s)"
                 cursor.execute(sql_insert, (follower_id, following_id))
                 new_status = True
+                bump_user_counter(cursor, following_id, 'follower_count', 1)
+                bump_user_counter(cursor, follower_id, 'following_count', 1)
+                # ✅ [추가] 새로 팔로우한 사용자의 최근 게시물을 내 타임라인에 채워 넣기
+                backfill_author(cursor, follower_id, following_id)
                 
                 # ✅ [알림 기능 추가] 'follow' 타입 알림 생성
-                sql_notify = "INSERT INTO alarms (user_id, actor_id, alarm_type) VALUES (%s, %s, 'follow')"
-                cursor.execute(sql_notify, (following_id, follower_id))
+                alarm_ids = create_alarms(cursor, [(following_id, follower_id, 'follow', None)])
             
-            conn.commit()
+            # ✨ [수정] 팔로워 수를 다시 세지 않고 같은 트랜잭션에서 갱신한 카운터를 읽는다
+            cursor.execute("SELECT follower_count FROM users WHERE user_id = %s", (following_id,))
+            row = cursor.fetchone()
+            follower_count = row['follower_count'] if row else 0
 
-            sql_count = "SELECT COUNT(*) as count FROM follows WHERE following_id = %s"
-            cursor.execute(sql_count, (following_id,))
-            follower_count = cursor.fetchone()['count']
+            conn.commit()
+            # ✅ [추가] 받는 사람에게 실시간 알림 (언팔로우했으면 바뀐 안 읽은 알림 수)
+            push_notifications(conn, alarm_ids, retracted)
 
             return jsonify({
                 "success": True, 
@@ -2121,46 +4944,127 @@ def toggle_follow():
 #         return jsonify({"success": False, "message": "서버 오류"}), 500
 #     finally:
 #         conn.close()
+NOTIFICATION_PAGE_SIZE = 30
+NOTIFICATION_MAX_PAGE_SIZE = 100
+
+# ✨ [수정] 알림 목록 페이지네이션
+# - 파라미터 없음: 최신 알림 limit개 + next_cursor(더 오래된 알림) + since(다음 폴링 기준)
+# - ?cursor=: 그보다 오래된 알림
+# - ?since=: 그 이후에 새로 생긴 알림만. limit개를 넘으면 truncated=True (첫 페이지부터 다시 받기)
+# 최신 쪽을 받아갈 때(cursor 없음)만 읽음 처리하고, 안 읽은 알림이 없으면 UPDATE를 하지 않는다.
 @app.route('/notifications', methods=['GET'])
 def get_notifications():
     current_user_id = request.args.get('user_id')
     if not current_user_id:
         return jsonify({"success": False, "message": "사용자 정보가 필요합니다."}), 400
 
+    limit = get_page_size(NOTIFICATION_PAGE_SIZE, NOTIFICATION_MAX_PAGE_SIZE)
+    cursor_token = request.args.get('cursor')
+    since_token = request.args.get('since')
+    try:
+        before = decode_cursor(cursor_token, 2) if cursor_token else None
+        since = None
+        if since_token:
+            try:
+                since, = decode_cursor(since_token, 1)
+            except ValueError:
+                decode_cursor(since_token, 2)  # 순번이 없는 예전 토큰은 처음부터 다시 받는다 (truncated로 알려 줌)
+                since = 0
+            if type(since) is not int:
+                raise ValueError("잘못된 커서입니다.")
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # 1. 먼저 '안 읽음' 상태가 포함된 알림 목록을 가져옵니다.
+            # 재개 토큰은 받는 사람의 현재 알림 순번. 아래 조회와 같은 스냅샷에서 읽도록 먼저 읽는다
+            cursor.execute("SELECT alarm_seq FROM users WHERE user_id = %s", (current_user_id,))
+            row = cursor.fetchone()
+            alarm_seq = row['alarm_seq'] if row else 0
+
+            # 1. (alarmed_at, alarm_id) 인덱스 순서로 한 페이지만 가져온다
+            # since가 있으면 그 순번 이후에 만들어지거나 갱신된 묶음만 (user_id, seq) 인덱스 순서로 가져온다
             sql_select = """
                 SELECT
                     a.alarm_id, a.alarm_type, a.alarmed_at, a.is_read,
+                    a.actor_count, a.recent_actor_ids,
                     actor.user_id as actor_id,
                     actor.nickname as actor_nickname,
                     actor.profile_image_url as actor_profile_image,
                     p.post_id,
-                    (SELECT image_url FROM post_images WHERE post_id = p.post_id ORDER BY image_order ASC LIMIT 1) as post_thumbnail_url,
-                    EXISTS(SELECT 1 FROM follows WHERE follower_id = %s AND following_id = actor.user_id) as is_following
+                    p.cover_image_url as post_thumbnail_url
                 FROM alarms a
                 JOIN users actor ON a.actor_id = actor.user_id
                 LEFT JOIN posts p ON a.post_id = p.post_id
                 WHERE a.user_id = %s
-                ORDER BY a.alarmed_at DESC
             """
-            cursor.execute(sql_select, (current_user_id, current_user_id))
+            params = [current_user_id]
+            # 행 생성자 비교 대신 펼친 OR 형태로 써야 (user_id, alarmed_at, alarm_id) 인덱스 범위로 읽는다
+            if before:
+                sql_select += " AND (a.alarmed_at < %s OR (a.alarmed_at = %s AND a.alarm_id < %s))"
+                params += [before[0], before[0], before[1]]
+            if since is not None:
+                sql_select += " AND a.seq > %s ORDER BY a.seq DESC LIMIT %s"
+                params.append(since)
+            else:
+                sql_select += " ORDER BY a.alarmed_at DESC, a.alarm_id DESC LIMIT %s"
+            params.append(limit + 1)
+            cursor.execute(sql_select, params)
             notifications = cursor.fetchall()
 
+            has_more = len(notifications) > limit
+            notifications = notifications[:limit]
+
+            # 2. 묶음 알림의 최근 행동한 사람들 정보를 한 번에 가져온다
+            for notif in notifications:
+                notif['recent_actor_ids'] = json.loads(notif['recent_actor_ids'] or 'null') or [notif['actor_id']]
+            recent_ids = list({actor_id for notif in notifications for actor_id in notif['recent_actor_ids']})
+            actors = {}
+            if recent_ids:
+                cursor.execute(
+                    f"SELECT user_id, nickname, profile_image_url FROM users WHERE user_id IN ({','.join(['%s'] * len(recent_ids))})",
+                    recent_ids
+                )
+                actors = {row['user_id']: row for row in cursor.fetchall()}
+            for notif in notifications:
+                notif['recent_actors'] = [actors[actor_id] for actor_id in notif.pop('recent_actor_ids') if actor_id in actors]
+
+            # 팔로우 여부는 이번 페이지의 행동한 사람들에 대해 한 번에 확인
+            actor_ids = list({notif['actor_id'] for notif in notifications})
+            following = set()
+            if actor_ids:
+                cursor.execute(
+                    f"SELECT following_id FROM follows WHERE follower_id = %s AND following_id IN ({','.join(['%s'] * len(actor_ids))})",
+                    [current_user_id] + actor_ids
+                )
+                following = {row['following_id'] for row in cursor.fetchall()}
+
+            next_cursor = None
+            if has_more and since is None:
+                last = notifications[-1]
+                next_cursor = encode_cursor(last['alarmed_at'], last['alarm_id'])
+            since_out = since_token if before else encode_cursor(alarm_seq)
+
             for notif in notifications:
                 if notif.get('alarmed_at'):
                     notif['alarmed_at'] = notif['alarmed_at'].strftime('%Y-%m-%d %H:%M:%S')
-                notif['is_following'] = bool(notif['is_following'])
+                notif['is_following'] = notif['actor_id'] in following
                 notif['is_read'] = bool(notif['is_read'])
 
-            # 2. 알림 목록을 가져간 후, 해당 유저의 모든 알림을 '읽음' 상태로 업데이트합니다.
-            sql_update = "UPDATE alarms SET is_read = TRUE WHERE user_id = %s AND is_read = FALSE"
-            cursor.execute(sql_update, (current_user_id,))
-            conn.commit()
+            # 3. 최신 알림을 받아간 경우에만 '읽음' 처리 (안 읽은 알림이 있을 때만)
+            if not before:
+                cursor.execute("SELECT unread_alarm_count FROM users WHERE user_id = %s", (current_user_id,))
+                row = cursor.fetchone()
+                if row and row['unread_alarm_count'] > 0:
+                    cursor.execute("UPDATE alarms SET is_read = TRUE, group_key = NULL WHERE user_id = %s AND is_read = FALSE", (current_user_id,))
+                    cursor.execute("UPDATE users SET unread_alarm_count = 0 WHERE user_id = %s", (current_user_id,))
+                    conn.commit()
 
-            return jsonify({"success": True, "notifications": notifications})
+            response = {"success": True, "notifications": notifications, "next_cursor": next_cursor, "since": since_out}
+            if since is not None:
+                response["truncated"] = has_more
+            return jsonify(response)
 
     except Exception as e:
         if conn: conn.rollback()
@@ -2179,12 +5083,18 @@ def check_new_notifications():
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            # is_read가 FALSE인 알림이 하나라도 있는지 확인
-            sql = "SELECT EXISTS(SELECT 1 FROM alarms WHERE user_id = %s AND is_read = FALSE) as has_new"
+            # ✨ [수정] alarms를 훑지 않고 users.unread_alarm_count 카운터만 읽는다
+            sql = "SELECT unread_alarm_count FROM users WHERE user_id = %s"
             cursor.execute(sql, (user_id,))
             result = cursor.fetchone()
-            has_new = bool(result['has_new'])
-            return jsonify({"success": True, "has_new": has_new})
+            unread_count = result['unread_alarm_count'] if result else 0
+            return jsonify({
+                "success": True,
+                "has_new": unread_count > 0,
+                "unread_count": unread_count,
+                # 소켓으로 notification 이벤트를 받는 클라이언트는 이 주기로만 확인하면 된다
+                "poll_interval_seconds": NOTIFICATION_POLL_INTERVAL_SECONDS,
+            })
     except Exception as e:
         print(f"Error in check_new_notifications: {e}")
         return jsonify({"success": False, "message": "서버 오류"}), 500
@@ -2220,6 +5130,336 @@ def check_new_notifications():
 #         return jsonify({"success": False, "message": "서버 오류"}), 500
 #     finally:
 #         if conn: conn.close()
+def backfill_cover_images(cursor, batch_size=1000):
+    """기존 게시물의 cover_image_url을 post_id 구간별로 나눠서 채운다 (구간마다 커밋)"""
+    cursor.execute("SELECT MIN(post_id) AS min_id, MAX(post_id) AS max_id FROM posts")
+    bounds = cursor.fetchone()
+    if not bounds or bounds['min_id'] is None:
+        return 0
+    updated = 0
+    low = bounds['min_id'] - 1
+    while low < bounds['max_id']:
+        high = low + batch_size
+        updated += cursor.execute("""
+            UPDATE posts p SET p.cover_image_url = (
+                SELECT pi.image_url FROM post_images pi
+                WHERE pi.post_id = p.post_id ORDER BY pi.image_order ASC LIMIT 1
+            )
+            WHERE p.post_id > %s AND p.post_id <= %s AND p.cover_image_url IS NULL
+        """, (low, high))
+        cursor.connection.commit()
+        low = high
+    print(f"대표 이미지 채우기 완료: {updated}개 게시물")
+    return updated
+
+
+# ✅ [추가] 스키마 마이그레이션 목록 (python sns.py migrate 로 적용)
+# 각 항목은 (이름, [SQL 문 또는 cursor를 받는 함수]) 이며, 적용된 이름은 schema_migrations 테이블에 기록된다.
+SCHEMA_MIGRATIONS = [
+    ('0001_posts_feed_keyset_index', [
+        "CREATE INDEX idx_posts_user_feed ON posts (user_id, is_deleted, P_created_at, post_id)",
+    ]),
+    ('0002_home_timeline', [
+        """
+        CREATE TABLE IF NOT EXISTS home_timeline (
+            user_id VARCHAR(255) NOT NULL,
+            post_id BIGINT NOT NULL,
+            author_id VARCHAR(255) NOT NULL,
+            P_created_at DATETIME NOT NULL,
+            PRIMARY KEY (user_id, post_id),
+            KEY idx_home_timeline_page (user_id, P_created_at, post_id),
+            KEY idx_home_timeline_post (post_id)
+        ) DEFAULT CHARSET=utf8mb4
+        """,
+        # 기존 사용자의 타임라인 채우기는 마이그레이션에서 하지 않는다.
+        # 0003까지 적용한 뒤 python sns.py rebuild-timeline --all 로 채운다 (hybrid 모드에서 users.follower_count가 필요).
+    ]),
+    ('0003_denormalized_counters', [
+        "ALTER TABLE posts ADD COLUMN like_count INT NOT NULL DEFAULT 0, ADD COLUMN comment_count INT NOT NULL DEFAULT 0",
+        "ALTER TABLE users ADD COLUMN post_count INT NOT NULL DEFAULT 0, ADD COLUMN follower_count INT NOT NULL DEFAULT 0, ADD COLUMN following_count INT NOT NULL DEFAULT 0",
+        "CREATE INDEX idx_users_follower_count ON users (follower_count)",
+        """
+        UPDATE posts t SET
+            t.like_count = (SELECT COUNT(*) FROM likes l WHERE l.post_id = t.post_id),
+            t.comment_count = (SELECT COUNT(*) FROM comments c WHERE c.post_id = t.post_id)
+        """,
+        """
+        UPDATE users t SET
+            t.post_count = (SELECT COUNT(*) FROM posts p WHERE p.user_id = t.user_id AND p.is_deleted = FALSE),
+            t.follower_count = (SELECT COUNT(*) FROM follows f WHERE f.following_id = t.user_id),
+            t.following_count = (SELECT COUNT(*) FROM follows f WHERE f.follower_id = t.user_id)
+        """,
+    ]),
+    ('0004_explore_candidate_pool', [
+        """
+        CREATE TABLE IF NOT EXISTS explore_candidates (
+            user_id VARCHAR(255) NOT NULL,
+            slot INT NOT NULL,
+            post_id BIGINT NOT NULL,
+            PRIMARY KEY (user_id, slot)
+        ) DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS explore_pools (
+            user_id VARCHAR(255) NOT NULL PRIMARY KEY,
+            size INT NOT NULL,
+            refreshed_at DATETIME NOT NULL
+        ) DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    ('0005_posts_cover_image', [
+        "ALTER TABLE posts ADD COLUMN cover_image_url VARCHAR(1024) NULL",
+        backfill_cover_images,
+    ]),
+    ('0006_messages_room_keyset_index', [
+        "CREATE INDEX idx_messages_room_message ON messages (room_id, message_id)",
+    ]),
+    ('0007_chat_unread_counters', [
+        """
+        CREATE TABLE IF NOT EXISTS chat_participants (
+            room_id BIGINT NOT NULL,
+            user_id VARCHAR(255) NOT NULL,
+            unread_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (room_id, user_id),
+            KEY idx_chat_participants_unread (user_id, unread_count)
+        ) DEFAULT CHARSET=utf8mb4
+        """,
+        # 기존 방들은 지금까지와 같은 기준(마지막으로 읽은 시각 이후 받은 메시지)으로 초기값을 채운다
+        """
+        INSERT IGNORE INTO chat_participants (room_id, user_id, unread_count)
+        SELECT cr.room_id, cr.user1_id,
+            (SELECT COUNT(*) FROM messages m
+             WHERE m.room_id = cr.room_id AND m.receiver_id = cr.user1_id AND m.send_at > cr.user1_last_read_at)
+        FROM chat_rooms cr
+        """,
+        """
+        INSERT IGNORE INTO chat_participants (room_id, user_id, unread_count)
+        SELECT cr.room_id, cr.user2_id,
+            (SELECT COUNT(*) FROM messages m
+             WHERE m.room_id = cr.room_id AND m.receiver_id = cr.user2_id AND m.send_at > cr.user2_last_read_at)
+        FROM chat_rooms cr
+        """,
+    ]),
+    ('0008_chat_read_watermark', [
+        "ALTER TABLE chat_participants ADD COLUMN last_read_message_id BIGINT NOT NULL DEFAULT 0",
+        # 기존 messages.is_read 값으로 각 참여자가 마지막으로 읽은 메시지를 채운다
+        """
+        UPDATE chat_participants cp
+        SET cp.last_read_message_id = COALESCE((
+            SELECT MAX(m.message_id) FROM messages m
+            WHERE m.room_id = cp.room_id AND m.receiver_id = cp.user_id AND m.is_read = TRUE
+        ), 0)
+        """,
+    ]),
+    ('0009_chat_rooms_last_message_id', [
+        "ALTER TABLE chat_rooms ADD COLUMN last_message_id BIGINT NOT NULL DEFAULT 0",
+        """
+        UPDATE chat_rooms cr
+        SET cr.last_message_id = COALESCE((SELECT MAX(m.message_id) FROM messages m WHERE m.room_id = cr.room_id), 0)
+        """,
+    ]),
+    ('0010_id_sequences', [
+        """
+        CREATE TABLE IF NOT EXISTS id_sequences (
+            name VARCHAR(64) NOT NULL PRIMARY KEY,
+            next_id BIGINT NOT NULL
+        ) DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    # chat_participants를 채팅방 멤버십 테이블로 사용한다 (그룹 방도 멤버 행만 늘리면 된다)
+    ('0011_chat_membership', [
+        "ALTER TABLE chat_participants ADD COLUMN last_message_at DATETIME NULL",
+        "CREATE INDEX idx_chat_participants_list ON chat_participants (user_id, last_message_at)",
+        # 0007 이후 만들어진 방까지 모든 방의 두 멤버가 있도록 보장
+        """
+        INSERT IGNORE INTO chat_participants (room_id, user_id, unread_count)
+        SELECT room_id, user1_id, 0 FROM chat_rooms
+        """,
+        """
+        INSERT IGNORE INTO chat_participants (room_id, user_id, unread_count)
+        SELECT room_id, user2_id, 0 FROM chat_rooms
+        """,
+        """
+        UPDATE chat_participants cp
+        JOIN chat_rooms cr ON cr.room_id = cp.room_id
+        SET cp.last_message_at = cr.last_message_at
+        """,
+    ]),
+    ('0012_notification_counters', [
+        "ALTER TABLE users ADD COLUMN unread_alarm_count INT NOT NULL DEFAULT 0",
+        "CREATE INDEX idx_alarms_user_time ON alarms (user_id, alarmed_at, alarm_id)",
+        """
+        UPDATE users t
+        SET t.unread_alarm_count = (SELECT COUNT(*) FROM alarms a WHERE a.user_id = t.user_id AND a.is_read = FALSE)
+        """,
+    ]),
+    ('0013_alarm_groups', [
+        "ALTER TABLE alarms ADD COLUMN actor_count INT NOT NULL DEFAULT 1, ADD COLUMN recent_actor_ids TEXT NULL",
+        "CREATE INDEX idx_alarms_group ON alarms (user_id, alarm_type, post_id, alarmed_at)",
+    ]),
+    ('0014_retention_indexes', [
+        "CREATE INDEX idx_alarms_alarmed_at ON alarms (alarmed_at)",
+        "CREATE INDEX idx_stories_created_at ON stories (created_at)",
+    ]),
+    # 검색 색인이 만들어지기 전 DB 접두어 검색용
+    ('0015_user_search_indexes', [
+        "CREATE INDEX idx_users_nickname ON users (nickname)",
+        "CREATE INDEX idx_users_name ON users (name)",
+    ]),
+    ('0016_explore_pool_generations', [
+        "ALTER TABLE explore_pools ADD COLUMN generation INT NOT NULL DEFAULT 0",
+        "ALTER TABLE explore_candidates ADD COLUMN generation INT NOT NULL DEFAULT 0",
+        "ALTER TABLE explore_candidates DROP PRIMARY KEY, ADD PRIMARY KEY (user_id, generation, slot)",
+    ]),
+    # 열린 알림 묶음은 group_key로 하나만 있게 하고, 묶음에 들어간 사람을 따로 기록한다.
+    # 기존 알림은 닫힌 묶음(group_key = NULL)으로 두고 다음 알림부터 새 묶음을 연다.
+    ('0017_alarm_group_actors', [
+        "ALTER TABLE alarms ADD COLUMN group_key VARCHAR(300) NULL, ADD COLUMN opened_at DATETIME NULL",
+        "CREATE UNIQUE INDEX uq_alarms_group_key ON alarms (group_key)",
+        # 묶음은 group_key로 찾으므로 0013의 묶음 조회용 인덱스는 더 이상 쓰지 않는다
+        "DROP INDEX idx_alarms_group ON alarms",
+        """
+        CREATE TABLE IF NOT EXISTS alarm_actors (
+            alarm_id BIGINT NOT NULL,
+            actor_id VARCHAR(255) NOT NULL,
+            acted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (alarm_id, actor_id),
+            KEY idx_alarm_actors_recent (alarm_id, acted_at)
+        ) DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    # 알림 재개 토큰용 받는 사람별 순번. 기존 알림은 alarm_id를 순번으로 쓴다 (사용자 안에서 증가하는 값이면 된다)
+    ('0018_alarm_sequence', [
+        "ALTER TABLE alarms ADD COLUMN seq BIGINT NOT NULL DEFAULT 0",
+        "ALTER TABLE users ADD COLUMN alarm_seq BIGINT NOT NULL DEFAULT 0",
+        "UPDATE alarms SET seq = alarm_id",
+        """
+        UPDATE users t
+        SET t.alarm_seq = COALESCE((SELECT MAX(a.seq) FROM alarms a WHERE a.user_id = t.user_id), 0)
+        """,
+        "CREATE INDEX idx_alarms_user_seq ON alarms (user_id, seq)",
+    ]),
+]
+
+# 이미 존재하는 테이블/컬럼/인덱스를 다시 만들거나 이미 지운 인덱스를 다시 지울 때 나는 오류는 무시한다
+_IGNORABLE_MIGRATION_ERRORS = {1050, 1060, 1061, 1068, 1091}
+
+
+def run_migrations():
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    name VARCHAR(100) PRIMARY KEY,
+                    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("SELECT name FROM schema_migrations")
+            applied = {row['name'] for row in cursor.fetchall()}
+            conn.commit()
+
+            for name, steps in SCHEMA_MIGRATIONS:
+                if name in applied:
+                    continue
+                print(f"마이그레이션 적용 중: {name}")
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                        continue
+                    try:
+                        cursor.execute(step)
+                    except pymysql.MySQLError as e:
+                        if e.args and e.args[0] in _IGNORABLE_MIGRATION_ERRORS:
+                            print(f"  이미 적용됨 (무시): {e}")
+                        else:
+                            raise
+                cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+                conn.commit()
+        print("마이그레이션 완료")
+    except Exception as e:
+        conn.rollback()
+        print(f"마이그레이션 오류: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def run_command(args):
+    """python sns.py <명령> [인자...] 형태의 관리용 명령 실행"""
+    command = args[0]
+    if command == 'migrate':
+        run_migrations()
+    elif command == 'backfill-cover-images':
+        conn = get_connection()
+        try:
+            with conn.cursor() as cursor:
+                backfill_cover_images(cursor)
+        finally:
+            conn.close()
+    elif command == 'rebuild-timeline':
+        # python sns.py rebuild-timeline <user_id>  또는  python sns.py rebuild-timeline --all
+        if len(args) < 2:
+            print("사용법: python sns.py rebuild-timeline <user_id | --all>")
+            sys.exit(1)
+        conn = get_connection()
+        try:
+            with conn.cursor() as cursor:
+                if args[1] == '--all':
+                    count = rebuild_all_home_timelines(cursor)
+                    print(f"{count}명의 홈 타임라인을 재생성했습니다.")
+                else:
+                    count = rebuild_home_timeline(cursor, args[1])
+                    print(f"{args[1]}의 홈 타임라인을 재생성했습니다. ({count}개 게시물)")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    elif command == 'retention':
+        # python sns.py retention  (스케줄러를 기다리지 않고 한 번 실행)
+        retention_job()
+    elif command == 'worker':
+        # python sns.py worker <port>
+        # 스케줄러 없이 Socket.IO/HTTP만 처리하는 추가 워커. SOCKETIO_MESSAGE_QUEUE가 설정되어 있어야 한다.
+        if len(args) < 2:
+            print("사용법: python sns.py worker <port>")
+            sys.exit(1)
+        if not SOCKETIO_MESSAGE_QUEUE:
+            print("추가 워커를 띄우려면 SOCKETIO_MESSAGE_QUEUE를 설정해야 합니다.")
+            sys.exit(1)
+        # 검색 색인은 프로세스마다 따로 있으므로 워커도 주기적으로 다시 만든다 (나머지 예약 작업은 메인 서버만)
+        scheduler = BackgroundScheduler(daemon=True)
+        scheduler.add_job(rebuild_user_search_index_job, 'interval', minutes=USER_SEARCH_REBUILD_MINUTES)
+        scheduler.start()
+        # eventlet/gevent가 없으면 Werkzeug 서버로 돈다 (개발용 서버지만 메인 서버도 같은 서버를 쓴다)
+        socketio.run(app, host='0.0.0.0', port=int(args[1]), allow_unsafe_werkzeug=True)
+    else:
+        print(f"알 수 없는 명령: {command}")
+        sys.exit(1)
+
+
+# ✅ [추가] 서버 내부 상태(커넥션 풀 대기 시간 등)를 확인하는 API
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify({
+        "success": True,
+        "db_pool": db_pool.stats(),
+        "feed": dict(feed_metrics, mode=FEED_MODE, celebrity_authors=len(celebrity_authors._ids)),
+        "counter_reconcile": reconcile_metrics,
+        "retention": retention_metrics,
+        "like_buffer": dict(like_buffer.stats, enabled=LIKE_WRITE_BEHIND, pending=len(like_buffer._pending)),
+        "chat_persist": dict(chat_persist_queue.stats, enabled=CHAT_ASYNC_PERSIST, queue_depth=chat_persist_queue.depth()),
+        "presence": dict(presence.stats, tracked=len(presence._users), pending_offline=len(presence._offline_at),
+                         announcements=presence_announcer.stats),
+        "user_search": dict(user_search_index.stats, loaded=user_search_index._loaded,
+                            users=len(user_search_index._users), entries=len(user_search_index._terms) + len(user_search_index._initials),
+                            top_prefixes=len(user_search_index._top),
+                            sync=user_search_sync.stats if user_search_sync else None),
+        "socketio": {"message_queue": SOCKETIO_MESSAGE_QUEUE.split('://')[0] if SOCKETIO_MESSAGE_QUEUE else None},
+    })
+
 # 테스트용 경로
 @app.route('/test', methods=['GET'])
 def test_route():
@@ -2227,11 +5467,31 @@ def test_route():
 
 # 서버 실행
 if __name__ == '__main__':
+    # ✅ [추가] 관리용 명령 (예: python sns.py migrate)
+    if len(sys.argv) > 1:
+        run_command(sys.argv[1:])
+        sys.exit(0)
+
     # 백그라운드 스케줄러 생성
     scheduler = BackgroundScheduler(daemon=True)
     
     # 'auto_delete_old_posts_job' 함수를 매일 03시 00분에 실행하도록 등록
     scheduler.add_job(auto_delete_old_posts_job, 'cron', hour=0, minute=0)
+
+    # ✅ [추가] hybrid 피드용 대형 계정 목록 갱신
+    scheduler.add_job(refresh_celebrity_authors_job, 'interval', minutes=FEED_CELEBRITY_REFRESH_MINUTES)
+
+    # ✅ [추가] 좋아요/댓글/팔로워 카운터 보정
+    scheduler.add_job(reconcile_counters_job, 'interval', minutes=COUNTER_RECONCILE_MINUTES)
+
+    # ✅ [추가] 탐색 탭 후보 풀 갱신
+    scheduler.add_job(refresh_explore_pools_job, 'interval', minutes=EXPLORE_REFRESH_MINUTES)
+
+    # ✅ [추가] 오래된 알림 / 스토리 조회 기록 정리
+    scheduler.add_job(retention_job, 'interval', minutes=RETENTION_MINUTES)
+
+    # ✅ [추가] 사용자 검색 색인 재생성 (첫 검색 때도 만들어진다)
+    scheduler.add_job(rebuild_user_search_index_job, 'interval', minutes=USER_SEARCH_REBUILD_MINUTES)
     
     # 스케줄러 시작
     scheduler.start()
@@ -0,0 +1,125 @@
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# sns.py는 import 할 때 Firebase를 초기화하므로 서비스 계정 키 없이 불러올 수 있게 막아 둔다
+with mock.patch('firebase_admin.credentials.Certificate'), mock.patch('firebase_admin.initialize_app'):
+    import sns
+
+
+class FakeCursor:
+    """rebuild()가 읽는 users 행을 한 번에 돌려주는 커서"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.done = False
+
+    def execute(self, sql, params):
+        pass
+
+    def fetchall(self):
+        if self.done:
+            return []
+        self.done = True
+        return [dict(row) for row in self.rows]
+
+
+def user(user_id, nickname, name=None, follower_count=0):
+    return {'user_id': user_id, 'name': name, 'nickname': nickname, 'profile_image_url': None,
+            'follower_count': follower_count}
+
+
+class ToChoseongTest(unittest.TestCase):
+    def test_hangul_syllables_become_initials(self):
+        self.assertEqual(sns.to_choseong('홍길동'), 'ㅎㄱㄷ')
+
+    def test_spaces_removed_and_other_characters_kept(self):
+        self.assertEqual(sns.to_choseong('홍 길동 a1'), 'ㅎㄱㄷa1')
+
+    def test_normalize_search_text(self):
+        self.assertEqual(sns.normalize_search_text('  Kim   Min SU '), 'kim min su')
+        self.assertEqual(sns.normalize_search_text(None), '')
+
+
+class UserSearchIndexTest(unittest.TestCase):
+    def build(self, rows):
+        index = sns.UserSearchIndex()
+        index._loader = True  # 백그라운드 로더를 띄우지 않는다
+        with mock.patch.object(sns, 'USER_SEARCH_LOAD_BATCH', len(rows) + 1):
+            index.rebuild(FakeCursor(rows))
+        return index
+
+    def brute_force(self, index, query, limit):
+        query = sns.normalize_search_text(query)
+        ranks = {}
+        for key, user_id in index._terms:
+            if key.startswith(query) and user_id not in ranks:
+                ranks[user_id] = index._rank(query, False, user_id, index._users[user_id])
+        return [rank[-1] for rank in sorted(ranks.values())[:limit]]
+
+    def ids(self, index, query, limit=sns.USER_SEARCH_MAX_PAGE_SIZE):
+        return [found['user_id'] for found in index.search(query, limit)]
+
+    def test_ranking_order(self):
+        index = self.build([
+            user('a', 'kim', follower_count=1),
+            user('b', 'kimchi', follower_count=100),
+            user('c', 'park', name='kim min', follower_count=1000),
+            user('d', 'lee', name='min kim', follower_count=5000),
+        ])
+        # 정확히 같음 → 닉네임 접두어 → 이름 접두어 → 중간 단어 접두어
+        self.assertEqual(self.ids(index, 'kim'), ['a', 'b', 'c', 'd'])
+
+    def test_initials_search(self):
+        index = self.build([user('a', 'gildong', name='홍길동', follower_count=10), user('b', 'x', name='한강')])
+        # '한강'의 초성은 검색어와 정확히 같으므로 팔로워가 적어도 앞에 온다
+        self.assertEqual(self.ids(index, 'ㅎㄱ'), ['b', 'a'])
+        self.assertEqual(self.ids(index, 'ㅎㄱㄷ'), ['a'])
+
+    def test_popular_user_beyond_first_keys_is_found(self):
+        rows = [user(f"u{i:03d}", f"kim{i:03d}", follower_count=i) for i in range(300)]
+        rows.append(user('zz', 'kimzz', follower_count=1000000))
+        index = self.build(rows)
+        self.assertEqual(self.ids(index, 'kim', 3), ['zz', 'u299', 'u298'])
+        self.assertEqual(self.ids(index, 'k', 3), ['zz', 'u299', 'u298'])
+
+    def test_top_lists_stay_exact_after_edits(self):
+        rng = random.Random(7)
+        rows = [user(f"u{i}", f"{rng.choice('kp')}{rng.choice('ia')}{i}", follower_count=rng.randint(0, 1000))
+                for i in range(600)]
+        index = self.build(rows)
+        queries = ['k', 'ki', 'ka', 'p', 'pi', 'pa']
+        for query in queries:
+            self.assertEqual(self.ids(index, query), self.brute_force(index, query, sns.USER_SEARCH_MAX_PAGE_SIZE))
+        for step in range(500):
+            user_id = f"u{rng.randrange(700)}"
+            if rng.random() < 0.3:
+                index.remove(user_id)
+            else:
+                index.upsert(user_id, nickname=f"{rng.choice('kp')}{rng.choice('ia')}{step}",
+                             follower_count=rng.randint(0, 2000))
+            query = rng.choice(queries)
+            self.assertEqual(self.ids(index, query), self.brute_force(index, query, sns.USER_SEARCH_MAX_PAGE_SIZE))
+
+    def test_changes_are_announced(self):
+        index = self.build([user('a', 'kim')])
+        changes = []
+        index.on_change = lambda user_id, fields: changes.append((user_id, fields))
+        index.upsert('a', nickname='lee')
+        index.remove('a')
+        self.assertEqual(changes, [('a', {'nickname': 'lee'}), ('a', None)])
+
+    def test_apply_change_does_not_announce(self):
+        index = self.build([user('a', 'kim')])
+        index.on_change = mock.Mock()
+        index.apply_change('b', {'nickname': 'kimbap'})
+        self.assertEqual(self.ids(index, 'kim'), ['a', 'b'])
+        index.on_change.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()